@@ -0,0 +1,107 @@
+# Author: Bohua Zhan
+
+"""Micro-benchmark for beta-normalization.
+
+Compares Term.beta_norm with normalization by repeated beta_conv (the
+previous implementation of Term.beta_norm) on synthetic terms with deeply
+nested redexes. Usage:
+
+    python -m kernel.beta_bench
+
+"""
+
+import sys
+import time
+
+from kernel.type import TVar, TFun
+from kernel.term import Var, Abs, Bound, Comb
+from logic.conv import beta_norm_conv
+
+
+Ta = TVar('a')
+f = Var('f', TFun(Ta, Ta, Ta))
+g = Var('g', TFun(Ta, Ta))
+a = Var('a', Ta)
+
+def beta_norm_by_conv(t):
+    """Normalize t by repeated beta_conv, rebuilding the body on every
+    reduction.
+
+    """
+    if t.is_comb():
+        fun = beta_norm_by_conv(t.fun)
+        arg = beta_norm_by_conv(t.arg)
+        if fun.is_abs():
+            return beta_norm_by_conv(fun(arg).beta_conv())
+        else:
+            return fun(arg)
+    elif t.is_abs():
+        return Abs(t.var_name, t.var_T, beta_norm_by_conv(t.body))
+    else:
+        return t
+
+def let_chain(n):
+    """The term (%x_1. (%x_2. ... (%x_n. f x_n x_1) (g x_(n-1)) ...) (g x_1)) a,
+    a chain of n nested redexes, each argument referring to the previous
+    bound variable.
+
+    """
+    body = f(Bound(0), Bound(n - 1))
+    for i in range(n - 1, 0, -1):
+        body = Abs('x' + str(i + 1), Ta, body)(g(Bound(0)))
+    return Abs('x1', Ta, body)(a)
+
+def nested_lambda(n):
+    """The term %y_1 ... y_n. (%x. f x y_1) (... ((%x. f x y_n) a) ...), with
+    redexes under n abstractions, each argument containing loose bound
+    variables that must be shifted.
+
+    """
+    body = a
+    for i in range(n):
+        body = Abs('x', Ta, f(Bound(0), Bound(i + 1)))(body)
+    for i in range(n):
+        body = Abs('y' + str(n - i), Ta, body)
+    return body
+
+def church(n):
+    """Church numeral %s z. s (s ... (s z))."""
+    body = Bound(0)
+    for i in range(n):
+        body = Bound(1)(body)
+    return Abs('s', TFun(Ta, Ta), 'z', Ta, body)
+
+def church_power(m, n):
+    """The term (church n) (church m) g a, which normalizes to g^(m^n) a."""
+    return church(n)(church(m))(g)(a)
+
+def run(name, t, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        res1 = beta_norm_by_conv(t)
+    time1 = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        res2 = t.beta_norm()
+    time2 = (time.perf_counter() - start) / repeat
+
+    assert res1 == res2, "beta_bench: results differ on %s" % name
+    print('%20s | %6d | %9.4f | %9.4f' % (name, t.size(), time1, time2))
+
+
+if __name__ == "__main__":
+    sys.setrecursionlimit(100000)
+
+    print('        Term         |  Size  | beta_conv | beta_norm')
+    print('-----------------------------------------------------')
+    for n in (100, 200, 400, 800):
+        run('let_chain(%d)' % n, let_chain(n))
+    for n in (100, 200, 400, 800):
+        run('nested_lambda(%d)' % n, nested_lambda(n))
+    for m, n in ((2, 5), (3, 4), (4, 4)):
+        run('church_power(%d,%d)' % (m, n), church_power(m, n))
+
+    start = time.perf_counter()
+    beta_norm_conv().get_proof_term(let_chain(200))
+    print('beta_norm_conv on let_chain(200): %.4f' % (time.perf_counter() - start))
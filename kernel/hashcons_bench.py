@@ -0,0 +1,75 @@
+# Author: Bohua Zhan
+
+"""Benchmark for hash-consing of terms.
+
+Checks the proofs of a theory file (realintegral by default) with and
+without hash-consing, and reports the running time. Usage:
+
+    python -m kernel.hashcons_bench [-p] [theory_name]
+
+"""
+
+import time
+from pstats import Stats
+import cProfile
+
+from kernel import term
+from kernel import type as hol_type
+from logic import basic
+from server import monitor
+from prover import z3wrapper
+
+
+def run_check(filename, hashcons):
+    """Check the given theory, return the statistics and the number of
+    canonical terms and types that are alive after checking.
+
+    """
+    term.use_hashcons = hashcons
+    try:
+        start_time = time.perf_counter()
+        res = monitor.check_theory(filename)
+        exec_time = time.perf_counter() - start_time
+        num_terms = len(term._hashcons_table)
+        num_types = len(hol_type._hashcons_table)
+    finally:
+        term.use_hashcons = False
+
+    return res['stat'], exec_time, num_terms, num_types
+
+
+if __name__ == "__main__":
+    import sys, getopt
+
+    opts, args = getopt.getopt(sys.argv[1:], 'p')
+
+    profile = False
+    for opt, arg in opts:
+        if opt == '-p':
+            profile = True
+
+    filename = args[0] if args else 'realintegral'
+
+    basic.load_metadata()
+    z3wrapper.check_z3 = False
+
+    # Warm up the parsing cache, so that both runs measure proof checking
+    # on the same footing.
+    basic.load_theory_cache(filename)
+
+    if profile:
+        pr = cProfile.Profile()
+        pr.enable()
+
+    print('  Hashcons |   OK | Partial | Failed |  Time  | Terms  | Types')
+    print('----------------------------------------------------------------')
+    for hashcons in (False, True):
+        stat, exec_time, num_terms, num_types = run_check(filename, hashcons)
+        print('%10s | %4d | %7d | %6d | %6.2f | %6d | %5d' % (
+            hashcons, stat['OK'], stat['Partial'], stat['Failed'], exec_time, num_terms, num_types))
+
+    if profile:
+        p = Stats(pr)
+        p.strip_dirs()
+        p.sort_stats('cumtime')
+        p.print_stats(100)
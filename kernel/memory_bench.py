@@ -0,0 +1,58 @@
+# Author: Bohua Zhan
+
+"""Memory benchmark for terms and types.
+
+Loads every theory of the library through logic.basic.load_theory, and
+reports the peak resident set size before and after loading, together
+with the number of live Term and Type objects. Usage:
+
+    python -m kernel.memory_bench
+
+"""
+
+import gc
+import resource
+import sys
+import time
+
+from kernel.term import Term
+from kernel.type import Type
+from logic import basic
+
+
+def peak_rss():
+    """Peak resident set size of the current process, in megabytes."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return rss / (1024 * 1024)  # bytes
+    else:
+        return rss / 1024  # kilobytes
+
+def count_objects():
+    """Return the number of live terms and types."""
+    num_terms, num_types = 0, 0
+    for obj in gc.get_objects():
+        if isinstance(obj, Term):
+            num_terms += 1
+        elif isinstance(obj, Type):
+            num_types += 1
+    return num_terms, num_types
+
+
+if __name__ == "__main__":
+    basic.load_metadata()
+    files = sorted(basic.theory_cache['master'].keys(),
+                   key=lambda name: basic.theory_cache['master'][name]['order'])
+
+    rss_before = peak_rss()
+    start_time = time.perf_counter()
+    for filename in files:
+        basic.load_theory(filename)
+    exec_time = time.perf_counter() - start_time
+    rss_after = peak_rss()
+
+    num_terms, num_types = count_objects()
+    print('Theories loaded: %d (%.2f s)' % (len(files), exec_time))
+    print('Peak RSS before: %.1f MB' % rss_before)
+    print('Peak RSS after:  %.1f MB' % rss_after)
+    print('Live terms: %d, live types: %d' % (num_terms, num_types))
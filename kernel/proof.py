@@ -86,6 +86,8 @@ class ProofItem():
     - prevs: previous sequents used. Default to [].
     - th: optional theorem statement (as a sequent).
     - subproof: optional expanded proof of the statement.
+    - check_record: record of the last successful check of the item,
+      used by incremental proof checking.
 
     """
     def __init__(self, id, rule, *, args=None, prevs=None, th=None):
@@ -95,6 +97,7 @@ class ProofItem():
         self.prevs = [ItemID(prev) for prev in prevs] if prevs is not None else []
         self.th = th
         self.subproof = None
+        self.check_record = None
 
     def print_str_args(self):
         def str_val(val):
@@ -134,6 +137,7 @@ class ProofItem():
         res = ProofItem(self.id, self.rule, args=self.args, prevs=self.prevs, th=self.th)
         if self.subproof:
             res.subproof = copy.copy(self.subproof)
+        res.check_record = self.check_record
         return res
 
     def get_sorrys(self):
@@ -164,6 +168,30 @@ class ProofItem():
                 subitem.decr_proof_item(id_remove)
 
 
+class CheckRecord():
+    """Inputs and report of a successful check of a proof item.
+
+    The record stays with the item when its id and the ids of its previous
+    items are renumbered by incr_proof_item and decr_proof_item, as the
+    theorems of the previous items are recorded instead of their ids.
+
+    - thy: the theory the item is checked in.
+    - rule, args, th: rule, arguments and theorem of the item after check.
+    - prev_ths: theorems of the previous items.
+    - check_level: trust level used for checking.
+    - rpt: report of checking the item alone.
+
+    """
+    def __init__(self, thy, item, prev_ths, check_level, rpt):
+        self.thy = thy
+        self.rule = item.rule
+        self.args = item.args
+        self.th = item.th
+        self.prev_ths = prev_ths
+        self.check_level = check_level
+        self.rpt = rpt
+
+
 class Proof():
     """Proof objects represent proofs in the natural deduction format.
 
@@ -22,6 +22,10 @@ class ProofReport():
 
     macros_expand -- name of set of macros expanded.
 
+    cache_hits, cache_misses -- number of solver queries made by evaluated
+    macros that are answered by the solver cache, and that call the solver
+    (see util/solver_cache).
+
     """
     def __init__(self):
         self.steps = 0
@@ -31,6 +35,8 @@ class ProofReport():
         self.th_names = set()
         self.macros_eval = set()
         self.macros_expand = set()
+        self.cache_hits = 0
+        self.cache_misses = 0
         self.gaps = []
 
     def __str__(self):
@@ -42,6 +48,7 @@ class ProofReport():
             "Theorems applied: " + ", ".join(self.th_names),
             "Macros evaluated: " + ", ".join(self.macros_eval),
             "Macros expanded: " + ", ".join(self.macros_expand),
+            "Solver cache: %d hits, %d misses" % (self.cache_hits, self.cache_misses),
             "Gaps: " + str(self.gaps)])
 
     def __repr__(self):
@@ -57,6 +64,8 @@ class ProofReport():
             "th_names": sorted(list(self.th_names)),
             "macros_eval": sorted(list(self.macros_eval)),
             "macros_expand": sorted(list(self.macros_expand)),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
             "num_gaps": len(self.gaps)
         }
 
@@ -69,10 +78,12 @@ class ProofReport():
         self.steps += 1
         self.prim_steps += 1
 
-    def eval_macro(self, macro_name):
+    def eval_macro(self, macro_name, cache_hits=0, cache_misses=0):
         self.steps += 1
         self.macro_steps += 1
         self.macros_eval.add(macro_name)
+        self.cache_hits += cache_hits
+        self.cache_misses += cache_misses
 
     def expand_macro(self, macro_name):
         self.macros_expand.add(macro_name)
@@ -81,6 +92,19 @@ class ProofReport():
         """Register a gap with conclusion theorem t."""
         self.gaps.append(th)
 
+    def merge(self, other):
+        """Add the steps, theorems, macros and gaps recorded in other."""
+        self.steps += other.steps
+        self.thm_steps += other.thm_steps
+        self.prim_steps += other.prim_steps
+        self.macro_steps += other.macro_steps
+        self.th_names.update(other.th_names)
+        self.macros_eval.update(other.macros_eval)
+        self.macros_expand.update(other.macros_expand)
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+        self.gaps.extend(other.gaps)
+
     def steps_stat(self):
         """Return the triple of thm_steps, prim_steps, macro_steps."""
         return (self.thm_steps, self.prim_steps, self.macro_steps)
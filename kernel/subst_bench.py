@@ -0,0 +1,124 @@
+# Author: Bohua Zhan
+
+"""Allocation benchmark for substitution.
+
+Rewrites the statement of every theorem in a theory file (real by
+default) with each theorem of the simp set (theorems with attribute hint_rewrite
+or hint_rewrite_sym), and reports the running time together with the
+number of terms and types created. Usage:
+
+    python -m kernel.subst_bench [-p] [theory_name]
+
+"""
+
+import time
+from pstats import Stats
+import cProfile
+
+from kernel import term
+from kernel import type as hol_type
+from kernel import theory
+from logic import basic
+from logic import conv
+from logic.conv import ConvException
+
+
+class AllocCounter():
+    """Counts the objects created by the constructors of the given
+    classes, while active.
+
+    """
+    def __init__(self, classes):
+        self.classes = classes
+        self.count = 0
+
+    def __enter__(self):
+        self.count = 0
+        self.saved = dict()
+        for cls in self.classes:
+            new = cls.__dict__['__new__']
+            self.saved[cls] = new
+            def counted_new(*args, _new=new.__func__):
+                self.count += 1
+                return _new(*args)
+            cls.__new__ = staticmethod(counted_new)
+        return self
+
+    def __exit__(self, *args):
+        for cls, new in self.saved.items():
+            cls.__new__ = new
+
+
+def get_simp_set():
+    """Return the list of (name, sym) for the simp set of the current
+    theory.
+
+    """
+    simp_set = []
+    for th_name in theory.thy.get_data("theorems"):
+        attrs = theory.thy.get_attributes(th_name)
+        if 'hint_rewrite' in attrs:
+            simp_set.append((th_name, False))
+        if 'hint_rewrite_sym' in attrs:
+            simp_set.append((th_name, True))
+    return simp_set
+
+def rewrite_all(targets, simp_set):
+    """Rewrite each target with each theorem of the simp set, return the
+    number of successful rewrites.
+
+    """
+    num_rewrites = 0
+    for t in targets:
+        for th_name, sym in simp_set:
+            if not conv.has_rewrite(th_name, t, sym=sym):
+                continue
+            try:
+                cv = conv.top_sweep_conv(conv.rewr_conv(th_name, sym=sym))
+                pt = cv.get_proof_term(t)
+            except (ConvException, AssertionError):
+                continue
+            if not pt.is_reflexive():
+                num_rewrites += 1
+    return num_rewrites
+
+
+if __name__ == "__main__":
+    import sys, getopt
+
+    opts, args = getopt.getopt(sys.argv[1:], 'p')
+
+    profile = False
+    for opt, arg in opts:
+        if opt == '-p':
+            profile = True
+
+    filename = args[0] if args else 'real'
+
+    basic.load_theory(filename)
+    simp_set = get_simp_set()
+    targets = [theory.thy.get_theorem(item.name, svar=False).prop
+               for item in basic.load_theory_cache(filename)['content']
+               if item.ty in ('thm', 'thm.ax') and item.error is None]
+
+    if profile:
+        pr = cProfile.Profile()
+        pr.enable()
+
+    term_classes = [term.SVar, term.Var, term.Const, term.Comb, term.Abs, term.Bound]
+    type_classes = [hol_type.STVar, hol_type.TVar, hol_type.TConst]
+    with AllocCounter(term_classes) as term_count, AllocCounter(type_classes) as type_count:
+        start_time = time.perf_counter()
+        num_rewrites = rewrite_all(targets, simp_set)
+        exec_time = time.perf_counter() - start_time
+
+    print('Targets: %d, simp set: %d, rewrites: %d' % (len(targets), len(simp_set), num_rewrites))
+    print('Terms created: %d' % term_count.count)
+    print('Types created: %d' % type_count.count)
+    print('Time: %.2f s' % exec_time)
+
+    if profile:
+        p = Stats(pr)
+        p.strip_dirs()
+        p.sort_stats('cumtime')
+        p.print_stats(100)
@@ -4,8 +4,10 @@ from collections import UserDict
 from copy import copy
 import math
 from fractions import Fraction
+import weakref
 
-from kernel.type import Type, TFun, BoolType, NatType, IntType, RealType, TyInst, TypeMatchException
+from kernel.type import Type, TFun, BoolType, NatType, IntType, RealType, TyInst, TypeMatchException, \
+    hashcons_type
 from kernel import term_ord
 from util import typecheck
 from util import name
@@ -55,6 +57,12 @@ term_parser = None
 """Default printer for terms. If None, Term.print_basic is used."""
 term_printer = None
 
+"""Whether proof checking hash-conses the theorems it produces and the
+theorems it looks up in the theory. See hashcons.
+
+"""
+use_hashcons = False
+
 
 class Term():
     """Represents a term in higher-order logic.
@@ -99,20 +107,37 @@ class Term():
     Abs("x", S, Abs("y", T, Q(Bound(1), Bound(0)))) is %x::S. %y::T. Q x y.
 
     """
-    # ty values for distinguishing between Term objects.
+    # ty values for distinguishing between Term objects. The value is
+    # stored on each subclass rather than on each instance.
     SVAR, VAR, CONST, COMB, ABS, BOUND = range(6)
 
-    def __init__(self, arg):
-        if not isinstance(arg, Term):
-            if term_parser is not None:
-                t = term_parser(arg)
-            else:
-                raise TermException('Term: parser not found.')
-        else:
-            t = arg
-        
-        # Now copy the content of t onto self
-        self.__dict__.update(t.__dict__)
+    # Terms are stored in slots to save memory, as a large number of them
+    # are kept alive by theories and proof states. Fields specific to each
+    # kind of term are declared on the subclasses, which also define
+    # __reduce__ for pickling (memoized fields are not pickled).
+    #
+    # _hash_val: memoized hash value, set on first call to __hash__.
+    # _hashconsed: whether the term is the canonical instance returned by
+    # hashcons.
+    # _alpha_rep: for hash-consed terms, the canonical instance of the
+    # alpha-equivalence class of the term, or None if it is the term itself.
+    # _flags: memoized summary of the term, set on first call to _get_flags.
+    __slots__ = ('_hash_val', '_hashconsed', '_alpha_rep', '_flags', '__weakref__')
+
+    # Bits of _flags. HAS_REDEX is set if the term contains a beta-redex.
+    # The remaining bits (_flags >> DEPTH_SHIFT) store the loose bound
+    # depth: one plus the largest index of a loose bound variable, or zero
+    # if the term is closed.
+    HAS_SVAR, HAS_STVAR, HAS_REDEX = 1, 2, 4
+    FLAG_MASK, DEPTH_SHIFT = 7, 3
+
+    def __new__(cls, arg):
+        """Parse the given string into a term."""
+        if isinstance(arg, Term):
+            return arg
+        if term_parser is None:
+            raise TermException('Term: parser not found.')
+        return term_parser(arg)
 
     def is_svar(self):
         return self.ty == Term.SVAR
@@ -218,7 +243,9 @@ class Term():
             raise TypeError
 
     def __hash__(self):
-        if not hasattr(self, "_hash_val"):
+        try:
+            return self._hash_val
+        except AttributeError:
             if self.is_svar():
                 self._hash_val = hash(("SVAR", self.name, hash(self.T)))
             elif self.is_var():
@@ -233,7 +260,7 @@ class Term():
                 self._hash_val = hash(("BOUND", self.n))
             else:
                 raise TypeError
-        return self._hash_val
+            return self._hash_val
 
     def __eq__(self, other):
         """Equality on terms is defined by alpha-conversion. This ignores
@@ -245,6 +272,11 @@ class Term():
         if id(self) == id(other):
             return True
 
+        # Hash-consed terms are equal if and only if they share the
+        # canonical instance of their alpha-equivalence class.
+        if self._hashconsed and other._hashconsed:
+            return alpha_rep(self) is alpha_rep(other)
+
         if self.ty != other.ty:
             return False
         elif self.is_svar() or self.is_var() or self.is_const():
@@ -323,20 +355,55 @@ class Term():
 
         return rec(self, [])
 
-    def is_open(self):
-        """Whether t is an open term."""
-        def rec(t, n):
-            if t.is_svar() or t.is_var() or t.is_const():
-                return False
-            elif t.is_comb():
-                return rec(t.fun, n) or rec(t.arg, n)
-            elif t.is_abs():
-                return rec(t.body, n+1)
-            elif t.is_bound():
-                return t.n >= n
+    def _get_flags(self):
+        """Return the summary of the term stored in _flags, computing it
+        on the first call.
+
+        The summary records whether the term contains schematic variables,
+        schematic type variables and beta-redexes, and its loose bound
+        depth. It is
+        cleared by subst_type_inplace, the only operation that modifies
+        a typed term in place.
+
+        """
+        try:
+            return self._flags
+        except AttributeError:
+            ty = self.ty
+            if ty == Term.SVAR or ty == Term.VAR or ty == Term.CONST:
+                flags = Term.HAS_SVAR if ty == Term.SVAR else 0
+                if self.T is not None and self.T.has_stvar():
+                    flags |= Term.HAS_STVAR
+            elif ty == Term.COMB:
+                fun_flags, arg_flags = self.fun._get_flags(), self.arg._get_flags()
+                flags = (fun_flags | arg_flags) & Term.FLAG_MASK
+                if self.fun.ty == Term.ABS:
+                    flags |= Term.HAS_REDEX
+                flags |= max(fun_flags >> Term.DEPTH_SHIFT, arg_flags >> Term.DEPTH_SHIFT) << Term.DEPTH_SHIFT
+            elif ty == Term.ABS:
+                body_flags = self.body._get_flags()
+                flags = body_flags & Term.FLAG_MASK
+                if self.var_T is not None and self.var_T.has_stvar():
+                    flags |= Term.HAS_STVAR
+                flags |= max((body_flags >> Term.DEPTH_SHIFT) - 1, 0) << Term.DEPTH_SHIFT
+            elif ty == Term.BOUND:
+                flags = (self.n + 1) << Term.DEPTH_SHIFT
             else:
                 raise TypeError
-        return rec(self, 0)
+            self._flags = flags
+            return flags
+
+    def has_svar(self):
+        """Whether the term contains schematic variables."""
+        return self._get_flags() & Term.HAS_SVAR != 0
+
+    def has_stvar(self):
+        """Whether the term contains schematic type variables."""
+        return self._get_flags() & Term.HAS_STVAR != 0
+
+    def is_open(self):
+        """Whether t is an open term."""
+        return self._get_flags() >> Term.DEPTH_SHIFT > 0
 
     def subst_type(self, tyinst=None, **kwargs):
         """Perform substitution on type variables.
@@ -349,26 +416,44 @@ class Term():
         """
         if tyinst is None:
             tyinst = TyInst(**kwargs)
-        if self.is_svar():
-            return SVar(self.name, self.T.subst(tyinst))
+
+        # Subterms without schematic type variables are shared with the
+        # result, as are subterms left unchanged by the substitution.
+        if not self.has_stvar():
+            return self
+        elif self.is_svar():
+            T = self.T.subst(tyinst)
+            return self if T is self.T else SVar(self.name, T)
         elif self.is_var():
-            return Var(self.name, self.T.subst(tyinst))
+            T = self.T.subst(tyinst)
+            return self if T is self.T else Var(self.name, T)
         elif self.is_const():
-            return Const(self.name, self.T.subst(tyinst))
+            T = self.T.subst(tyinst)
+            return self if T is self.T else Const(self.name, T)
         elif self.is_comb():
-            return Comb(self.fun.subst_type(tyinst), self.arg.subst_type(tyinst))
+            fun, arg = self.fun.subst_type(tyinst), self.arg.subst_type(tyinst)
+            if fun is self.fun and arg is self.arg:
+                return self
+            return Comb(fun, arg)
         elif self.is_abs():
-            return Abs(self.var_name, self.var_T.subst(tyinst), self.body.subst_type(tyinst))
-        elif self.is_bound():
-            return self
+            var_T, body = self.var_T.subst(tyinst), self.body.subst_type(tyinst)
+            if var_T is self.var_T and body is self.body:
+                return self
+            return Abs(self.var_name, var_T, body)
         else:
             raise TypeError
 
     def subst_type_inplace(self, tyinst):
         """Perform substitution on type variables."""
         typecheck.checkinstance('subst_type_inplace', tyinst, TyInst)
-        if hasattr(self, "_hash_val"):
+        try:
             del self._hash_val
+        except AttributeError:
+            pass
+        try:
+            del self._flags
+        except AttributeError:
+            pass
         if self.is_svar() or self.is_var() or self.is_const():
             self.T = self.T.subst(tyinst)
         elif self.is_comb():
@@ -404,21 +489,26 @@ class Term():
                 except TypeMatchException:
                     raise TermException("subst: type " + str(v.T) + " cannot match " + str(inst_T))
 
-        # Now apply substitution recursively.
+        # Now apply substitution recursively. Subterms without schematic
+        # variables are shared with the result.
         def rec(t):
-            if t.is_svar():
+            if not t.has_svar():
+                return t
+            elif t.is_svar():
                 if t.name in inst:
                     return inst[t.name]
                 else:
                     return t
-            elif t.is_var() or t.is_const():
-                return t
             elif t.is_comb():
-                return Comb(rec(t.fun), rec(t.arg))
+                fun, arg = rec(t.fun), rec(t.arg)
+                if fun is t.fun and arg is t.arg:
+                    return t
+                return Comb(fun, arg)
             elif t.is_abs():
-                return Abs(t.var_name, t.var_T, rec(t.body))
-            elif t.is_bound():
-                return t
+                body = rec(t.body)
+                if body is t.body:
+                    return t
+                return Abs(t.var_name, t.var_T, body)
             else:
                 raise TypeError
 
@@ -530,7 +620,10 @@ class Term():
     def incr_boundvars(self, inc):
         """Increase loose bound variables in self by inc."""
         def rec(t, lev):
-            if t.is_svar() or t.is_var() or t.is_const():
+            if t._get_flags() >> Term.DEPTH_SHIFT <= lev:
+                # No loose bound variables at this level
+                return t
+            elif t.is_svar() or t.is_var() or t.is_const():
                 return t
             elif t.is_comb():
                 return Comb(rec(t.fun, lev), rec(t.arg, lev))
@@ -550,10 +643,17 @@ class Term():
         """Given an Abs(x,T,body), substitute x for t in the body. t should
         have type T.
 
+        Shifting of t is delayed until it is substituted under an
+        abstraction, and done at most once for each depth. If t is closed,
+        it is shared between all occurrences.
+
         """
+        t_open = t.is_open()
+        shifted = {0: t}
 
         def rec(s, n):
-            if s.is_svar() or s.is_var() or s.is_const():
+            if s._get_flags() >> Term.DEPTH_SHIFT <= n:
+                # Does not contain the substituted variable
                 return s
             elif s.is_comb():
                 return Comb(rec(s.fun, n), rec(s.arg, n))
@@ -561,7 +661,11 @@ class Term():
                 return Abs(s.var_name, s.var_T, rec(s.body, n+1))
             elif s.is_bound():
                 if s.n == n:
-                    return t.incr_boundvars(n)
+                    if not t_open:
+                        return t
+                    if n not in shifted:
+                        shifted[n] = t.incr_boundvars(n)
+                    return shifted[n]
                 elif s.n > n:  # Bound outside
                     return Bound(s.n - 1)
                 else:  # Locally bound
@@ -585,21 +689,83 @@ class Term():
         else:
             raise TermException("beta_conv: input is not in the form (%x. t1) t2.")
 
+    def is_beta_normal(self):
+        """Whether self contains no beta-redex."""
+        return self._get_flags() & Term.HAS_REDEX == 0
+
     def beta_norm(self):
-        """Normalize self using beta-conversion."""
-        if self.is_svar() or self.is_var() or self.is_const() or self.is_bound():
+        """Normalize self using beta-conversion.
+
+        Terms already in normal form are returned unchanged. Otherwise the
+        term is evaluated with an environment of values for the bound
+        variables, so that substitution and shifting are delayed until the
+        normal form is read back, instead of rebuilding the body on every
+        reduction.
+
+        Values are either closures ('clo', Abs term, env) or neutral terms
+        ('neu', head, args), where head is a term without loose bound
+        variables, or a bound variable given as a de Bruijn level. Arguments
+        are evaluated lazily: the env and the arguments of neutral terms
+        hold thunks [term, env, value], evaluated at most once. The env is a
+        linked list (thunk, rest), or None if empty. Loose bound variables
+        of self have negative levels, so that Bound(n) under k abstractions
+        reads back as Bound(n + k).
+
+        """
+        if self.is_beta_normal():
             return self
-        elif self.is_comb():
-            f = self.fun.beta_norm()
-            x = self.arg.beta_norm()
-            if f.is_abs():
-                return f(x).beta_conv().beta_norm()
+
+        def force(thunk):
+            if thunk[2] is None:
+                thunk[2] = evaluate(thunk[0], thunk[1])
+                thunk[0], thunk[1] = None, None
+            return thunk[2]
+
+        def lookup(env, n):
+            k = n
+            while env is not None:
+                if k == 0:
+                    return force(env[0])
+                k -= 1
+                env = env[1]
+            # Loose bound variable of self
+            return ('neu', -k - 1, ())
+
+        def evaluate(t, env):
+            if t.is_comb():
+                head, args = t.strip_comb()
+                f = evaluate(head, env)
+                for arg in args:
+                    thunk = [arg, env, None]
+                    if f[0] == 'clo':
+                        f = evaluate(f[1].body, (thunk, f[2]))
+                    else:
+                        f = ('neu', f[1], f[2] + (thunk,))
+                return f
+            elif t.is_abs():
+                return ('clo', t, env)
+            elif t.is_bound():
+                return lookup(env, t.n)
             else:
-                return f(x)
-        elif self.is_abs():
-            return Abs(self.var_name, self.var_T, self.body.beta_norm())
-        else:
-            raise TypeError
+                return ('neu', t, ())
+
+        def read_back(v, depth):
+            if v[0] == 'clo':
+                _, t, env = v
+                var = [None, None, ('neu', depth, ())]
+                body = evaluate(t.body, (var, env))
+                return Abs(t.var_name, t.var_T, read_back(body, depth + 1))
+            else:
+                _, head, args = v
+                if isinstance(head, int):
+                    res = Bound(depth - head - 1)
+                else:
+                    res = head
+                for arg in args:
+                    res = Comb(res, read_back(force(arg), depth))
+                return res
+
+        return read_back(evaluate(self, None), 0)
 
     def subst_norm(self, inst=None, **kwargs):
         """Substitute using the given instantiation, then normalize with
@@ -991,7 +1157,9 @@ class Term():
 
     def get_svars(self):
         def rec(t):
-            if t.is_svar():
+            if not t.has_svar():
+                return []
+            elif t.is_svar():
                 return [t]
             elif t.is_comb():
                 return rec(t.fun) + rec(t.arg)
@@ -1040,7 +1208,9 @@ class Term():
 
     def get_stvars(self):
         def rec(t):
-            if t.is_var() or t.is_const():
+            if not t.has_stvar():
+                return []
+            elif t.is_var() or t.is_const():
                 return t.T.get_stvars()
             elif t.is_comb():
                 return rec(t.fun) + rec(t.arg)
@@ -1054,54 +1224,110 @@ class Term():
 
 class SVar(Term):
     """Schematic variable, specified by name and type."""
-    def __init__(self, name, T):
-        self.ty = Term.SVAR
-        self.name = name
-        self.T = T
+    __slots__ = ('name', 'T')
+    ty = Term.SVAR
+
+    def __new__(cls, name, T):
+        t = object.__new__(cls)
+        t.name = name
+        t.T = T
+        t._hashconsed = False
+        return t
+
+    def __reduce__(self):
+        return (SVar, (self.name, self.T))
 
 class Var(Term):
     """Variable, specified by name and type."""
-    def __init__(self, name, T):
-        self.ty = Term.VAR
-        self.name = name
-        self.T = T
+    __slots__ = ('name', 'T')
+    ty = Term.VAR
+
+    def __new__(cls, name, T):
+        t = object.__new__(cls)
+        t.name = name
+        t.T = T
+        t._hashconsed = False
+        return t
+
+    def __reduce__(self):
+        return (Var, (self.name, self.T))
 
 class Const(Term):
-    """Constant, specified by name and type."""
-    def __init__(self, name, T):
-        self.ty = Term.CONST
-        self.name = name
-        self.T = T
+    """Constant, specified by name and type.
+
+    print_type and backupT are only set during printing, when inferring
+    which constants need their types printed.
+
+    """
+    __slots__ = ('name', 'T', 'print_type', 'backupT')
+    ty = Term.CONST
+
+    def __new__(cls, name, T):
+        t = object.__new__(cls)
+        t.name = name
+        t.T = T
+        t._hashconsed = False
+        return t
+
+    def __reduce__(self):
+        return (Const, (self.name, self.T))
 
 class Comb(Term):
     """Combination."""
-    def __init__(self, fun, arg):
-        self.ty = Term.COMB
-        self.fun = fun
-        self.arg = arg
+    __slots__ = ('fun', 'arg')
+    ty = Term.COMB
+
+    def __new__(cls, fun, arg):
+        t = object.__new__(cls)
+        t.fun = fun
+        t.arg = arg
+        t._hashconsed = False
+        return t
+
+    def __reduce__(self):
+        return (Comb, (self.fun, self.arg))
 
 class Abs(Term):
     """Abstraction. The input to Abs is the list x1, T1, ..., xn, Tn, body.
     
     The result is %x1 : T1. ... %xn : Tn. body.
+
+    print_type and backup_var_T are only set during printing, as for Const.
+
     """
-    def __init__(self, *args):
+    __slots__ = ('var_name', 'var_T', 'body', 'print_type', 'backup_var_T')
+    ty = Term.ABS
+
+    def __new__(cls, *args):
         if len(args) < 3:
             raise TypeError
         else:
-            self.ty = Term.ABS
-            self.var_name = args[0]
-            self.var_T = args[1]
+            t = object.__new__(cls)
+            t.var_name = args[0]
+            t.var_T = args[1]
             if len(args) == 3:
-                self.body = args[2]
+                t.body = args[2]
             else:
-                self.body = Abs(*args[2:])
+                t.body = Abs(*args[2:])
+            t._hashconsed = False
+            return t
+
+    def __reduce__(self):
+        return (Abs, (self.var_name, self.var_T, self.body))
 
 class Bound(Term):
     """Bound variable, with de Bruijn index n."""
-    def __init__(self, n):
-        self.ty = Term.BOUND
-        self.n = n
+    __slots__ = ('n',)
+    ty = Term.BOUND
+
+    def __new__(cls, n):
+        t = object.__new__(cls)
+        t.n = n
+        t._hashconsed = False
+        return t
+
+    def __reduce__(self):
+        return (Bound, (self.n,))
 
 def get_svars(t):
     """Returns list of schematic variables in a term or a list of terms."""
@@ -1130,6 +1356,81 @@ def get_stvars(t):
     else:
         raise TypeError
 
+"""Table of canonical terms, keyed by (ty, name, ids of the type and of
+the subterms). Suggested names of bound variables are part of the key, so
+that hash-consing does not change how a term is printed.
+
+"""
+_hashcons_table = weakref.WeakValueDictionary()
+
+"""Table of canonical instances of alpha-equivalence classes, keyed as in
+_hashcons_table but ignoring suggested names of bound variables.
+
+"""
+_alpha_table = weakref.WeakValueDictionary()
+
+def alpha_rep(t):
+    """Return the canonical instance of the alpha-equivalence class of the
+    hash-consed term t.
+
+    """
+    return t if t._alpha_rep is None else t._alpha_rep
+
+def hashcons(t):
+    """Return the canonical instance of the term t.
+
+    Hash-consed terms share all common subterms (and types), and equality
+    between two hash-consed terms is an identity check on the canonical
+    instances of their alpha-equivalence classes. The input is not modified:
+    a fresh instance is created the first time a term is seen. Hash-consed
+    terms must not be modified in place.
+
+    Canonical instances are held weakly, so they are released once no longer
+    referenced. Each canonical instance holds its subterms, hence ids appearing
+    in live keys cannot be reused.
+
+    """
+    if t._hashconsed:
+        return t
+
+    ty = t.ty
+    if ty == Term.COMB:
+        fun, arg = hashcons(t.fun), hashcons(t.arg)
+        key = (ty, id(fun), id(arg))
+        alpha_key = (ty, id(alpha_rep(fun)), id(alpha_rep(arg)))
+    elif ty == Term.ABS:
+        var_T, body = hashcons_type(t.var_T), hashcons(t.body)
+        key = (ty, t.var_name, id(var_T), id(body))
+        alpha_key = (ty, id(var_T), id(alpha_rep(body)))
+    elif ty == Term.BOUND:
+        key = alpha_key = (ty, t.n)
+    else:
+        T = hashcons_type(t.T)
+        key = alpha_key = (ty, t.name, id(T))
+
+    res = _hashcons_table.get(key)
+    if res is None:
+        if ty == Term.SVAR:
+            res = SVar(t.name, T)
+        elif ty == Term.VAR:
+            res = Var(t.name, T)
+        elif ty == Term.CONST:
+            res = Const(t.name, T)
+        elif ty == Term.COMB:
+            res = Comb(fun, arg)
+        elif ty == Term.ABS:
+            res = Abs(t.var_name, var_T, body)
+        else:
+            res = Bound(t.n)
+        res._hashconsed = True
+
+        rep = _alpha_table.get(alpha_key)
+        res._alpha_rep = rep
+        if rep is None:
+            _alpha_table[alpha_key] = res
+        _hashcons_table[key] = res
+    return res
+
 
 true = Const("true", BoolType)
 false = Const("false", BoolType)
@@ -0,0 +1,173 @@
+# Author: Bohua Zhan
+
+"""Discrimination tree indexing terms by their shape.
+
+A term is flattened in preorder into a sequence of keys. Each key records
+the head of a subterm and its number of arguments. Variables, schematic
+variables and abstractions in a pattern (including applied ones) are
+flattened to the wildcard key, which matches any subterm. Looking up a
+term returns every value whose pattern may match the term under
+matcher.first_order_match. The result may contain values whose pattern
+does not match (types are ignored, for example), so the caller should
+still perform matching on the candidates.
+
+When looking up subterms, the head of a subterm applied to only some of
+its arguments is also a position (as in top_conv, which rewrites the
+function part of combinations), so a pattern f t1 ... tk may match a
+subterm f s1 ... sn with k < n.
+
+"""
+
+from kernel.term import Term
+
+
+WILDCARD = '*'
+
+def pattern_keys(pat):
+    """Flatten the pattern pat into a list of keys."""
+    keys = []
+    def rec(t):
+        head, args = t.strip_comb()
+        if head.ty in (Term.SVAR, Term.VAR, Term.ABS):
+            keys.append(WILDCARD)
+        else:
+            if head.is_const():
+                keys.append((Term.CONST, head.name, len(args)))
+            else:
+                keys.append((Term.BOUND, head.n, len(args)))
+            for arg in args:
+                rec(arg)
+
+    rec(pat)
+    return keys
+
+def term_keys(t):
+    """Flatten the term t into a list of keys. Returns the pair (keys, ends),
+    where for the subterm starting at position i, ends[i] is the position
+    after the subterm.
+
+    Unlike patterns, abstractions are flattened to a key followed by the
+    body, so that subterms of the body are also given positions.
+
+    """
+    keys, ends = [], []
+    def rec(t):
+        i = len(keys)
+        keys.append(None)
+        ends.append(None)
+        head, args = t.strip_comb()
+        if head.is_abs():
+            keys[i] = (Term.ABS, len(args))
+            rec(head.body)
+        elif head.is_bound():
+            keys[i] = (Term.BOUND, head.n, len(args))
+        else:
+            keys[i] = (head.ty, head.name, len(args))
+        for arg in args:
+            rec(arg)
+        ends[i] = len(keys)
+
+    rec(t)
+    return keys, ends
+
+
+class TermIndexNode():
+    """Node in the discrimination tree. The node belongs to the index with
+    the given owner, and is copied before modification by other indices.
+
+    """
+    __slots__ = ('owner', 'children', 'values')
+
+    def __init__(self, owner, children=None, values=None):
+        self.owner = owner
+        self.children = children if children is not None else dict()
+        self.values = values if values is not None else []
+
+
+class TermIndex():
+    """Index of values by patterns.
+
+    Copying an index takes constant time: the copy shares the nodes of the
+    tree with the original, and both copy the nodes along the path of an
+    insertion before modifying them.
+
+    """
+    def __init__(self):
+        self.owner = object()
+        self.root = TermIndexNode(self.owner)
+        self.size = 0
+
+    def __copy__(self):
+        res = TermIndex.__new__(TermIndex)
+        res.owner = object()
+        res.root = self.root
+        res.size = self.size
+        # Nodes now shared with the copy should not be modified in place
+        self.owner = object()
+        return res
+
+    def __len__(self):
+        return self.size
+
+    def _own(self, node):
+        if node.owner is self.owner:
+            return node
+        return TermIndexNode(self.owner, dict(node.children), list(node.values))
+
+    def insert(self, pat, value):
+        """Insert value under the pattern pat."""
+        self.root = node = self._own(self.root)
+        for key in pattern_keys(pat):
+            if key in node.children:
+                child = self._own(node.children[key])
+            else:
+                child = TermIndexNode(self.owner)
+            node.children[key] = child
+            node = child
+        node.values.append(value)
+        self.size += 1
+
+    def _lookup(self, keys, ends, start, res, nargs=None):
+        # Walk the tree on the subterm at start, or if nargs is given, on its
+        # head applied to the first nargs arguments, adding values at the end
+        if nargs is None:
+            start_key, stop = keys[start], ends[start]
+        else:
+            start_key, stop = keys[start][:-1] + (nargs,), start + 1
+            for _ in range(nargs):
+                stop = ends[stop]
+        stack = [(self.root, start)]
+        while stack:
+            node, i = stack.pop()
+            if i == stop:
+                res.update(node.values)
+                continue
+            key, end = (start_key, stop) if i == start else (keys[i], ends[i])
+            if WILDCARD in node.children:
+                stack.append((node.children[WILDCARD], end))
+            if key in node.children:
+                stack.append((node.children[key], i + 1))
+
+    def lookup(self, t):
+        """Return the set of values whose pattern may match t."""
+        keys, ends = term_keys(t)
+        res = set()
+        self._lookup(keys, ends, 0, res)
+        return res
+
+    def lookup_subterms(self, t):
+        """Return the set of values whose pattern may match some subterm
+        of t (including subterms of bodies of abstractions, and heads of
+        combinations applied to some of their arguments).
+
+        """
+        keys, ends = term_keys(t)
+        res = set()
+        for start in range(len(keys)):
+            self._lookup(keys, ends, start, res)
+            # Applied abstractions are only matched by wildcards, which
+            # are found above
+            if keys[start][0] != Term.ABS:
+                for nargs in range(keys[start][-1]):
+                    self._lookup(keys, ends, start, res, nargs)
+        return res
@@ -0,0 +1,96 @@
+# Author: Bohua Zhan
+
+import unittest
+from copy import copy
+
+from kernel.type import TVar, TFun
+from kernel.term import SVar, Var, Const, Abs, Bound
+from kernel.term_index import TermIndex
+
+Ta = TVar("a")
+Taa = TFun(Ta, Ta)
+Taaa = TFun(Ta, Ta, Ta)
+f = Const("f", Taa)
+g = Const("g", Taaa)
+c = Const("c", Ta)
+d = Const("d", Ta)
+x = Var("x", Ta)
+sx = SVar("x", Ta)
+sy = SVar("y", Ta)
+sh = SVar("h", Taa)
+
+
+class TermIndexTest(unittest.TestCase):
+    def testLookup(self):
+        index = TermIndex()
+        index.insert(f(sx), 1)
+        index.insert(g(sx, c), 2)
+        index.insert(g(f(sx), sy), 3)
+        index.insert(sh(c), 4)
+        index.insert(Abs("x", Ta, f(Bound(0))), 5)
+        index.insert(x, 6)
+
+        test_data = [
+            (f(c), {1, 4, 5, 6}),
+            (g(d, c), {2, 4, 5, 6}),
+            (g(f(c), d), {3, 4, 5, 6}),
+            (g(d, d), {4, 5, 6}),
+            (c, {4, 5, 6}),
+        ]
+
+        for t, res in test_data:
+            self.assertEqual(index.lookup(t), res)
+
+    def testLookupSubterms(self):
+        index = TermIndex()
+        index.insert(f(sx), 1)
+        index.insert(g(sx, c), 2)
+        index.insert(g(f(sx), sy), 3)
+
+        test_data = [
+            (g(d, d), set()),
+            (g(d, f(c)), {1}),
+            (f(g(d, c)), {1, 2}),
+            (Abs("x", Ta, g(f(Bound(0)), d)), {1, 3}),
+        ]
+
+        for t, res in test_data:
+            self.assertEqual(index.lookup_subterms(t), res)
+
+    def testLookupPartial(self):
+        index = TermIndex()
+        index.insert(g(c), 1)
+        index.insert(g, 2)
+        index.insert(f, 3)
+        index.insert(g(sx), 4)
+        index.insert(g(d), 5)
+
+        test_data = [
+            (g(c, d), {1, 2, 4}),
+            (f(g(d, c)), {2, 3, 4, 5}),
+            (Abs("x", Ta, g(Bound(0), c)), {2, 4}),
+            (c, set()),
+        ]
+
+        for t, res in test_data:
+            self.assertEqual(index.lookup_subterms(t), res)
+
+        # Whole terms only match patterns with all arguments
+        self.assertEqual(index.lookup(g(c, d)), set())
+
+    def testCopy(self):
+        index = TermIndex()
+        index.insert(f(sx), 1)
+        index2 = copy(index)
+        index.insert(f(sx), 2)
+        index2.insert(g(sx, sy), 3)
+
+        self.assertEqual(index.lookup(f(c)), {1, 2})
+        self.assertEqual(index.lookup(g(c, c)), set())
+        self.assertEqual(index2.lookup(f(c)), {1})
+        self.assertEqual(index2.lookup(g(c, c)), {3})
+        self.assertEqual((len(index), len(index2)), (2, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 # Author: Bohua Zhan
 
 import unittest
+import pickle
 
 from kernel import type as hol_type
 from kernel.type import STVar, TVar, TFun, TyInst
@@ -136,6 +137,60 @@ class TermTest(unittest.TestCase):
         for t, res in test_data:
             self.assertEqual(t.subst(Inst(a=c)), res)
 
+    def testSubstShared(self):
+        t = f2(f(SVar('a', Ta)), g(a))
+        res = t.subst(Inst(a=c))
+        self.assertEqual(res, f2(f(c), g(a)))
+        self.assertIs(res.arg, t.arg)
+        self.assertIs(t.subst(Inst(b=c)), t)
+
+        t = Var('f', TFun(STa, Tb))(g(a))
+        res = t.subst_type(TyInst(a=Ta))
+        self.assertEqual(res, f(g(a)))
+        self.assertIs(res.arg, t.arg)
+
+    def testPickle(self):
+        t = Abs("x", Ta, f2(B0, SVar("a", Ta)))(Const("c", TFun(Tb, Ta))(b))
+        t2 = pickle.loads(pickle.dumps(t))
+        self.assertEqual(repr(t2), repr(t))
+        self.assertEqual(t2.get_type(), Tb)
+
+    def testFlags(self):
+        test_data = [
+            (a, False, False, False),
+            (SVar('a', Ta), True, False, False),
+            (Var('a', STa), False, True, False),
+            (f(B0), False, False, True),
+            (Abs("x", Ta, f(B0)), False, False, False),
+            (Abs("x", STa, "y", Ta, f2(B1, SVar('a', Ta))), True, True, False),
+            (Abs("x", Ta, f2(Bound(1), B0)), False, False, True),
+        ]
+
+        for t, has_svar, has_stvar, is_open in test_data:
+            self.assertEqual(t.has_svar(), has_svar)
+            self.assertEqual(t.has_stvar(), has_stvar)
+            self.assertEqual(t.is_open(), is_open)
+
+    def testIsBetaNormal(self):
+        test_data = [
+            (a, True),
+            (f(Abs("x", Ta, B0)), True),
+            (Abs("x", Ta, f(B0))(a), False),
+            (f(Abs("x", Ta, f(B0))(a)), False),
+            (Abs("y", Ta, Abs("x", Ta, f2(B0, B1))(B0)), False),
+            (Abs("x", Ta, f2(Bound(1), B0)), True),
+        ]
+
+        for t, res in test_data:
+            self.assertEqual(t.is_beta_normal(), res)
+            self.assertEqual(t.beta_norm().is_beta_normal(), True)
+
+    def testFlagsInplace(self):
+        t = Abs("x", STa, f(Var('a', STa)))
+        self.assertTrue(t.has_stvar())
+        t.subst_type_inplace(TyInst(a=Ta))
+        self.assertFalse(t.has_stvar())
+
     def testSubstFail(self):
         self.assertRaises(TermException, SVar('a', TVar('a')).subst, Inst(a=b))
 
@@ -181,6 +236,20 @@ class TermTest(unittest.TestCase):
         for t, res in test_data:
             self.assertEqual(t.beta_norm(), res)
 
+    def testBetaNormOpen(self):
+        test_data = [
+            # Loose bound variables in the argument are shifted under abstractions
+            (Abs("x", Ta, Abs("y", Ta, f2(B1, B0)))(B0), Abs("y", Ta, f2(B1, B0))),
+            (Abs("y", Ta, Abs("x", Ta, f2(B0, B1))(g(B0))), Abs("y", Ta, f2(g(B0), B0))),
+            # Loose bound variables in the function body
+            (Abs("x", Ta, f2(B0, B1))(a), f2(a, B0)),
+            # Normal terms are returned unchanged
+            (Abs("x", Ta, f2(B0, B1)), Abs("x", Ta, f2(B0, B1))),
+        ]
+
+        for t, res in test_data:
+            self.assertEqual(repr(t.beta_norm()), repr(res))
+
     def testOccursVar(self):
         test_data = [
             (a, a, True),
@@ -341,6 +410,29 @@ class TermTest(unittest.TestCase):
         for n, b in test_data:
             self.assertEqual(n.is_binary(), b)
 
+    def testSlots(self):
+        for t in (a, c, f(a), Abs("x", Ta, B0), B0, SVar("x", Ta)):
+            self.assertFalse(hasattr(t, '__dict__'))
+
+    def testHashcons(self):
+        t1 = term.hashcons(f2(g(a), g(a)))
+        t2 = term.hashcons(f2(g(a), g(a)))
+        self.assertIs(t1, t2)
+        self.assertIs(t1.arg, t1.fun.arg)
+        self.assertEqual(t1, f2(g(a), g(a)))
+        self.assertNotEqual(t1, term.hashcons(f2(g(a), a)))
+
+    def testHashconsAlpha(self):
+        # Suggested names are kept, but alpha-equivalent terms are equal
+        t1 = term.hashcons(Abs("x", Ta, f(B0)))
+        t2 = term.hashcons(Abs("y", Ta, f(B0)))
+        self.assertIsNot(t1, t2)
+        self.assertEqual(t1.var_name, "x")
+        self.assertEqual(t2.var_name, "y")
+        self.assertEqual(t1, t2)
+        self.assertEqual(term.hashcons(f(t1)), term.hashcons(f(t2)))
+        self.assertNotEqual(t1, term.hashcons(Abs("x", Tb, f(B0))))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -5,7 +5,7 @@ import unittest
 from kernel.type import TConst, TVar, STVar, TFun, BoolType
 from kernel.term import Term, SVar, Var, Const, Comb, Abs, Bound, Implies, Eq, Inst, TyInst
 from kernel.thm import Thm
-from kernel.proof import Proof, ItemID
+from kernel.proof import Proof, ProofItem, ItemID
 from kernel import theory
 from kernel.theory import Theory, TheoryException, CheckProofException
 from kernel import extension
@@ -229,6 +229,36 @@ class TheoryTest(unittest.TestCase):
         self.assertEqual(theory.check_proof(prf, rpt), Thm([], B))
         self.assertEqual(rpt.gaps, [Thm([], Implies(A, B)), Thm([], A)])
 
+    def testCheckProofIncremental(self):
+        """Incremental check after editing the proof."""
+        prf = Proof(Eq(x,y), Eq(y,z))
+        prf.add_item(2, "transitive", prevs=[0, 1])
+        prf.add_item(3, "symmetric", prevs=[2])
+
+        rpt = ProofReport()
+        self.assertEqual(theory.check_proof(prf, rpt, incremental=True), Thm([Eq(x,y), Eq(y,z)], Eq(z,x)))
+        self.assertEqual(rpt.steps, 4)
+        records = [item.check_record for item in prf.items]
+        self.assertTrue(all(rec is not None for rec in records))
+
+        # Unchanged proof: report is replayed from the records
+        rpt = ProofReport()
+        theory.check_proof(prf, rpt, incremental=True)
+        self.assertEqual(rpt.steps, 4)
+        self.assertEqual([item.check_record for item in prf.items], records)
+
+        # Adding a line renumbers later items, but keeps their records
+        prf.items.insert(2, ProofItem(2, "reflexive", args=f))
+        for item in prf.items[3:]:
+            item.incr_proof_item(ItemID(2), 1)
+        theory.check_proof(prf, incremental=True)
+        self.assertEqual([item.check_record for item in prf.items[3:]], records[2:])
+
+        # Changing an item rechecks the items depending on it
+        prf.items[1] = ProofItem(1, "assume", args=Eq(y,x))
+        self.assertRaisesRegex(CheckProofException, "output does not match",
+                               theory.check_proof, prf, incremental=True)
+
     def testUncheckedExtend(self):
         """Unchecked extension."""
         id_const = Const("id", TFun(Ta,Ta))
@@ -245,6 +275,32 @@ class TheoryTest(unittest.TestCase):
         self.assertEqual(theory.get_theorem("id_def", svar=False), Thm([], Eq(id_const, id_def)))
         self.assertEqual(theory.get_theorem("id.simps", svar=False), Thm([], Eq(id_const, x)))
 
+    def testIndexAttribute(self):
+        """Theorems with hint attributes are added to the indices."""
+        id_const = Const("id", TFun(Ta,Ta))
+        g = Const("g", TFun(Ta,Ta))
+
+        exts = [
+            extension.Constant("id", TFun(Ta, Ta)),
+            extension.Constant("g", TFun(Ta, Ta)),
+            extension.Theorem("id.simps", Thm([], Eq(id_const(x), x))),
+            extension.Attribute("id.simps", "hint_rewrite"),
+            extension.Attribute("id.simps", "hint_backward"),
+            extension.Theorem("g_id", Thm([], Implies(Eq(g(x), y), Eq(id_const(x), y)))),
+            extension.Attribute("g_id", "hint_forward"),
+        ]
+        theory.thy.unchecked_extend(exts)
+
+        rewrite_index = theory.thy.get_data("rewrite_index")
+        self.assertEqual(rewrite_index.lookup_subterms(g(id_const(z))), {("id.simps", False)})
+        self.assertEqual(rewrite_index.lookup_subterms(g(z)), set())
+        backward_index = theory.thy.get_data("backward_index")
+        self.assertEqual(backward_index.lookup(Eq(id_const(z), z)), {("id.simps", "hint_backward")})
+        self.assertEqual(backward_index.lookup(Eq(g(z), z)), set())
+        forward_index = theory.thy.get_data("forward_index")
+        self.assertEqual(forward_index.lookup(Eq(g(z), z)), {"g_id"})
+        self.assertEqual(forward_index.lookup(Eq(id_const(z), z)), set())
+
     def testCheckedExtend(self):
         """Checked extension: adding an axiom."""
         id_simps = Eq(Comb(Const("id", TFun(Ta,Ta)), x), x)
@@ -2,7 +2,7 @@
 
 import unittest
 
-from kernel.type import STVar, TVar, TConst, TFun, BoolType, TyInst, TypeMatchException
+from kernel.type import STVar, TVar, TConst, TFun, BoolType, TyInst, TypeMatchException, hashcons_type
 from syntax.settings import global_setting
 
 Ta = TVar("a")
@@ -70,6 +70,24 @@ class TypeTest(unittest.TestCase):
         for T, res in test_data:
             self.assertEqual(T.subst(TyInst(a=Tb, b=Ta)), res)
 
+    def testSubstShared(self):
+        T = TFun(TConst("list", Ta), STa)
+        res = T.subst(TyInst(a=Tb))
+        self.assertEqual(res, TFun(TConst("list", Ta), Tb))
+        self.assertIs(res.args[0], T.args[0])
+        self.assertIs(T.subst(TyInst(b=Tb)), T)
+
+    def testHasSTVar(self):
+        test_data = [
+            (STa, True),
+            (Ta, False),
+            (TFun(Ta, Tb), False),
+            (TFun(Ta, TConst("list", STa)), True),
+        ]
+
+        for T, res in test_data:
+            self.assertEqual(T.has_stvar(), res)
+
     def testMatch(self):
         test_data = [
             (STa, Tb, {"a" : Tb}),
@@ -110,6 +128,18 @@ class TypeTest(unittest.TestCase):
         for T, res in test_data:
             self.assertEqual(T.get_tsubs(), res)
 
+    def testSlots(self):
+        for T in (Ta, STa, TFun(Ta, Tb), BoolType):
+            self.assertFalse(hasattr(T, '__dict__'))
+
+    def testHashconsType(self):
+        T1 = hashcons_type(TFun(Ta, TConst("list", Tb)))
+        T2 = hashcons_type(TFun(Ta, TConst("list", Tb)))
+        self.assertIs(T1, T2)
+        self.assertIs(T1.args[0], hashcons_type(Ta))
+        self.assertEqual(T1, TFun(Ta, TConst("list", Tb)))
+        self.assertNotEqual(T1, hashcons_type(TFun(Ta, TConst("list", Ta))))
+
 
 if __name__ == "__main__":
     unittest.main()
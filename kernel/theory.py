@@ -5,11 +5,14 @@ from typing import Tuple
 import contextlib
 
 from kernel.type import Type, TVar, TFun, BoolType, TypeMatchException
+from kernel import term
 from kernel.term import Term, Var, TypeCheckException
 from kernel.thm import Thm, primitive_deriv, InvalidDerivationException
-from kernel.proof import Proof, ProofStateException
+from kernel.proof import Proof, ProofStateException, CheckRecord
 from kernel import extension
-from kernel.report import ExtensionReport
+from kernel.term_index import TermIndex
+from kernel.report import ProofReport, ExtensionReport
+from util import solver_cache
 
 
 class TheoryException(Exception):
@@ -178,6 +181,8 @@ class Theory():
             raise TypeError
 
         self.add_data("theorems", name, th)
+        for attribute in self.get_attributes(name):
+            self.index_attribute(name, attribute)
 
     def has_theorem(self, name):
         """Returns whether the current theory contains the given theorem."""
@@ -205,6 +210,8 @@ class Theory():
             data_svar = self.get_data("theorems_svar")
             if name not in data_svar:
                 data_svar[name] = Thm.convert_svar(data[name])
+                if term.use_hashcons:
+                    data_svar[name] = data_svar[name].hashcons()
             return data_svar[name]
         else:
             return data[name]
@@ -215,6 +222,38 @@ class Theory():
         if name in self.data['attributes']:
             old_attributes = self.data['attributes'][name]
         self.data['attributes'][name] = old_attributes + (attribute,)
+        if self.has_theorem(name):
+            self.index_attribute(name, attribute)
+
+    def index_attribute(self, name, attribute):
+        """Add the theorem with the given name to the index for the
+        attribute, if there is one. The indices are used to find candidate
+        theorems when searching for proof steps (see TermIndex).
+
+        rewrite_index -- theorems with attribute hint_rewrite (resp.
+        hint_rewrite_sym), indexed by the left (resp. right) side of the
+        conclusion, with values (name, sym).
+
+        backward_index -- theorems with attribute hint_backward or
+        hint_backward1, indexed by the conclusion, with values
+        (name, attribute).
+
+        forward_index -- theorems with attribute hint_forward, indexed by
+        the first assumption, with values name.
+
+        """
+        if attribute in ('hint_rewrite', 'hint_rewrite_sym'):
+            _, C = self.get_theorem(name, svar=False).prop.strip_implies()
+            if C.is_equals():
+                sym = attribute == 'hint_rewrite_sym'
+                self.get_data("rewrite_index").insert(C.rhs if sym else C.lhs, (name, sym))
+        elif attribute in ('hint_backward', 'hint_backward1'):
+            _, C = self.get_theorem(name, svar=False).prop.strip_implies()
+            self.get_data("backward_index").insert(C, (name, attribute))
+        elif attribute == 'hint_forward':
+            As, _ = self.get_theorem(name, svar=False).prop.strip_implies()
+            if As:
+                self.get_data("forward_index").insert(As[0], name)
 
     def get_attributes(self, name):
         """Get the list of attributes for the given theorem."""
@@ -303,7 +342,45 @@ class Theory():
         else:
             raise TypeError
 
-    def _check_proof_item(self, prf, seq, rpt, no_gaps, compute_only, check_level):
+    def _get_prev_ths(self, prf, seq):
+        """Return the tuple of theorems of the previous items of seq, or
+        None if some of them cannot be used.
+
+        """
+        prev_ths = []
+        for prev in seq.prevs:
+            if not seq.id.can_depend_on(prev):
+                return None
+            try:
+                prev_th = prf.find_item(prev).th
+            except ProofStateException:
+                return None
+            if prev_th is None:
+                return None
+            prev_ths.append(prev_th)
+        return tuple(prev_ths)
+
+    def _is_checked(self, prf, seq, check_level):
+        """Whether seq is unchanged since its last successful check.
+
+        The inputs of a check are the rule, arguments and expected theorem
+        of seq (compared by identity, as they are only replaced and never
+        modified), the theorems of its previous items (compared by value,
+        so renumbering of ids and rechecking of earlier items to the same
+        result do not invalidate the check), the theory and check_level.
+
+        """
+        rec = seq.check_record
+        if rec is None or rec.thy is not self or rec.check_level != check_level:
+            return False
+        if rec.rule != seq.rule or rec.args is not seq.args or rec.th is not seq.th:
+            return False
+        prev_ths = self._get_prev_ths(prf, seq)
+        if prev_ths is None or len(prev_ths) != len(rec.prev_ths):
+            return False
+        return all(th1 is th2 or th1 == th2 for th1, th2 in zip(prev_ths, rec.prev_ths))
+
+    def _check_proof_item(self, prf, seq, rpt, no_gaps, compute_only, check_level, incremental=False):
         """Check a single proof item.
 
         prf -- proof to be checked.
@@ -313,6 +390,8 @@ class Theory():
         compute_only -- only executes rule if theorem is not present.
         check_level -- trust level for proof checking. Trust all macros
             with macro.level <= self.check_level.
+        incremental -- skip items that are unchanged since their last
+            successful check (see _is_checked).
         
         """
         if seq.rule == "":
@@ -333,7 +412,26 @@ class Theory():
             # subproofs still need to be checked.
             if seq.rule == "subproof":
                 for s in seq.subproof.items:
-                    self._check_proof_item(prf, s, rpt, no_gaps, compute_only, check_level)
+                    self._check_proof_item(prf, s, rpt, no_gaps, compute_only, check_level, incremental)
+            return None
+
+        if incremental and seq.rule != "subproof":
+            # Replay the report of the last check if nothing changed.
+            # Otherwise check the item and record the result. Items of a
+            # subproof are recorded individually.
+            if self._is_checked(prf, seq, check_level):
+                if rpt is not None:
+                    rpt.merge(seq.check_record.rpt)
+                return None
+
+            seq.check_record = None
+            item_rpt = ProofReport()
+            try:
+                self._check_proof_item(prf, seq, item_rpt, no_gaps, compute_only, check_level)
+            finally:
+                if rpt is not None:
+                    rpt.merge(item_rpt)
+            seq.check_record = CheckRecord(self, seq, self._get_prev_ths(prf, seq), check_level, item_rpt)
             return None
 
         if seq.rule == "theorem":
@@ -350,7 +448,7 @@ class Theory():
             res_th = Thm.mk_VAR(Var(nm, T))
         elif seq.rule == "subproof":
             for s in seq.subproof.items:
-                self._check_proof_item(prf, s, rpt, no_gaps, compute_only, check_level)
+                self._check_proof_item(prf, s, rpt, no_gaps, compute_only, check_level, incremental)
             res_th = seq.subproof.items[-1].th
         else:
             # Otherwise, apply one of the proof methods. First, we
@@ -391,9 +489,11 @@ class Theory():
                 assert macro.level is None or (isinstance(macro.level, int) and macro.level >= 0), \
                     ("check_proof: invalid macro level " + str(macro.level))
                 if macro.level is not None and macro.level <= check_level:
+                    hits, misses = solver_cache.thread_counts()
                     res_th = macro.eval(seq.args, prev_ths)
                     if rpt is not None:
-                        rpt.eval_macro(seq.rule)
+                        new_hits, new_misses = solver_cache.thread_counts()
+                        rpt.eval_macro(seq.rule, new_hits - hits, new_misses - misses)
                 else:
                     seq.subproof = macro.expand(seq.id, seq.args, list(zip(seq.prevs, prev_ths)))
                     if rpt is not None:
@@ -405,6 +505,13 @@ class Theory():
             else:
                 raise CheckProofException("proof method not found: " + seq.rule)
 
+        if term.use_hashcons:
+            # Share subterms with earlier theorems, so comparisons below and
+            # in later items reduce to identity checks.
+            res_th = res_th.hashcons()
+            if seq.th is not None:
+                seq.th = seq.th.hashcons()
+
         if seq.th is None:
             # No expected theorem is provided
             seq.th = res_th
@@ -421,17 +528,21 @@ class Theory():
 
         return None
 
-    def check_proof(self, prf, rpt=None, *, no_gaps=False, compute_only=False, check_level=0):
+    def check_proof(self, prf, rpt=None, *, no_gaps=False, compute_only=False, check_level=0,
+                    incremental=False):
         """Verify the given proof object. Returns the final theorem if check
         passes. Otherwise throws CheckProofException.
 
         prf -- proof to be checked.
         rpt -- report for proof-checking. Modified by the function.
+        incremental -- only check items whose inputs changed since the
+            last check of the same proof. Used when a proof is checked
+            again after each edit.
         
         """
         assert isinstance(prf, Proof), "check_proof"
         for seq in prf.items:
-            self._check_proof_item(prf, seq, rpt, no_gaps, compute_only, check_level)
+            self._check_proof_item(prf, seq, rpt, no_gaps, compute_only, check_level, incremental)
 
         return prf.items[-1].th
 
@@ -524,6 +635,9 @@ def EmptyTheory():
     thy.add_data_type("theorems_svar")  # cache of version of theorem with SVar.
     thy.add_data_type("attributes")
     thy.add_data_type("overload")
+    thy.add_data_type("rewrite_index", TermIndex())  # see Theory.index_attribute.
+    thy.add_data_type("backward_index", TermIndex())
+    thy.add_data_type("forward_index", TermIndex())
 
     # Fundamental types.
     thy.add_type_sig("bool", 0)
@@ -559,8 +673,9 @@ def print_theorem(*args):
     for name in args:
         print('%s: %s' % (name, get_theorem(name, svar=False)))
 
-def check_proof(prf, rpt=None, *, no_gaps=False, compute_only=False, check_level=0):
-    return thy.check_proof(prf, rpt, no_gaps=no_gaps, compute_only=compute_only, check_level=check_level)
+def check_proof(prf, rpt=None, *, no_gaps=False, compute_only=False, check_level=0, incremental=False):
+    return thy.check_proof(prf, rpt, no_gaps=no_gaps, compute_only=compute_only, check_level=check_level,
+                           incremental=incremental)
 
 
 """Global store of macros. Keys are names of the macros,
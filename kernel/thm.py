@@ -82,6 +82,15 @@ class Thm():
         assert isinstance(other, Thm), "cannot compare Thm with %s" % str(type(other))
         return set(self.hyps) == set(other.hyps) and self.prop == other.prop
 
+    def hashcons(self):
+        """Return the same theorem, with hypotheses and proposition
+        replaced by their canonical instances (see term.hashcons).
+
+        """
+        if self.prop._hashconsed and all(hyp._hashconsed for hyp in self.hyps):
+            return self
+        return Thm([term.hashcons(hyp) for hyp in self.hyps], term.hashcons(self.prop))
+
     def check_thm_type(self):
         """Make sure the all hypotheses and proposition type-check and
         have type boolean.
@@ -1,6 +1,7 @@
 # Author: Bohua Zhan
 
 from collections import UserDict
+import weakref
 
 from kernel import term_ord
 from util import typecheck
@@ -84,20 +85,32 @@ class Type():
     nat list list: list of lists of natural numbers.
 
     """
-    # ty values for distinguishing between Type objects.
+    # ty values for distinguishing between Type objects. The value is
+    # stored on each subclass rather than on each instance.
     STVAR, TVAR, TCONST = range(3)
 
-    def __init__(self, arg):
-        if not isinstance(arg, Type):
-            if type_parser is not None:
-                T = type_parser(arg)
-            else:
-                raise TypeException('Type: parser not found.')
-        else:
-            T = arg
+    # Types are stored in slots to save memory, as a large number of them
+    # are kept alive by theories and proof states. Fields specific to each
+    # kind of type are declared on the subclasses, which also define
+    # __reduce__ for pickling (memoized fields are not pickled).
+    #
+    # _hash_val: memoized hash value, set on first call to __hash__.
+    # _hashconsed: whether the type is the canonical instance returned by
+    # hashcons_type.
+    # _has_stvar: memoized result of has_stvar.
+    __slots__ = ('name', '_hash_val', '_hashconsed', '_has_stvar', '__weakref__')
+
+    def __new__(cls, arg):
+        """Parse the given string into a type."""
+        if isinstance(arg, Type):
+            return arg
+        if type_parser is None:
+            raise TypeException('Type: parser not found.')
+        return type_parser(arg)
 
-        # Now copy the content of T onto self
-        self.__dict__.update(T.__dict__)
+    def __copy__(self):
+        """Types are never modified in place, so copies are shared."""
+        return self
 
     def is_stvar(self):
         """Return whether self is a schematic type variable."""
@@ -180,15 +193,17 @@ class Type():
             raise TypeError
 
     def __hash__(self):
-        if not hasattr(self, "_hash_val"):
+        try:
+            return self._hash_val
+        except AttributeError:
             if self.is_stvar():
                 self._hash_val = hash(("STVAR", self.name))
-            if self.is_tvar():
+            elif self.is_tvar():
                 self._hash_val = hash(("TVAR", self.name))
             elif self.is_tconst():
                 self._hash_val = hash(("TCONST", self.name, tuple(hash(arg) for arg in self.args)))
-        return self._hash_val
-    
+            return self._hash_val
+
     def __eq__(self, other):
         if other is None:
             return False
@@ -197,6 +212,10 @@ class Type():
         if id(self) == id(other):
             return True
 
+        # Distinct canonical instances are never equal.
+        if self._hashconsed and other._hashconsed:
+            return False
+
         if self.ty != other.ty:
             return False
         elif self.is_stvar() or self.is_tvar():
@@ -248,15 +267,18 @@ class Type():
         """
         if tyinst is None:
             tyinst = TyInst(**kwargs)
-        if self.is_stvar():
+        if not self.has_stvar():
+            return self
+        elif self.is_stvar():
             if self.name in tyinst:
                 return tyinst[self.name]
             else:
                 return self
-        elif self.is_tvar():
-            return self
         elif self.is_tconst():
-            return TConst(self.name, *(T.subst(tyinst) for T in self.args))
+            args = tuple(T.subst(tyinst) for T in self.args)
+            if all(T is arg for T, arg in zip(args, self.args)):
+                return self
+            return TConst(self.name, *args)
         else:
             raise TypeError
 
@@ -298,16 +320,38 @@ class Type():
         self.match_incr(T, tyinst)
         return tyinst
 
+    def has_stvar(self):
+        """Whether the type contains schematic type variables.
+
+        The result is memoized, so subst and get_stvars return immediately
+        on types without schematic type variables.
+
+        """
+        try:
+            return self._has_stvar
+        except AttributeError:
+            if self.is_stvar():
+                self._has_stvar = True
+            elif self.is_tvar():
+                self._has_stvar = False
+            elif self.is_tconst():
+                self._has_stvar = any(arg.has_stvar() for arg in self.args)
+            else:
+                raise TypeError
+            return self._has_stvar
+
     def get_stvars(self):
         """Return the list of schematic type variables."""
         def collect(T):
-            if T.is_stvar():
-                return [T]
-            elif T.is_tvar():
+            if not T.has_stvar():
                 return []
+            elif T.is_stvar():
+                return [T]
             else:
                 return sum([collect(arg) for arg in T.args], [])
 
+        if not self.has_stvar():
+            return []
         return term_ord.sorted_typs(collect(self))
 
     def get_tvars(self):
@@ -348,22 +392,84 @@ class Type():
 
 class STVar(Type):
     """Schematic type variable."""
-    def __init__(self, name):
-        self.ty = Type.STVAR
-        self.name = name
+    __slots__ = ()
+    ty = Type.STVAR
+
+    def __new__(cls, name):
+        T = object.__new__(cls)
+        T.name = name
+        T._hashconsed = False
+        return T
+
+    def __reduce__(self):
+        return (STVar, (self.name,))
 
 class TVar(Type):
     """Type variable."""
-    def __init__(self, name):
-        self.ty = Type.TVAR
-        self.name = name
+    __slots__ = ()
+    ty = Type.TVAR
+
+    def __new__(cls, name):
+        T = object.__new__(cls)
+        T.name = name
+        T._hashconsed = False
+        return T
+
+    def __reduce__(self):
+        return (TVar, (self.name,))
 
 class TConst(Type):
     """Type constant, applied to a list of arguments."""
-    def __init__(self, name, *args):
-        self.ty = Type.TCONST
-        self.name = name
-        self.args = args
+    __slots__ = ('args',)
+    ty = Type.TCONST
+
+    def __new__(cls, name, *args):
+        T = object.__new__(cls)
+        T.name = name
+        T.args = args
+        T._hashconsed = False
+        return T
+
+    def __reduce__(self):
+        return (TConst, (self.name,) + self.args)
+
+"""Table of canonical types, keyed by (ty, name, ids of arguments).
+
+Values are held weakly, so a canonical type is released as soon as no
+term or type refers to it. Each canonical type holds its arguments,
+hence ids appearing in live keys cannot be reused.
+
+"""
+_hashcons_table = weakref.WeakValueDictionary()
+
+def hashcons_type(T):
+    """Return the canonical instance of the type T.
+
+    Two hash-consed types are equal if and only if they are the same
+    object. The input is not modified: a fresh instance is created the
+    first time a type is seen.
+
+    """
+    if T._hashconsed:
+        return T
+
+    if T.ty == Type.TCONST:
+        args = tuple([hashcons_type(arg) for arg in T.args])
+        key = (T.ty, T.name, tuple([id(arg) for arg in args]))
+    else:
+        key = (T.ty, T.name)
+
+    res = _hashcons_table.get(key)
+    if res is None:
+        if T.ty == Type.STVAR:
+            res = STVar(T.name)
+        elif T.ty == Type.TVAR:
+            res = TVar(T.name)
+        else:
+            res = TConst(T.name, *args)
+        res._hashconsed = True
+        _hashcons_table[key] = res
+    return res
 
 def TFun(*args):
     """Returns the function type arg1 => arg2 => ... => argn."""
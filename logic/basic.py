@@ -1,7 +1,13 @@
 # Author: Bohua Zhan
 
 import os
+import io
+import sys
+import glob
 import json
+import pickle
+import hashlib
+from copy import copy
 
 from kernel import term
 from kernel.term import Var
@@ -18,7 +24,8 @@ Cache of parsed theories.
 The dictionary is indexed by user, and then by theory name.
 
 Each theory stores a 'timestamp' field, for the last modification
-time of the corresponding file.
+time of the corresponding file, and a 'hash' field, identifying the
+content of the file and of all imported theories.
 
 In the contents, instead of each item is the parsed item as
 well as the corresponding extension.
@@ -26,6 +33,55 @@ well as the corresponding extension.
 """
 theory_cache = dict()
 
+"""
+On-disk cache of parsed theories.
+
+The parsed content of each theory is pickled to disk_cache_dir, in a
+directory for each user. This is kept in the library directory of the
+repository, rather than in the directory of the user, which may be written
+through the server. Each entry is validated by a hash of the json file of
+the theory and the hashes of all imported theories, so the cache is updated
+when any of them changes, and by a hash of the sources of the modules
+defining and parsing items (see source_hash), so it is also updated when
+the representation of items, terms or types changes. DISK_CACHE_VERSION
+can be increased to invalidate all entries.
+
+Entries are read with DiskCacheUnpickler, which only constructs terms,
+types, items and exceptions, so a modified entry cannot run other code.
+
+"""
+DISK_CACHE_VERSION = 2
+
+use_disk_cache = True
+
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+disk_cache_dir = os.path.join(_root_dir, 'library', '.cache', 'theories')
+
+# Source files whose changes invalidate the on-disk cache.
+disk_cache_sources = ['kernel/*.py', 'syntax/*.py', 'logic/basic.py', 'logic/context.py', 'server/items.py']
+
+_source_hash = None
+
+"""
+Cache of theory snapshots.
+
+The dictionary is indexed by user, and then by (theory name, limit),
+where limit is as in load_theory. Each value is a pair (hashes, thy), where
+hashes are the hashes of the theory and all imported theories (see
+theory_cache) when the snapshot was taken, and thy is the theory loaded
+up to limit. Snapshots are never modified: load_theory sets theory.thy
+to a copy.
+
+Snapshots for limit None and 'start' are kept for every theory loaded.
+At most MAX_LIMIT_SNAPSHOTS snapshots for other limits are kept for each
+user, with the least recently used discarded first.
+
+"""
+theory_snapshots = dict()
+
+MAX_LIMIT_SNAPSHOTS = 16
+
 """
 Cache of item mapping.
 
@@ -52,6 +108,86 @@ def user_file(filename, username="master"):
     else:
         return './users/' + username + '/' + filename + '.json'
 
+def cache_file(filename, username="master"):
+    """Return the file of the on-disk cache for the given filename."""
+    return os.path.join(disk_cache_dir, username, filename + '.pickle')
+
+def source_hash():
+    """Hash of the files in disk_cache_sources, computed once."""
+    global _source_hash
+    if _source_hash is None:
+        h = hashlib.sha256()
+        for pattern in disk_cache_sources:
+            for path in sorted(glob.glob(os.path.join(_root_dir, pattern))):
+                h.update(os.path.relpath(path, _root_dir).encode('utf-8'))
+                with open(path, 'rb') as f:
+                    h.update(hashlib.sha256(f.read()).digest())
+        _source_hash = h.hexdigest()
+    return _source_hash
+
+class DiskCacheUnpickler(pickle.Unpickler):
+    """Unpickler for the on-disk cache. Only the classes of terms, types
+    and items in allowed_classes, and exceptions defined in modules of this
+    repository that are already loaded, are allowed. Names are checked
+    before they are looked up, so no module is imported.
+
+    """
+    allowed_classes = {
+        'kernel.term': ('SVar', 'Var', 'Const', 'Comb', 'Abs', 'Bound'),
+        'kernel.type': ('STVar', 'TVar', 'TConst'),
+        'server.items': ('Constant', 'Axiom', 'Theorem', 'Definition', 'Fun',
+                         'Inductive', 'AxType', 'Datatype', 'Header'),
+    }
+    exception_packages = ('kernel', 'logic', 'syntax', 'server')
+
+    def find_class(self, module, name):
+        if name in self.allowed_classes.get(module, ()):
+            return super().find_class(module, name)
+        if module.split('.')[0] in self.exception_packages and module in sys.modules:
+            cls = getattr(sys.modules[module], name, None)
+            if isinstance(cls, type) and issubclass(cls, Exception):
+                return cls
+        raise pickle.UnpicklingError("read_disk_cache: %s.%s is not allowed" % (module, name))
+
+def read_disk_cache(filename, username, content_hash):
+    """Return the cached content of the given theory, or None if the
+    cache is missing or out of date.
+
+    """
+    try:
+        with open(cache_file(filename, username), 'rb') as f:
+            version, cached_source_hash, cached_hash, content = \
+                DiskCacheUnpickler(io.BytesIO(f.read())).load()
+    except Exception:
+        return None
+
+    if version != DISK_CACHE_VERSION or cached_source_hash != source_hash() or \
+        cached_hash != content_hash:
+        return None
+    return content
+
+def write_disk_cache(filename, username, content_hash, content):
+    """Write the content of the given theory to the cache. Failure to
+    write (for example on a read-only file system) is ignored.
+
+    """
+    path = cache_file(filename, username)
+    try:
+        data = pickle.dumps((DISK_CACHE_VERSION, source_hash(), content_hash, content),
+                            pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+        # Some parse errors cannot be pickled
+        return
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
 def load_json_data(filename, username="master"):
     """Load json data for the given theory name and user."""
     with open(user_file(filename, username), encoding='utf-8') as f:
@@ -158,30 +294,49 @@ def load_theory_cache(filename, username="master"):
 
     # Load all imported theories
     depend_list = get_import_order(cache['imports'], username)
-
-    with theory.fresh_theory():
-        for prev_name in depend_list:
-            prev_cache = load_theory_cache(prev_name, username)
-            for item in prev_cache['content']:
+    prev_caches = [load_theory_cache(prev_name, username) for prev_name in depend_list]
+
+    with open(user_file(filename, username), 'rb') as f:
+        raw_data = f.read()
+    h = hashlib.sha256(raw_data)
+    for prev_cache in prev_caches:
+        h.update(prev_cache['hash'].encode())
+    content_hash = h.hexdigest()
+
+    content = None
+    if use_disk_cache:
+        content = read_disk_cache(filename, username, content_hash)
+
+    if content is None:
+        with theory.fresh_theory():
+            for prev_cache in prev_caches:
+                for item in prev_cache['content']:
+                    if item.error is None:
+                        theory.thy.unchecked_extend(item.get_extension())
+
+            # Use this theory to parse the content of current theory
+            data = json.loads(raw_data.decode('utf-8'))
+            content = []
+            for item in data['content']:
+                item = items.parse_item(item)
+                content.append(item)
                 if item.error is None:
                     theory.thy.unchecked_extend(item.get_extension())
 
-        # Use this theory to parse the content of current theory
-        cache['timestamp'] = timestamp
-        data = load_json_data(filename, username)
-        cache['content'] = []
-        for index, item in enumerate(data['content']):
-            item = items.parse_item(item)
-            cache['content'].append(item)
-            if item.error is None:
-                exts = item.get_extension()
-                theory.thy.unchecked_extend(exts)
-                for ext in exts:
-                    if ext.is_constant():
-                        name = ext.ref_name
-                    else:
-                        name = ext.name
-                    item_index[username][(ext.ty, name)] = (filename, timestamp, index)
+        if use_disk_cache:
+            write_disk_cache(filename, username, content_hash, content)
+
+    cache['timestamp'] = timestamp
+    cache['hash'] = content_hash
+    cache['content'] = content
+    for index, item in enumerate(content):
+        if item.error is None:
+            for ext in item.get_extension():
+                if ext.is_constant():
+                    name = ext.ref_name
+                else:
+                    name = ext.name
+                item_index[username][(ext.ty, name)] = (filename, timestamp, index)
 
     return cache
 
@@ -200,32 +355,11 @@ def query_item_index(username, filename, ext_ty, name):
     else:
         return None
 
-def load_theory(filename, *, limit=None, username="master"):
-    """Load the theory with the given theory name.
-    
-    Optional limit is a pair (ty, name) specifying the first item
-    that should not be loaded.
-    
-    """
-    load_theory_cache(filename, username)
-    
-    cache = theory_cache[username][filename]
-
-    # Load imported theories
-    depend_list = get_import_order(cache['imports'], username)
+def extend_by_content(thy, content, limit=None):
+    """Extend thy by the items in content without proof checking, up to
+    (and not including) limit.
 
-    theory.thy = theory.EmptyTheory()
-    for prev_name in depend_list:
-        prev_cache = load_theory_cache(prev_name, username)
-        for item in prev_cache['content']:
-            if item.error is None:
-                theory.thy.unchecked_extend(item.get_extension())
-
-    if limit == 'start':
-        return None
-
-    # Take the portion of content up to (and not including) limit
-    content = cache['content']
+    """
     found_limit = False
     for item in content:
         if limit and item.ty == limit[0] and item.name == limit[1]:
@@ -233,9 +367,72 @@ def load_theory(filename, *, limit=None, username="master"):
             break
 
         if item.error is None:
-            theory.thy.unchecked_extend(item.get_extension())
+            thy.unchecked_extend(item.get_extension())
 
     if limit and not found_limit:
         raise TheoryException("load_theory: limit %s not found" % str(limit))
 
+def get_snapshot(filename, limit=None, username="master"):
+    """Return the snapshot of the given theory loaded up to limit. The
+    result should not be modified.
+
+    The snapshot for limit 'start' extends the snapshot of the longest
+    prefix of imported theories that is itself a loaded theory. Other
+    snapshots extend the snapshot for limit 'start' by the content of the
+    theory itself.
+
+    """
+    cache = load_theory_cache(filename, username)
+    depend_list = get_import_order(cache['imports'], username)
+    hashes = tuple(load_theory_cache(name, username)['hash'] for name in depend_list + [filename])
+
+    if username not in theory_snapshots:
+        theory_snapshots[username] = dict()
+    snapshots = theory_snapshots[username]
+
+    key = (filename, limit)
+    if key in snapshots and snapshots[key][0] == hashes:
+        if isinstance(limit, tuple):
+            # Mark as most recently used
+            snapshots[key] = snapshots.pop(key)
+        return snapshots[key][1]
+
+    if limit == 'start':
+        thy, start = None, 0
+        for i in range(len(depend_list), 0, -1):
+            prev_name = depend_list[i-1]
+            prev_imports = theory_cache[username][prev_name]['imports']
+            if get_import_order(prev_imports, username) + [prev_name] == depend_list[:i]:
+                thy, start = copy(get_snapshot(prev_name, username=username)), i
+                break
+
+        if thy is None:
+            thy = theory.EmptyTheory()
+        for prev_name in depend_list[start:]:
+            extend_by_content(thy, load_theory_cache(prev_name, username)['content'])
+    else:
+        thy = copy(get_snapshot(filename, 'start', username))
+        extend_by_content(thy, cache['content'], limit)
+
+    snapshots[key] = (hashes, thy)
+    if isinstance(limit, tuple):
+        limit_keys = [k for k in snapshots if isinstance(k[1], tuple)]
+        for k in limit_keys[:len(limit_keys) - MAX_LIMIT_SNAPSHOTS]:
+            del snapshots[k]
+
+    return thy
+
+def load_theory(filename, *, limit=None, username="master"):
+    """Load the theory with the given theory name.
+    
+    Optional limit is a pair (ty, name) specifying the first item
+    that should not be loaded, or 'start' to load only the imported
+    theories.
+
+    The theory is obtained by copying a snapshot (see get_snapshot),
+    so switching between loaded theories does not extend the theory
+    by every item again.
+    
+    """
+    theory.thy = copy(get_snapshot(filename, limit, username))
     return None
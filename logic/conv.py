@@ -103,7 +103,11 @@ class beta_conv(Conv):
 class beta_norm_conv(Conv):
     def get_proof_term(self, t):
         def rec(t):
-            if t.is_abs():
+            # Subterms already in normal form need no proof (in particular,
+            # no dest_abs on their abstractions).
+            if t.is_beta_normal():
+                return refl(t)
+            elif t.is_abs():
                 v, body = t.dest_abs()
                 body_pt = rec(body)
                 if body_pt.is_reflexive():
@@ -0,0 +1,52 @@
+# Author: Bohua Zhan
+
+"""Startup benchmark for loading theories.
+
+Loads a theory (realintegral by default) together with all of its
+imports in a fresh process, and reports the time taken in three cases:
+without the on-disk cache, with an empty on-disk cache (which is filled
+during loading), and with a filled on-disk cache. Usage:
+
+    python -m logic.load_bench [theory_name]
+
+"""
+
+import os
+import subprocess
+import sys
+
+from logic import basic
+
+
+def run_load(filename, use_disk_cache):
+    """Load the theory in a new process, and return the time taken."""
+    code = '\n'.join([
+        "import time",
+        "from logic import basic",
+        "basic.use_disk_cache = %s" % use_disk_cache,
+        "start_time = time.perf_counter()",
+        "basic.load_theory(%r)" % filename,
+        "print(time.perf_counter() - start_time)",
+    ])
+    output = subprocess.check_output([sys.executable, '-c', code])
+    return float(output.decode().strip())
+
+
+if __name__ == "__main__":
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'realintegral'
+
+    basic.load_metadata()
+    depend_list = basic.get_import_order([filename])
+
+    no_cache_time = run_load(filename, False)
+
+    for name in depend_list:
+        if os.path.exists(basic.cache_file(name)):
+            os.remove(basic.cache_file(name))
+    cold_time = run_load(filename, True)
+    warm_time = run_load(filename, True)
+
+    print('Theories loaded: %d' % len(depend_list))
+    print('No disk cache:   %.2f s' % no_cache_time)
+    print('Cold disk cache: %.2f s' % cold_time)
+    print('Warm disk cache: %.2f s' % warm_time)
@@ -179,8 +179,7 @@ class beta_norm_macro(Macro):
 
     def eval(self, args, ths):
         assert args is None, "beta_norm_macro"
-        eq_th = beta_norm_conv().eval(ths[0].prop)
-        return Thm(ths[0].hyps, eq_th.prop.arg)
+        return Thm(ths[0].hyps, ths[0].prop.beta_norm())
 
     def get_proof_term(self, args, pts):
         assert args is None, "beta_norm_macro"
@@ -0,0 +1,66 @@
+# Author: Bohua Zhan
+
+"""Benchmark for switching between theories.
+
+Measures the time of context.set_context on the theory with the most
+imports (or the given theory), for the whole theory and for limits at
+several theorems in the theory. Compares loading by copying snapshots
+(the current implementation of basic.load_theory) with loading by
+extending the empty theory by every item of every imported theory.
+Usage:
+
+    python -m logic.snapshot_bench [theory_name]
+
+"""
+
+import sys
+import time
+
+from kernel import theory
+from logic import basic
+from logic import context
+
+
+def load_theory_by_replay(filename, *, limit=None, username="master"):
+    """Load the theory by extending the empty theory by every item."""
+    cache = basic.load_theory_cache(filename, username)
+    theory.thy = theory.EmptyTheory()
+    for prev_name in basic.get_import_order(cache['imports'], username):
+        basic.extend_by_content(theory.thy, basic.load_theory_cache(prev_name, username)['content'])
+    if limit != 'start':
+        basic.extend_by_content(theory.thy, cache['content'], limit)
+
+def time_set_context(filename, limit, repeat):
+    """Average time of context.set_context over repeat calls."""
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        context.set_context(filename, limit=limit)
+    return (time.perf_counter() - start_time) / repeat
+
+
+if __name__ == "__main__":
+    basic.load_metadata()
+    if len(sys.argv) > 1:
+        filename = sys.argv[1]
+    else:
+        filename = max(basic.theory_cache['master'].keys(),
+                       key=lambda name: len(basic.get_import_order([name])))
+
+    depend_list = basic.get_import_order([filename])
+    thm_names = [item.name for item in basic.load_theory_cache(filename)['content'] if item.ty == 'thm']
+    limits = [None] + [('thm', thm_names[i * (len(thm_names) - 1) // 3]) for i in range(4)]
+
+    print('Theory: %s (%d imported theories)' % (filename, len(depend_list) - 1))
+    print('                 Limit                 |  Replay  | Snapshot (first) | Snapshot')
+    print('------------------------------------------------------------------------------')
+    for limit in limits:
+        saved_load_theory = basic.load_theory
+        basic.load_theory = load_theory_by_replay
+        try:
+            replay_time = time_set_context(filename, limit, 10)
+        finally:
+            basic.load_theory = saved_load_theory
+
+        first_time = time_set_context(filename, limit, 1)
+        snapshot_time = time_set_context(filename, limit, 10)
+        print('%38s | %8.4f | %16.4f | %8.4f' % (limit, replay_time, first_time, snapshot_time))
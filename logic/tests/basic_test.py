@@ -1,5 +1,9 @@
 # Author: Bohua Zhan
 
+import io
+import pickle
+import sys
+import tempfile
 import unittest
 
 from kernel.type import TVar, TFun, BoolType, NatType, TyInst
@@ -14,6 +18,17 @@ from data import nat
 from data import set
 
 
+def record_call(arg):
+    UnsafeItem.calls.append(arg)
+
+class UnsafeItem:
+    """Object whose unpickling calls record_call."""
+    calls = []
+
+    def __reduce__(self):
+        return (record_call, ('unpickled',))
+
+
 class BasicTest(unittest.TestCase):
     def testLoadTheory(self):
         basic.load_theory('logic_base')
@@ -32,6 +47,64 @@ class BasicTest(unittest.TestCase):
     def testLoadTheoryWithLimitFail(self):
         self.assertRaises(TheoryException, basic.load_theory, 'logic_base', limit=('thm.ax', 'conj'))
 
+    def testLoadTheorySnapshot(self):
+        basic.load_theory('logic')
+        thy = theory.thy
+        theory.thy.add_theorem('snapshot_test', Thm([], true))
+
+        # Loading again does not see changes to the previous copy
+        basic.load_theory('logic')
+        self.assertIsNot(theory.thy, thy)
+        self.assertFalse(theory.thy.has_theorem('snapshot_test'))
+        self.assertIsInstance(theory.get_theorem('conj_comm'), Thm)
+
+        # Snapshot at the start contains only the imported theories
+        basic.load_theory('logic', limit='start')
+        self.assertIsInstance(theory.get_theorem('conjI'), Thm)
+        self.assertRaises(TheoryException, theory.get_theorem, 'conj_comm')
+
+    def testDiskCache(self):
+        basic.load_theory('logic_base')
+        cache = basic.load_theory_cache('logic_base')
+        content = basic.read_disk_cache('logic_base', 'master', cache['hash'])
+        self.assertIsNotNone(content)
+        self.assertEqual([item.export_json() for item in content],
+                         [item.export_json() for item in cache['content']])
+        self.assertIsNone(basic.read_disk_cache('logic_base', 'master', 'invalid'))
+
+    def testDiskCacheUnpickler(self):
+        basic.load_theory('logic_base')
+        cache = basic.load_theory_cache('logic_base')
+        old_disk_cache_dir = basic.disk_cache_dir
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            basic.disk_cache_dir = tmp_dir
+            try:
+                basic.write_disk_cache('logic_base', 'master', cache['hash'], cache['content'])
+                self.assertIsNotNone(basic.read_disk_cache('logic_base', 'master', cache['hash']))
+
+                # Entries referring to other functions are rejected
+                data = (basic.DISK_CACHE_VERSION, basic.source_hash(), cache['hash'], UnsafeItem())
+                with open(basic.cache_file('logic_base', 'master'), 'wb') as f:
+                    pickle.dump(data, f)
+                self.assertIsNone(basic.read_disk_cache('logic_base', 'master', cache['hash']))
+                self.assertEqual(UnsafeItem.calls, [])
+            finally:
+                basic.disk_cache_dir = old_disk_cache_dir
+
+    def testDiskCacheFindClass(self):
+        unpickler = basic.DiskCacheUnpickler(io.BytesIO())
+        self.assertIs(unpickler.find_class('kernel.term', 'Var'), Var)
+        self.assertIs(unpickler.find_class('kernel.theory', 'TheoryException'), TheoryException)
+
+        # Other classes of allowed modules are rejected
+        self.assertRaises(pickle.UnpicklingError, unpickler.find_class, 'kernel.term', 'Term')
+        self.assertRaises(pickle.UnpicklingError, unpickler.find_class, 'kernel.theory', 'Theory')
+
+        # Modules are not imported
+        self.assertNotIn('logic.load_bench', sys.modules)
+        self.assertRaises(pickle.UnpicklingError, unpickler.find_class, 'logic.load_bench', 'Exception')
+        self.assertNotIn('logic.load_bench', sys.modules)
+
     def testConjComm(self):
         """Proof of commutativity of conjunction."""
         basic.load_theory('logic_base')
@@ -1,6 +1,6 @@
 """Implementation of best-first-search automation."""
 
-import queue
+import heapq
 
 from kernel.term import Not
 from kernel.proofterm import ProofTerm
@@ -27,7 +27,18 @@ class ProofStepException(Exception):
     
 
 class Item:
-    pass
+    """Base class for items. Two items are equal if they have the same
+    key, which is also used for hashing.
+
+    """
+    def key(self):
+        raise NotImplementedError
+
+    def __eq__(self, other):
+        return isinstance(other, Item) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
 
 class FactItem(Item):
     """A known fact, represented as a proof term."""
@@ -38,8 +49,8 @@ class FactItem(Item):
     def size(self):
         return self.prop.size()
     
-    def __eq__(self, other):
-        return isinstance(other, FactItem) and self.prop == other.prop
+    def key(self):
+        return ('fact', self.prop)
 
     def __str__(self):
         return str(self.prop)
@@ -52,8 +63,8 @@ class TermItem(Item):
     def size(self):
         return self.t.size()
 
-    def __eq__(self, other):
-        return isinstance(other, TermItem) and self.t == other.t
+    def key(self):
+        return ('term', self.t)
 
     def __str__(self):
         return '[%s]' % str(self.t)
@@ -69,14 +80,15 @@ class DisjItem(Item):
         for new_var in new_vars:
             self.pt = self.pt.forall_elim(new_var)
 
+        self.vars = new_vars
         self.prop = self.pt.prop
         self.disjuncts = self.prop.strip_disj()
 
     def size(self):
         return self.pt.prop.size()
 
-    def __eq__(self, other):
-        return isinstance(other, DisjItem) and self.disjuncts == other.disjuncts
+    def key(self):
+        return ('disj', frozenset(self.disjuncts))
 
     def __str__(self):
         return ', '.join(str(t) for t in self.disjuncts)
@@ -170,11 +182,9 @@ def get_all_subterms(t):
         res.extend([t])
         return res
     
-    distinct_list = []
-    for subt in rec(t):
-        if subt not in distinct_list and subt != t:
-            distinct_list.append(subt)
-    return distinct_list
+    distinct_list = dict.fromkeys(rec(t))
+    del distinct_list[t]
+    return list(distinct_list)
     
 class TermProofStep(ProofStep):
     """Add subterms of a fact."""
@@ -284,18 +294,26 @@ class ProofState:
     vars -- list of initial variables.
     assms -- list of initial assumptions.
     updates -- list of currently added updates.
-    queue -- list of pending items.
+    queue -- heap of pending updates.
+    items -- dictionary from keys of added items to their ids.
+    disj_index -- dictionary from disjuncts to ids of the added DisjItems
+        containing them, and of the added FactItems stating them.
+    subsumed -- set of ids of added DisjItems subsumed by later items,
+        which are removed from disj_index.
 
     """
     def __init__(self, vars, assms):
         self.vars = vars
         self.assms = assms
         self.updates = []
-        self.queue = queue.PriorityQueue()
+        self.queue = []
+        self.items = dict()
+        self.disj_index = dict()
+        self.subsumed = set()
         
         # Add the initial assumptions to the queue
         for assm in self.assms:
-            self.queue.put(Update(0, '$INIT', [], FactItem(ProofTerm.assume(assm))))
+            heapq.heappush(self.queue, Update(0, '$INIT', [], FactItem(ProofTerm.assume(assm))))
         
         # Overall count of number of steps
         self.step_count = 0
@@ -306,12 +324,85 @@ class ProofState:
         res += 'Updates:\n'
         for i, item in enumerate(self.updates):
             res += '%d: %s\n' % (i, item)
-        res += 'Remaining in queue: %d items' % self.queue.qsize()
+        res += 'Remaining in queue: %d items' % len(self.queue)
         
         return res
-    
+
+    @staticmethod
+    def get_disjuncts(item):
+        """Disjuncts of a FactItem or DisjItem, as a set. Returns None for
+        other items.
+
+        """
+        if isinstance(item, DisjItem):
+            return set(item.disjuncts)
+        elif isinstance(item, FactItem):
+            return {item.prop}
+        else:
+            return None
+
+    @staticmethod
+    def subsumes(item1, item2):
+        """Whether item1 subsumes item2, given that the disjuncts of item1
+        are among the disjuncts of item2 (which is a DisjItem). Variables
+        of item2 introduced from forall must also be such variables of
+        item1, if they appear in item1.
+
+        """
+        vars1 = item1.vars if isinstance(item1, DisjItem) else []
+        for var in item2.vars:
+            if var not in vars1 and var in item1.prop.get_vars():
+                return False
+        return True
+
     def has_item(self, item):
-        return any(item == updt.item for updt in self.updates)
+        """Whether item is already added, or is a DisjItem subsumed by an
+        added item.
+
+        """
+        if item in self.items:
+            return True
+        if not isinstance(item, DisjItem):
+            return False
+
+        # Count, for each added item, the number of its disjuncts that
+        # are disjuncts of item.
+        disjuncts = self.get_disjuncts(item)
+        counts = dict()
+        for disj in disjuncts:
+            for item_id in self.disj_index.get(disj, ()):
+                counts[item_id] = counts.get(item_id, 0) + 1
+                other = self.updates[item_id].item
+                if counts[item_id] == len(self.get_disjuncts(other)) and \
+                    self.subsumes(other, item):
+                    return True
+        return False
+
+    def add_item(self, item):
+        """Record item, with id the last of updates. Removes DisjItems
+        subsumed by item from disj_index.
+
+        """
+        item_id = len(self.updates) - 1
+        self.items[item] = item_id
+        disjuncts = self.get_disjuncts(item)
+        if disjuncts is None:
+            return
+
+        # Added DisjItems containing all disjuncts of item
+        cands = None
+        for disj in disjuncts:
+            ids = self.disj_index.get(disj, set())
+            cands = set(ids) if cands is None else cands & ids
+        for other_id in cands:
+            other = self.updates[other_id].item
+            if isinstance(other, DisjItem) and self.subsumes(item, other):
+                self.subsumed.add(other_id)
+                for disj in other.disjuncts:
+                    self.disj_index[disj].discard(other_id)
+
+        for disj in disjuncts:
+            self.disj_index.setdefault(disj, set()).add(item_id)
     
     def step(self):
         """Apply one step of automation.
@@ -320,16 +411,17 @@ class ProofState:
         add it to the list of items, and process the item.
 
         """
-        if self.queue.empty():
+        if not self.queue:
             raise ProofStateException('Queue is empty.')
         
         self.step_count += 1
-        cur_update = self.queue.get()
+        cur_update = heapq.heappop(self.queue)
         
         if self.has_item(cur_update.item):
             return
 
         self.updates.append(cur_update)
+        self.add_item(cur_update.item)
         cur_sc = cur_update.sc
         cur_item = cur_update.item
         cur_id = len(self.updates) - 1
@@ -346,10 +438,10 @@ class ProofState:
                         new_sc = cur_sc + new_item.size()
                     else:
                         new_sc = cur_sc + prfstep1.incr_sc
-                    self.queue.put(Update(new_sc, prfstep1, [cur_id], new_item))
+                    heapq.heappush(self.queue, Update(new_sc, prfstep1, [cur_id], new_item))
 
     def step_for(self, n, debug=True):
-        while n > 0 and not self.queue.empty():
+        while n > 0 and self.queue:
             self.step()
             n -= 1
 
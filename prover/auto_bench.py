@@ -0,0 +1,51 @@
+"""
+Benchmark for the saturation loop of the best-first-search automation.
+
+Runs the automation until saturation on the theorems of
+prover/tests/auto_test.py, and on scaled-up versions of open_union with
+n open sets:
+
+    is_topology S --> open_in S U0 --> ... --> open_in S U(n-1) -->
+    open_in S (U0 Un ... Un U(n-1))
+
+Reports the number of steps, the number of items added, and the time
+taken. Usage:
+
+    python -m prover.auto_bench
+
+"""
+
+import time
+
+from logic import basic
+from logic import context
+from syntax import parser
+from prover.auto import auto
+
+
+def scaled_open_union(n):
+    """Statement of open_union for n open sets."""
+    vars = {'S': "'a topology"}
+    for i in range(n):
+        vars['U' + str(i)] = "'a set"
+    context.set_context('topology', vars=vars)
+    assms = ' ⟶ '.join('open_in S U%d' % i for i in range(n))
+    union = ' ∪ '.join('U%d' % i for i in range(n))
+    return parser.parse_term('is_topology S ⟶ %s ⟶ open_in S (%s)' % (assms, union))
+
+def run(name, st):
+    start_time = time.perf_counter()
+    st.step_for(1000000, debug=False)
+    step_time = time.perf_counter() - start_time
+    print('%16s | %6d | %7d | %7.3f' % (name, st.step_count, len(st.updates), step_time))
+
+
+if __name__ == "__main__":
+    basic.load_theory('topology')
+
+    print('         Problem |  Steps | Updates |  Time')
+    print('---------------------------------------------')
+    for th_name in ['open_empty', 'open_union']:
+        run(th_name, auto.init_proof_theorem(th_name))
+    for n in [25, 50, 100, 150, 200]:
+        run('open_union %d' % n, auto.init_proof(scaled_open_union(n)))
@@ -5,16 +5,124 @@ by Robert Nieuwenhuis and Albert Oliveras.
 
 """
 
-from queue import Queue
+from collections import deque
 from copy import copy
 
 from kernel import term
 from kernel.term import Eq
 from kernel.thm import Thm
 from kernel.proofterm import ProofTerm
+from util import unionfind
 
 EQ_CONST, EQ_COMB = range(2)
 
+# Marker for keys absent from a dictionary, in the undo trail.
+_ABSENT = object()
+
+
+def compile_pattern(pat):
+    """Compile a pattern for E-matching into a list of instructions.
+
+    Registers hold representatives of classes, with register 0 holding
+    the class to be matched. The instructions are:
+
+    ('bind', i, j): for each distinct f(a1, a2) in the class in register
+    i, put the classes of a1 and a2 into registers j and j+1.
+
+    ('check', i, c): check the class in register i contains constant c.
+
+    ('compare', i, j): check registers i and j hold the same class.
+
+    Returns the list of instructions, and the dictionary from variables
+    to the registers holding their values.
+
+    """
+    instrs = []
+    var_regs = dict()
+    num_regs = 1
+
+    def rec(pat, i):
+        nonlocal num_regs
+        if isinstance(pat, str):
+            if not pat.startswith("?"):
+                instrs.append(('check', i, pat))
+            elif pat in var_regs:
+                instrs.append(('compare', var_regs[pat], i))
+            else:
+                var_regs[pat] = i
+        else:
+            j = num_regs
+            num_regs += 2
+            instrs.append(('bind', i, j))
+            rec(pat[0], j)
+            rec(pat[1], j+1)
+
+    rec(pat, 0)
+    return instrs, var_regs
+
+def constrained_paths(pat):
+    """Return the list of paths (as tuples of argument positions from the
+    root) to positions in pat that constrain the matched class: pairs,
+    constants and variables occurring more than once.
+
+    """
+    var_paths = dict()
+    paths = []
+
+    def rec(pat, path):
+        if isinstance(pat, str) and pat.startswith("?"):
+            var_paths.setdefault(pat, []).append(path)
+        else:
+            paths.append(path)
+            if not isinstance(pat, str):
+                rec(pat[0], path + (0,))
+                rec(pat[1], path + (1,))
+
+    rec(pat, ())
+    for var_path in var_paths.values():
+        if len(var_path) > 1:
+            paths.extend(var_path)
+    return paths
+
+
+class CodeTreeNode:
+    """Node in the code tree for E-matching.
+
+    The code tree shares the common prefixes of the instructions of the
+    compiled patterns (see compile_pattern). Each child is reached by
+    executing an instruction. The patterns ending at a node yield their
+    matches there.
+
+    """
+    def __init__(self):
+        # Dictionary from instructions to child nodes.
+        self.children = dict()
+
+        # List of pairs (name, var_regs) for the patterns ending here.
+        self.yields = []
+
+        # Names of the patterns in the subtree.
+        self.names = set()
+
+
+class PathIndexNode:
+    """Node in the inverted path index for E-matching.
+
+    Each node corresponds to a path going up from a position in a
+    pattern, with children indexed by the argument position (0 or 1)
+    of the next step up. A pattern is recorded at the node if the path
+    goes from one of its constrained positions (see constrained_paths)
+    to its root.
+
+    """
+    def __init__(self):
+        # Dictionary from argument positions to child nodes.
+        self.children = dict()
+
+        # Names of the patterns whose root is reached at this node.
+        self.names = set()
+
+
 class CongClosure:
     """Data structure for congruence closure."""
 
@@ -31,21 +139,18 @@ class CongClosure:
         # Each element of pending is either
         # (EQ_CONST, a, b) or
         # (EQ_COMB, ((a1, a2), a), ((b1, b2), b))
-        self.pending = Queue()
-
-        # Dictionary from constants to its current representative.
-        self.rep = {}
+        self.pending = deque()
 
-        # Dictionary from representatives to the list of all constants
-        # in its class.
-        self.class_list = {}
+        # Union-find structure on the constants, whose roots are the
+        # representatives of the classes.
+        self.uf = unionfind.UnionFind()
 
         # Dictionary from representatives to the list of input
         # equations they appear in.
         self.use_list = {}
 
         # Dictionary from pairs of representatives to some
-        # input equation in which they appear in.
+        # input equation in which they appear in (signature table).
         self.lookup = {}
 
         # Proof forest: represents a graph where each node points to
@@ -54,19 +159,30 @@ class CongClosure:
         # where label is an element of PENDING that created the edge.
         self.proof_forest = {}
 
-        # List of equations of the form f(a, b) = c entered into the
-        # data structure. Used for preparing comb_class_list.
-        self.comb_eqs = []
-
-        # Dictionary from representatives to list of combination terms
-        # in the class. This is produced by calling the init_comb_class
-        # function.
+        # Dictionary from representatives to the list of pairs (a1, a2)
+        # such that f(a1, a2) is in the class. Used for E-matching.
         self.comb_class_list = {}
 
-        # Flag indicating whether comb_class_list is current. This
-        # is set to True after computing comb_class_list, and to False
-        # after adding new term or new equality.
-        self.comb_class_list_current = False
+        # Undo trail, recording changes to the dictionaries and lists
+        # above made since the first open scope. Each element is either
+        # (d, key, old) for setting d[key] (old is _ABSENT if the key was
+        # not in d), or (l, n) for appending to the list l of length n.
+        self.trail = []
+
+        # Stack of open scopes, each recording the length of the trail
+        # at the time the scope is opened.
+        self.scopes = []
+
+        # Patterns added by add_pattern, compiled into a shared code
+        # tree, and the inverted path index on their constrained
+        # positions. These are not affected by scopes.
+        self.code_tree = CodeTreeNode()
+        self.path_index = PathIndexNode()
+
+        # Classes modified, and patterns added, since the last call to
+        # new_matches.
+        self.modified = []
+        self.new_patterns = set()
 
     def __str__(self):
         def print_eq(eq):
@@ -85,10 +201,14 @@ class CongClosure:
                 _, ((a1, a2), a), ((b1, b2), b) = pending
                 return "(f(%s, %s) = %s, f(%s, %s) = %s)" % (a1, a2, a, b1, b2, b)
 
-        pending = "\n".join(print_pending(p) for p in self.pending.queue)
-        rep = "{%s}" % (", ".join("%s: %s" % (s, t) for s, t in self.rep.items()))
+        classes = dict()
+        for s in self.proof_forest:
+            classes.setdefault(self.find(s), []).append(s)
+
+        pending = "\n".join(print_pending(p) for p in self.pending)
+        rep = "{%s}" % (", ".join("%s: %s" % (s, self.find(s)) for s in self.proof_forest))
         class_list = "\n".join("%s: %s" % (s, ", ".join(t))
-                               for s, t in self.class_list.items())
+                               for s, t in classes.items())
         use_list = "\n".join("%s: %s" % (s, ", ".join(print_eq(eq) for eq in t))
                              for s, t in self.use_list.items() if len(t) > 0)
         lookup = "\n".join("%s, %s: %s" % (p[0], p[1], print_eq(eq))
@@ -102,12 +222,82 @@ class CongClosure:
     def add_var(self, s):
         """Add new variable."""
         assert isinstance(s, str)
-        if s not in self.rep:
-            self.rep[s] = s
-            self.class_list[s] = [s]
-            self.use_list[s] = []
-            self.proof_forest[s] = None
-            self.comb_class_list_current = False
+        if s not in self.proof_forest:
+            self._set(self.uf.parents, s, None)
+            self._set(self.uf.size, s, 1)
+            self._set(self.use_list, s, [])
+            self._set(self.proof_forest, s, None)
+            self._set(self.comb_class_list, s, [])
+
+    def _set(self, d, key, value):
+        """Set d[key] to value, recording the change if a scope is open."""
+        if self.scopes:
+            self.trail.append((d, key, d.get(key, _ABSENT)))
+        d[key] = value
+
+    def _del(self, d, key):
+        """Delete d[key], recording the change if a scope is open."""
+        if self.scopes:
+            self.trail.append((d, key, d[key]))
+        del d[key]
+
+    def _append(self, l, item):
+        """Append item to the list l, recording the change if a scope
+        is open.
+
+        """
+        if self.scopes:
+            self.trail.append((l, len(l)))
+        l.append(item)
+
+    def _extend(self, l, items):
+        """Extend the list l by items, recording the change if a scope
+        is open.
+
+        """
+        if self.scopes:
+            self.trail.append((l, len(l)))
+        l.extend(items)
+
+    def push(self):
+        """Open a new scope. All changes made until the matching call to
+        pop are undone by that call.
+
+        """
+        self.scopes.append(len(self.trail))
+
+    def pop(self):
+        """Close the innermost scope, undoing all changes made since the
+        matching call to push.
+
+        """
+        assert self.scopes, "pop: no open scope"
+        trail_len = self.scopes.pop()
+        while len(self.trail) > trail_len:
+            change = self.trail.pop()
+            if len(change) == 2:
+                l, n = change
+                del l[n:]
+            else:
+                d, key, old = change
+                if old is _ABSENT:
+                    del d[key]
+                else:
+                    d[key] = old
+
+    def find(self, s):
+        """Find the representative of s. Path compression is performed
+        only when no scope is open, so that it need not be undone.
+
+        """
+        parents = self.uf.parents
+        root = s
+        while parents[root] is not None:
+            root = parents[root]
+        if not self.scopes:
+            while s != root:
+                parents[s], s = root, parents[s]
+        return root
 
     def merge(self, s, t):
         """Merge terms s and t. s must be either a string or a pair
@@ -116,11 +306,10 @@ class CongClosure:
         """
         assert isinstance(t, str)
         self.add_var(t)
-        self.comb_class_list_current = False
         if isinstance(s, str):
             # Merge two constants
             self.add_var(s)
-            self.pending.put((EQ_CONST, s, t))
+            self.pending.append((EQ_CONST, s, t))
             self._propagate()
         else:
             # Merge f(a1, a2) = t
@@ -128,17 +317,19 @@ class CongClosure:
             assert isinstance(a1, str) and isinstance(a2, str)
             self.add_var(a1)
             self.add_var(a2)
-            self.comb_eqs.append((s, t))
+            self._append(self.comb_class_list[self.find(t)], s)
+            if self.code_tree.names:
+                self.modified.append(t)
 
-            rep_a1, rep_a2 = self.rep[a1], self.rep[a2]
+            rep_a1, rep_a2 = self.find(a1), self.find(a2)
             if (rep_a1, rep_a2) in self.lookup:
                 eq2 = self.lookup[(rep_a1, rep_a2)]
-                self.pending.put((EQ_COMB, (s, t), eq2))
+                self.pending.append((EQ_COMB, (s, t), eq2))
                 self._propagate()
             else:
-                self.lookup[(rep_a1, rep_a2)] = (s, t)
-                self.use_list[rep_a1].append((s, t))
-                self.use_list[rep_a2].append((s, t))
+                self._set(self.lookup, (rep_a1, rep_a2), (s, t))
+                self._append(self.use_list[rep_a1], (s, t))
+                self._append(self.use_list[rep_a2], (s, t))
 
     def _path_to_root(self, s):
         """Find the path to root of s."""
@@ -159,16 +350,16 @@ class CongClosure:
         
         """
         path_to_root = self._path_to_root(s1)
-        self.proof_forest[s1] = (s2, label)
+        self._set(self.proof_forest, s1, (s2, label))
         for i in range(len(path_to_root) - 1):
             ps, label = path_to_root[i+1]
             s, _ = path_to_root[i]
-            self.proof_forest[ps] = (s, label)
+            self._set(self.proof_forest, ps, (s, label))
 
     def _propagate(self):
         """Propagation. Removes one equation from pending."""
-        while not self.pending.empty():
-            E = self.pending.get()
+        while self.pending:
+            E = self.pending.popleft()
 
             # Extract the two elements being assigned equal
             if E[0] == EQ_CONST:
@@ -176,35 +367,44 @@ class CongClosure:
             else:
                 _, (_, a), (_, b) = E
 
-            rep_a, rep_b = self.rep[a], self.rep[b]
+            rep_a, rep_b = self.find(a), self.find(b)
             if rep_a != rep_b:
-                # Ensure the class_list for a is smaller or equal to
-                # class_list for b.
-                if len(self.class_list[rep_a]) > len(self.class_list[rep_b]):
+                # Ensure the class for a is smaller or equal to the
+                # class for b.
+                if self.uf.size[rep_a] > self.uf.size[rep_b]:
                     a, b = b, a
                     rep_a, rep_b = rep_b, rep_a
 
                 # Update the proof forest.
                 self._add_edge_proof_forest(a, b, E)
 
-                # Move class_list of a to b.
-                for c in self.class_list[rep_a]:
-                    self.rep[c] = rep_b
-                self.class_list[rep_b] += self.class_list[rep_a]
-                del self.class_list[rep_a]
+                # Make rep_b the representative of the merged class.
+                size = self.uf.size
+                self._set(self.uf.parents, rep_a, rep_b)
+                self._set(size, rep_b, size[rep_a] + size[rep_b])
+                self._set(size, rep_a, None)
+
+                comb_a, comb_b = self.comb_class_list[rep_a], self.comb_class_list[rep_b]
+                if len(comb_a) > len(comb_b):
+                    comb_a, comb_b = comb_b, comb_a
+                self._extend(comb_b, comb_a)
+                self._set(self.comb_class_list, rep_b, comb_b)
+                self._del(self.comb_class_list, rep_a)
+                if self.code_tree.names:
+                    self.modified.append(rep_b)
 
                 # Process use_list of rep_a, move to rep_b if does not
                 # trigger new equation. 
                 for eq in self.use_list[rep_a]:
                     (c1, c2), c = eq
-                    rep_c1, rep_c2 = self.rep[c1], self.rep[c2]
+                    rep_c1, rep_c2 = self.find(c1), self.find(c2)
                     if (rep_c1, rep_c2) in self.lookup:
                         eq2 = self.lookup[(rep_c1, rep_c2)]
-                        self.pending.put((EQ_COMB, eq, eq2))
+                        self.pending.append((EQ_COMB, eq, eq2))
                     else:
-                        self.lookup[(rep_c1, rep_c2)] = eq
-                        self.use_list[rep_b].append(eq)
-                del self.use_list[rep_a]
+                        self._set(self.lookup, (rep_c1, rep_c2), eq)
+                        self._append(self.use_list[rep_b], eq)
+                self._del(self.use_list, rep_a)
 
     def explain(self, s, t, *, res=None):
         """Explain the equality between two constants.
@@ -262,22 +462,7 @@ class CongClosure:
     def test(self, t1, t2):
         """Test whether t1 is equal to t2."""
         assert isinstance(t1, str) and isinstance(t2, str)
-        return self.rep[t1] == self.rep[t2]
-
-    def _compute_comb_class(self):
-        """Compute comb_class_list in preparation for E-matching."""
-        # Initialize an empty set for each representative.
-        self.comb_class_list = dict()
-        for t in self.class_list:
-            self.comb_class_list[t] = set()
-
-        # Compute by iterating over comb_eqs.
-        for (s1, s2), t in self.comb_eqs:
-            rep_t = self.rep[t]
-            rep_s1, rep_s2 = self.rep[s1], self.rep[s2]
-            self.comb_class_list[rep_t].add((rep_s1, rep_s2))
-
-        self.comb_class_list_current = True
+        return self.find(t1) == self.find(t2)
 
     def ematch(self, pat, t, *, inst=None):
         """Computes the E-matching of pattern pat with term t.
@@ -296,10 +481,7 @@ class CongClosure:
         
         """
         assert isinstance(t, str)
-        if not self.comb_class_list_current:
-            self._compute_comb_class()
-
-        rep_t = self.rep[t]
+        rep_t = self.find(t)
 
         if inst is None:
             inst = dict()
@@ -319,7 +501,7 @@ class CongClosure:
                     return [inst]
             else: 
                 # pat is a constant
-                rep_pat = self.rep[pat]
+                rep_pat = self.find(pat)
                 if rep_pat == rep_t:
                     return [inst]
                 else:
@@ -327,7 +509,8 @@ class CongClosure:
         else:
             pat1, pat2 = pat
             all_insts = []
-            tlist = self.comb_class_list[rep_t]
+            tlist = dict.fromkeys((self.find(t1), self.find(t2))
+                                  for t1, t2 in self.comb_class_list[rep_t])
             for t1, t2 in tlist:
                 insts2 = self.ematch(pat1, t1, inst=inst)
                 for inst2 in insts2:
@@ -335,10 +518,135 @@ class CongClosure:
             return all_insts
 
 
+    def add_pattern(self, name, pat):
+        """Add a pattern (in the same form as for ematch) under the given
+        name, for use in new_matches. The pattern must not be a variable.
+
+        Patterns are not affected by scopes, so they can only be added
+        when no scope is open.
+
+        """
+        assert not self.scopes, "add_pattern: scope is open"
+        assert not (isinstance(pat, str) and pat.startswith("?")), "add_pattern: pattern is a variable"
+        instrs, var_regs = compile_pattern(pat)
+        node = self.code_tree
+        node.names.add(name)
+        for instr in instrs:
+            if instr not in node.children:
+                node.children[instr] = CodeTreeNode()
+            node = node.children[instr]
+            node.names.add(name)
+        node.yields.append((name, var_regs))
+
+        for path in constrained_paths(pat):
+            node = self.path_index
+            for i in reversed(path):
+                if i not in node.children:
+                    node.children[i] = PathIndexNode()
+                node = node.children[i]
+            node.names.add(name)
+
+        self.new_patterns.add(name)
+
+    def _run_code_tree(self, t, names):
+        """Match the patterns with the given names against the class of
+        t, by executing the code tree. Returns the list of pairs
+        (name, inst).
+
+        """
+        res = []
+        regs = {0: self.find(t)}
+
+        def rec(node):
+            for name, var_regs in node.yields:
+                if name in names:
+                    res.append((name, dict((var, regs[i]) for var, i in var_regs.items())))
+            for instr, child in node.children.items():
+                if child.names.isdisjoint(names):
+                    continue
+                if instr[0] == 'bind':
+                    _, i, j = instr
+                    pairs = dict.fromkeys((self.find(a1), self.find(a2))
+                                          for a1, a2 in self.comb_class_list[regs[i]])
+                    for regs[j], regs[j+1] in pairs:
+                        rec(child)
+                elif instr[0] == 'check':
+                    _, i, c = instr
+                    if c in self.proof_forest and self.find(c) == regs[i]:
+                        rec(child)
+                else:
+                    _, i, j = instr
+                    if regs[i] == regs[j]:
+                        rec(child)
+
+        rec(self.code_tree)
+        return res
+
+    def _collect_roots(self, node, classes, roots):
+        """Follow the inverted path index from node, starting with the
+        given classes. Adds the classes reached to the dictionary
+        roots, which maps classes to names of patterns that may match.
+
+        """
+        for c in classes:
+            if node.names:
+                roots.setdefault(c, set()).update(node.names)
+        for i, child in node.children.items():
+            parents = dict()
+            for c in classes:
+                for eq in self.use_list[c]:
+                    if self.find(eq[0][i]) == c:
+                        parents[self.find(eq[1])] = None
+            if parents:
+                self._collect_roots(child, parents, roots)
+
+    def new_matches(self):
+        """Return matches of the patterns added by add_pattern that may
+        have become possible since the last call to new_matches.
+
+        The patterns added since the last call are matched against all
+        classes. Other patterns are only matched against classes reached
+        from the modified classes through the inverted path index. The
+        result is the list of triples (name, inst, t), where t is the
+        representative of the matched class. Matches found before may be
+        returned again.
+
+        """
+        roots = dict()
+        if self.new_patterns:
+            for s in self.proof_forest:
+                if self.uf.parents[s] is None:
+                    roots[s] = set(self.new_patterns)
+
+        modified = dict.fromkeys(self.find(s) for s in self.modified if s in self.proof_forest)
+        self._collect_roots(self.path_index, modified, roots)
+        self.modified = []
+        self.new_patterns = set()
+
+        res = []
+        for t, names in roots.items():
+            for name, inst in self._run_code_tree(t, names):
+                res.append((name, inst, t))
+        return res
+
+
 class ConvertPatternException(Exception):
     pass
 
 
+def inst_pattern(pat, inst):
+    """Substitute the variables in pat according to inst, a dictionary
+    from names of variables to terms.
+
+    """
+    if pat.is_var():
+        return inst[pat.name]
+    elif pat.is_comb() and pat.has_var():
+        return inst_pattern(pat.fun, inst)(inst_pattern(pat.arg, inst))
+    else:
+        return pat
+
+
 class CongClosureHOL:
     """Wrapper around congruence closure, for handling terms in
     higher-order logic.
@@ -364,10 +672,50 @@ class CongClosureHOL:
         # Mapping from equality added to the closure to proof terms.
         self.pts = {}
 
+        # Changes to pts made since the first open scope, as a list of
+        # pairs (key, old value).
+        self.pts_trail = []
+
+        # Stack of open scopes, each recording the number of constants
+        # and the length of pts_trail at the time the scope is opened.
+        self.scopes = []
+
+        # Mapping from names to patterns added by add_pattern, together
+        # with the types of their variables.
+        self.patterns = {}
+
     def __str__(self):
         index = "\n".join("%s: %s" % (s, t) for s, t in self.index.items())
         return "Index:\n" + index + "\nClosure:\n" + str(self.closure)
 
+    def push(self):
+        """Open a new scope. All terms and equalities added until the
+        matching call to pop are removed by that call.
+
+        """
+        self.closure.push()
+        self.scopes.append((self.num_consts, len(self.pts_trail)))
+
+    def pop(self):
+        """Close the innermost scope, undoing all changes made since the
+        matching call to push.
+
+        """
+        assert self.scopes, "pop: no open scope"
+        self.closure.pop()
+        num_consts, trail_len = self.scopes.pop()
+        while self.num_consts > num_consts:
+            new_var = "s" + str(self.num_consts)
+            del self.rev_index[self.index[new_var]]
+            del self.index[new_var]
+            self.num_consts -= 1
+        while len(self.pts_trail) > trail_len:
+            key, old = self.pts_trail.pop()
+            if old is _ABSENT:
+                del self.pts[key]
+            else:
+                self.pts[key] = old
+
     def add_const(self, t):
         """Add a new constant representing t."""
         assert t not in self.rev_index, "add_atomic_term: t already exists."
@@ -416,6 +764,8 @@ class CongClosureHOL:
         u2 = self.add_term(t)
         self.closure.merge(u1, u2)
         if pt is not None:
+            if self.scopes:
+                self.pts_trail.append(((u1, u2), self.pts.get((u1, u2), _ABSENT)))
             self.pts[(u1, u2)] = pt
 
     def test(self, t1, t2):
@@ -464,50 +814,103 @@ class CongClosureHOL:
                     cur_pos = b
                 else:
                     assert b == cur_pos
-                    pt = pt.transitive(pt, eq_pt.symmetric())
+                    pt = pt.transitive(eq_pt.symmetric())
                     cur_pos = a
 
             return pt
 
         return get_proofterm(u1, u2)
 
-    def _convert_pat(self, pat):
+    def _convert_pat(self, pat, *, add=False):
         """Internal function: prepare pattern for matching. The
         translation process is:
         
         Variables in pat becomes strings starting with '?'. Terms in
         pat appearing in the index is replaced by the corresponding
         string. If a term not containing variables does not appear
-        in the index, the conversion process fails
-        (raises ConvertPatternException).
+        in the index, it is added if add is set. Otherwise the
+        conversion process fails (raises ConvertPatternException).
 
         """
         if not pat.has_var():
             if pat in self.rev_index:
                 return self.rev_index[pat]
+            elif add and self.add_term(pat) is not None:
+                return self.rev_index[pat]
             else:
                 raise ConvertPatternException
         
         if pat.is_var():
             return '?' + pat.name
         elif pat.is_comb():
-            return (self._convert_pat(pat.fun), self._convert_pat(pat.arg))
+            return (self._convert_pat(pat.fun, add=add), self._convert_pat(pat.arg, add=add))
         else:
             raise ConvertPatternException
 
+    def _convert_raw_inst(self, var_types, raw_inst):
+        """Convert instantiation from raw form to real form. Returns None
+        if the types of the terms do not agree with var_types, the
+        dictionary from names of variables in the pattern to their types.
+
+        """
+        res = dict()
+        for k, v in raw_inst.items():
+            assert k.startswith('?') and v in self.index
+            t = self.index[v]
+            if t.get_type() != var_types[k[1:]]:
+                return None
+            res[k[1:]] = t
+        return res
+
     def ematch(self, pat, t):
-        """E-matching on HOL terms."""
+        """E-matching on HOL terms. Returns the list of pairs (inst, pt),
+        where inst maps names of variables in pat to terms, and pt is the
+        proof of the equality between the instantiated pattern and t.
+
+        """
         u = self.add_term(t)
         raw_pat = self._convert_pat(pat)
         raw_insts = self.closure.ematch(raw_pat, u)
 
-        # Convert instantiation from raw form to real form.
-        def convert_raw_inst(raw_inst):
-            res = dict()
-            for k, v in raw_inst.items():
-                assert k.startswith('?') and v in self.index
-                res[k[1:]] = self.index[v]
-            return res
+        var_types = dict((v.name, v.T) for v in pat.get_vars())
+        res = []
+        for raw_inst in raw_insts:
+            inst = self._convert_raw_inst(var_types, raw_inst)
+            if inst is not None:
+                res.append((inst, self.explain(inst_pattern(pat, inst), t)))
+        return res
+
+    def add_pattern(self, name, pat):
+        """Add a pattern under the given name, for use in new_matches.
+        Terms in pat not containing variables are added to the closure.
+
+        As these terms would be removed by pop while the pattern remains,
+        patterns can only be added when no scope is open.
 
-        insts = [convert_raw_inst(raw_inst) for raw_inst in raw_insts]
-        return insts
+        """
+        assert not self.scopes, "add_pattern: scope is open"
+        raw_pat = self._convert_pat(pat, add=True)
+        self.patterns[name] = (pat, dict((v.name, v.T) for v in pat.get_vars()))
+        self.closure.add_pattern(name, raw_pat)
+
+    def new_matches(self):
+        """Return matches of the patterns added by add_pattern that may
+        have become possible since the last call (see
+        CongClosure.new_matches). The result is the list of triples
+        (name, inst, t), where the instantiated pattern is equal to t.
+        Use explain_match to obtain a proof of the equality.
+
+        """
+        res = []
+        for name, raw_inst, u in self.closure.new_matches():
+            inst = self._convert_raw_inst(self.patterns[name][1], raw_inst)
+            if inst is not None:
+                res.append((name, inst, self.index[u]))
+        return res
+
+    def explain_match(self, name, inst, t):
+        """Given a match (name, inst, t) returned by new_matches, return
+        the proof of the equality between the instantiated pattern and t.
+
+        """
+        return self.explain(inst_pattern(self.patterns[name][0], inst), t)
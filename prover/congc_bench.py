@@ -0,0 +1,101 @@
+"""
+Benchmark for the congruence closure.
+
+Generates random EUF chains: constants a0, ..., a(n-1) are split into
+chains of the given length, consecutive constants in a chain are merged,
+and each a(i) has an application f(a(i)) = b(i). The equalities are
+added in random order. Then checks that the two ends of each chain, and
+their applications of f, are equal, and explains some of these
+equalities. Then explores case splits, each merging the ends of a few
+random chains and testing the result, either in a scope of the closure
+(push and pop) or on a copy of the closure. Finally, adds the equalities
+again to a new closure, running E-matching of f(?x) after every 1000
+equalities. Reports the time taken for each stage. Usage:
+
+    python -m prover.congc_bench [num_eqs]
+
+"""
+
+import copy
+import random
+import sys
+import time
+
+from prover import congc
+
+
+def random_chains(num_eqs, chain_len, seed):
+    """Generate about num_eqs equalities forming random EUF chains.
+    Returns the list of equalities and the list of chains.
+
+    """
+    rand = random.Random(seed)
+    n = num_eqs // 2
+    consts = ['a' + str(i) for i in range(n)]
+    rand.shuffle(consts)
+    chains = [consts[i:i+chain_len] for i in range(0, n, chain_len)]
+
+    eqs = [(('f', a), 'b' + a[1:]) for a in consts]
+    for chain in chains:
+        eqs.extend((chain[i], chain[i+1]) for i in range(len(chain) - 1))
+    rand.shuffle(eqs)
+    return eqs, chains
+
+
+if __name__ == "__main__":
+    num_eqs = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    eqs, chains = random_chains(num_eqs, 100, 0)
+
+    closure = congc.CongClosure()
+    start_time = time.perf_counter()
+    for s, t in eqs:
+        closure.merge(s, t)
+    merge_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for chain in chains:
+        assert closure.test(chain[0], chain[-1]), "congc_bench: chain not merged"
+        assert closure.test('b' + chain[0][1:], 'b' + chain[-1][1:]), "congc_bench: congruence not found"
+    test_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for chain in chains[:100]:
+        closure.explain('b' + chain[0][1:], 'b' + chain[-1][1:])
+    explain_time = time.perf_counter() - start_time
+
+    rand = random.Random(1)
+    splits = [rand.sample(chains, 10) for _ in range(10)]
+
+    def run_split(closure, split):
+        for chain1, chain2 in zip(split[::2], split[1::2]):
+            closure.merge(chain1[-1], chain2[0])
+        assert closure.test('b' + split[0][0][1:], 'b' + split[1][-1][1:]), "congc_bench: split not merged"
+
+    start_time = time.perf_counter()
+    for split in splits:
+        closure.push()
+        run_split(closure, split)
+        closure.pop()
+        assert not closure.test(split[0][0], split[1][0]), "congc_bench: split not undone"
+    scope_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for split in splits:
+        run_split(copy.deepcopy(closure), split)
+    copy_time = time.perf_counter() - start_time
+
+    closure = congc.CongClosure()
+    start_time = time.perf_counter()
+    for i, (s, t) in enumerate(eqs):
+        closure.merge(s, t)
+        if i % 1000 == 999:
+            closure.ematch(('f', '?x'), t)
+    match_time = time.perf_counter() - start_time
+
+    print('Equalities: %d, chains: %d' % (len(eqs), len(chains)))
+    print('Merge:   %.3f s' % merge_time)
+    print('Test:    %.3f s' % test_time)
+    print('Explain: %.3f s' % explain_time)
+    print('Case splits (%d) with scopes: %.3f s' % (len(splits), scope_time))
+    print('Case splits (%d) with copies: %.3f s' % (len(splits), copy_time))
+    print('Merge with E-matching: %.3f s' % match_time)
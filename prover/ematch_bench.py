@@ -0,0 +1,130 @@
+"""
+Benchmark for E-matching in the congruence closure.
+
+Takes the rewrite rules (theorems with attribute hint_rewrite) in
+library/logic.json and library/set.json, and generates ground terms by
+instantiating the left sides of the rules with random ground terms. Then
+performs rounds of instantiation: each round finds the matches of the
+left sides of the rules in the closure, and merges the two sides of each
+instantiated rule. In each round, matches are found both by matching
+every rule against every class (ematch), and incrementally using the
+code tree and the inverted path index (new_matches). The results are
+checked to agree. Reports the number of matches and the time taken in
+each round. Usage:
+
+    python -m prover.ematch_bench [num_terms num_rounds]
+
+"""
+
+import json
+import random
+import sys
+import time
+
+from kernel.term import Var
+from logic import context
+from syntax import parser
+from prover import congc
+
+
+def load_rules():
+    """Load the rewrite rules as triples (name, lhs, rhs), skipping
+    those that are not equalities whose left side contains all variables.
+
+    """
+    rules = []
+    for filename in ['logic', 'set']:
+        with open('library/%s.json' % filename, 'r', encoding='utf-8') as f:
+            f_data = json.load(f)
+        for item in f_data['content']:
+            if item['ty'] != 'thm' or 'hint_rewrite' not in item.get('attributes', []):
+                continue
+            context.set_context('set', vars=item['vars'])
+            prop = item['prop'] if isinstance(item['prop'], str) else ''.join(item['prop'])
+            _, concl = parser.parse_term(prop).strip_implies()
+            if not concl.is_equals():
+                continue
+            lhs, rhs = concl.lhs, concl.rhs
+            if lhs.is_var() or not lhs.has_var() or not set(rhs.get_vars()) <= set(lhs.get_vars()):
+                continue
+            rules.append((item['name'], lhs, rhs))
+    return rules
+
+def random_terms(rules, num_terms, seed):
+    """Generate ground terms by instantiating left sides of rules with
+    atoms and previously generated terms of the same type.
+
+    """
+    rand = random.Random(seed)
+    pool = dict()
+    terms = []
+
+    def choose(T):
+        if T not in pool:
+            pool[T] = [Var('c%d_%d' % (len(pool), i), T) for i in range(3)]
+        return rand.choice(pool[T])
+
+    for _ in range(num_terms):
+        _, lhs, _ = rand.choice(rules)
+        inst = dict((v.name, choose(v.T)) for v in lhs.get_vars())
+        t = congc.inst_pattern(lhs, inst)
+        pool.setdefault(t.get_type(), []).append(t)
+        terms.append(t)
+    return terms
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        num_terms, num_rounds = int(sys.argv[1]), int(sys.argv[2])
+    else:
+        num_terms, num_rounds = 300, 3
+
+    closure = congc.CongClosureHOL()
+    rules, raw_pats = [], dict()
+    for name, lhs, rhs in load_rules():
+        try:
+            closure.add_pattern(name, lhs)
+        except congc.ConvertPatternException:
+            continue
+        rules.append((name, lhs, rhs))
+        raw_pats[name] = closure._convert_pat(lhs)
+    rule_dict = dict((name, (lhs, rhs)) for name, lhs, rhs in rules)
+    terms = random_terms(rules, num_terms, 0)
+    for t in terms:
+        closure.add_term(t)
+
+    def key(name, inst, t):
+        find = lambda t: closure.closure.find(closure.rev_index[t])
+        return (name, tuple(sorted((k, find(v)) for k, v in inst.items())), find(t))
+
+    print('Rules: %d, terms: %d' % (len(rules), len(terms)))
+    print(' Round | Classes | Matches | ematch | new_matches')
+    print('---------------------------------------------------')
+    incr_matches = []
+    applied = set()
+    for i in range(num_rounds):
+        classes = [s for s in closure.index if closure.closure.find(s) == s]
+        start_time = time.perf_counter()
+        full_matches = []
+        for name, lhs, _ in rules:
+            for u in classes:
+                for raw_inst in closure.closure.ematch(raw_pats[name], u):
+                    inst = closure._convert_raw_inst(closure.patterns[name][1], raw_inst)
+                    if inst is not None:
+                        full_matches.append((name, inst, closure.index[u]))
+        full_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        incr_matches.extend(closure.new_matches())
+        incr_time = time.perf_counter() - start_time
+
+        full_keys = set(key(*match) for match in full_matches)
+        assert full_keys == set(key(*match) for match in incr_matches), "ematch_bench: results differ"
+        print('%6d | %7d | %7d | %6.3f | %6.3f' % (i, len(classes), len(full_keys), full_time, incr_time))
+
+        for name, inst, _ in full_matches:
+            match_key = (name, tuple(sorted((k, closure.rev_index[v]) for k, v in inst.items())))
+            if match_key not in applied:
+                applied.add(match_key)
+                lhs, rhs = rule_dict[name]
+                closure.merge(congc.inst_pattern(lhs, inst), congc.inst_pattern(rhs, inst))
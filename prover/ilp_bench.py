@@ -0,0 +1,135 @@
+"""
+Benchmark for branch and bound on integer problems.
+
+Generates families of bounded integer problems without integer solutions:
+parity problems 2 * x0 + ... + 2 * xn = 2n + 1, equality knapsacks
+a0 * x0 + ... + an * xn = b with no solution, and random problems with
+rows of three variables. Each problem is solved by branch_and_bound with
+and without cuts, reporting the number of nodes in the tree and the time
+taken, and for problems with at most max_proof_nodes nodes the time taken
+by IntegerSimplexMacro to prove it, whose proof is checked. Usage:
+
+    python -m prover.ilp_bench
+
+"""
+
+import contextlib
+import io
+import random
+import time
+
+from logic import context
+from syntax import parser
+from kernel import theory
+from prover import simplex
+
+
+max_proof_nodes = 100
+
+def row(coeffs, names):
+    return ' + '.join('%d * %s' % (c, name) for c, name in zip(coeffs, names))
+
+def box(names, lower, upper):
+    """Bounds lower <= x <= upper for each x in names."""
+    res = []
+    for name in names:
+        res.extend(['1 * %s >= %d' % (name, lower), '1 * %s <= %d' % (name, upper)])
+    return res
+
+def parity(n):
+    names = ['x' + str(i) for i in range(n)]
+    lhs = row([2] * n, names)
+    return names, ['%s >= %d' % (lhs, 2 * n + 1), '%s <= %d' % (lhs, 2 * n + 1)] + box(names, 0, n)
+
+def knapsack(n, seed):
+    """Equality knapsack with 0 <= xi <= 3 and no solution."""
+    rand = random.Random(seed)
+    names = ['x' + str(i) for i in range(n)]
+    while True:
+        coeffs = [rand.randint(10, 40) for _ in range(n)]
+        sums = {0}
+        for c in coeffs:
+            sums = {s + k * c for s in sums for k in range(4)}
+        b = rand.randint(1, 3 * sum(coeffs) - 1)
+        if b not in sums:
+            lhs = row(coeffs, names)
+            return names, ['%s >= %d' % (lhs, b), '%s <= %d' % (lhs, b)] + box(names, 0, 3)
+
+def random_ilp(n, m, seed):
+    """Random problem with n variables between -5 and 5 and m rows of
+    three variables, with real but no integer solutions.
+
+    """
+    rand = random.Random(seed)
+    names = ['x' + str(i) for i in range(n)]
+    while True:
+        rows = []
+        for _ in range(m):
+            vs = sorted(rand.sample(range(n), 3))
+            lhs = row([rand.choice([-5, -4, -3, -2, 2, 3, 4, 5]) for _ in vs], [names[i] for i in vs])
+            b = rand.randint(-5, 5)
+            rows.append('%s %s %d' % (lhs, rand.choice(['>=', '<=']), b))
+        problem = rows + box(names, -5, 5)
+        T, _ = solve(names, problem, False)
+        if T is not None and T.branches:
+            return names, problem
+
+def solve(names, problem, cuts):
+    """Returns the tree, or None if problem has an integer solution, and
+    the time taken.
+
+    """
+    context.set_context('real', vars={name: 'int' for name in names})
+    ineqs, _, _ = simplex.term_to_ineq([parser.parse_term(t) for t in problem])
+    s = simplex.Simplex()
+    s.add_ineqs(*ineqs)
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        res = simplex.branch_and_bound(s, [], [], cuts=cuts)
+    solve_time = time.perf_counter() - start_time
+    if isinstance(res, dict):
+        return None, solve_time
+    return res, solve_time
+
+def prove(names, problem, cuts):
+    """Prove problem with IntegerSimplexMacro, returns the time taken."""
+    context.set_context('real', vars={name: 'int' for name in names})
+    args = [parser.parse_term(t) for t in problem]
+    old_branch_and_bound = simplex.branch_and_bound
+    simplex.branch_and_bound = lambda s, pts1, pts2: old_branch_and_bound(s, pts1, pts2, cuts=cuts)
+    try:
+        start_time = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            pt = simplex.IntegerSimplexMacro().get_proof_term(args)
+        prove_time = time.perf_counter() - start_time
+    finally:
+        simplex.branch_and_bound = old_branch_and_bound
+    assert set(pt.hyps) <= set(args), "ilp_bench: wrong hypotheses"
+    theory.check_proof(pt.export())
+    return prove_time
+
+def run(name, names, problem):
+    line = '%16s |' % name
+    for cuts in [False, True]:
+        T, solve_time = solve(names, problem, cuts)
+        assert T is not None, "ilp_bench: wrong solution"
+        if T.size() <= max_proof_nodes:
+            prove_time = '%7.2f' % prove(names, problem, cuts)
+        else:
+            prove_time = '%7s' % '-'
+        line += ' %6d | %7.3f | %s |' % (T.size(), solve_time, prove_time)
+    print(line)
+
+
+if __name__ == "__main__":
+    print('                 |        Branch and bound       |         Branch and cut')
+    print('         Problem | Nodes  |  Time   |  Proof  | Nodes  |  Time   |  Proof')
+    print('----------------------------------------------------------------------------')
+    for n in [2, 3, 4, 5]:
+        run('parity %d' % n, *parity(n))
+    for n in [3, 4, 5]:
+        for seed in range(2):
+            run('knapsack %d (%d)' % (n, seed), *knapsack(n, seed))
+    for n in [6, 8]:
+        for seed in range(2):
+            run('random %d (%d)' % (n, seed), *random_ilp(n, n, seed))
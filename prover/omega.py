@@ -8,7 +8,6 @@ https://github.com/HOL-Theorem-Prover/HOL/blob/develop/src/integer/OmegaMLShadow
 
 import collections
 import functools
-import copy
 from math import gcd, ceil, floor
 
 from kernel import term
@@ -363,35 +362,65 @@ def lookup_fkey(db, fk):
     else:
         raise KeyError
 
+class FactoidDB:
+    """
+    Database of factoids with their derivations, indexed by their keys.
+
+    For each key, only the factoid with the least constant is kept, since
+    the other factoids with the same key follow from it. Derivations are
+    never modified, so copies of the database share them.
+
+    """
+    def __init__(self, dfs=()):
+        # Map from keys to dfactoids
+        self.rows = dict()
+        for df in dfs:
+            self.insert(df)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows.values())
+
+    def copy(self):
+        db = FactoidDB()
+        db.rows = dict(self.rows)
+        return db
+
+    def lookup(self, key):
+        """Return the dfactoid with the given key, or None."""
+        return self.rows.get(key)
+
+    def insert(self, df):
+        """Insert df, unless there is already a factoid with the same key
+        and less or equal constant. Returns whether df is inserted.
+
+        """
+        key = df.factoid.key
+        if key in self.rows and self.rows[key].factoid.constant <= df.factoid.constant:
+            return False
+        self.rows[key] = df
+        return True
+
+    def columns(self):
+        """Return the coefficients of each variable, as a list of tuples."""
+        return list(zip(*self.rows))
+
 def has_one_var(db):
     """
     returns true if all of ptree's factoids are over just one variable
     """
-    index = -1
-    has_var = False
-    for _, dfs in db.items():
-        for df in dfs:
-            d, f = df.deriv, df.factoid
-            for i, v in enumerate(f.key):
-                if v != 0: 
-                    if not has_var:
-                        index = i
-                        has_var = True
-                    elif has_var and i != index:
-                        return False
-    return has_var
+    return sum(1 for col in db.columns() if any(col)) == 1
 
 def find_var(db):
     """
     Precondition: db has only one var.
     Return the var.
     """
-    for _, dfs in db.items():
-        for df in dfs:
-            f = df.factoid
-            for index, k in enumerate(f.key):
-                if k != 0:
-                    return index
+    for index, col in enumerate(db.columns()):
+        if any(col):
+            return index
 
 def one_var_analysis(db, em):
     """
@@ -407,15 +436,12 @@ def one_var_analysis(db, em):
     """
     x_var = find_var(db)
     upper, lower = None, None
-    for _, dfs in db.items():
-        for df in dfs:
-            f = df.factoid
-            fk, fc, d = split_dfactoid(df)
-            for index, k in enumerate(f.key):
-                if fk[x_var] < 0 and (upper is None or upper[0] > fc):
-                    upper = (fc, d)
-                elif fk[x_var] > 0 and (lower is None or lower[0] < -fc):
-                    lower = (-fc, d)
+    for df in db:
+        fk, fc, d = split_dfactoid(df)
+        if fk[x_var] < 0 and (upper is None or upper[0] > fc):
+            upper = (fc, d)
+        elif fk[x_var] > 0 and (lower is None or lower[0] < -fc):
+            lower = (-fc, d)
 
     if upper is None and lower is None:
         raise ValueError
@@ -449,28 +475,12 @@ def exact_var(db, width):
     SOME v if v is an exact var in ptree, or NONE if there is no exact
     var.
     """
-    up_coeffs_unit = [True] * (width - 1)
-    low_coeffs_unit = [True] * (width - 1)
-    coeffs_all_zero = [True] * (width - 1)
-
-    for _, dfactoids in db.items():
-        for df in dfactoids:
-            f = df.factoid
-            for i, ai in enumerate(f.key):
-                if ai < 0:
-                    if abs(ai) != 1:
-                        up_coeffs_unit[i] = False
-                    coeffs_all_zero[i] = False
-                elif ai > 0:
-                    if abs(ai) != 1:
-                        low_coeffs_unit[i] = False
-                    coeffs_all_zero[i] = False
-
-    for i in range(width - 1):
-        if low_coeffs_unit[i] and not coeffs_all_zero[i]:
+    cols = db.columns()
+    for i, col in enumerate(cols):
+        if any(col) and all(ai <= 1 for ai in col):
             return i
-    for i in range(width - 1):
-        if up_coeffs_unit[i] and not coeffs_all_zero[i]:
+    for i, col in enumerate(cols):
+        if any(col) and all(ai >= -1 for ai in col):
             return i
 
     return None
@@ -480,20 +490,10 @@ def least_coeff_var(db, width):
     Returns the variable whose coefficients' absolute values sum to the
     least amount (that isn't zero).
     """
-    sums = [0] * (width - 1)
-    for _, dfactoids in db.items():
-        for df in dfactoids:
-            f = df.factoid
-            for i, ai in enumerate(f.key):
-                sums[i] += abs(ai)
-    
-    def find_min(lst):
-        pairs = sorted([(val, index) for index, val in enumerate(lst)])
-        for el, index in pairs:
-            if el != 0:
-                return index
-
-    return find_min(sums)
+    sums = [(sum(abs(ai) for ai in col), i) for i, col in enumerate(db.columns())]
+    sums = [(s, i) for s, i in sums if s != 0]
+    if sums:
+        return min(sums)[1]
 
 def extend_vmap(db, i, vmap):
     """
@@ -504,22 +504,21 @@ def extend_vmap(db, i, vmap):
 
     """
     lower, upper = None, None
-    for _, dfactoids in db.items():
-        for df in dfactoids:
-            f = df.factoid
-            c0 = f.eval_factoid_except(vmap, i)
-            fk = f.key
-            coeff = fk[i]
-
-            if coeff < 0: #upper case
-                c = floor(c0/(-coeff))
-                if upper is None or c < upper:
-                    upper = c
-            
-            elif coeff > 0: #lower case
-                c = ceil(-(c0/(coeff)))
-                if lower is None or c > lower:
-                    lower = c
+    for df in db:
+        f = df.factoid
+        coeff = f[i]
+        if coeff == 0:
+            continue
+
+        c0 = f.eval_factoid_except(vmap, i)
+        if coeff < 0: #upper case
+            c = c0 // (-coeff)
+            if upper is None or c < upper:
+                upper = c
+        else: #lower case
+            c = -(c0 // coeff)
+            if lower is None or c > lower:
+                lower = c
     
     assert lower <= upper
     
@@ -539,65 +538,65 @@ def zero_upto(n):
     return v
 
 def find_redundant_var(db, width):
-    numvars = width - 1
-    has_low, has_up = [False] * numvars, [False] * numvars
-    for _, dfactoids in db.items():
-        for df in dfactoids:
-            fk = df.factoid.key
-            for i, k in enumerate(fk):
-                if k < 0:
-                    has_up[i] = True
-                elif k > 0:
-                    has_low[i] = True
-    
-    for _, dfactoids in db.items():
-        for df in dfactoids:
-            fk = df.factoid.key
-            for i, k in enumerate(fk):
-                if has_low[i] != has_up[i]:
-                    return (i, has_up[i])
+    """
+    Returns (i, has_up) for the first variable i which has only upper
+    bounds (has_up is True) or only lower bounds, or None.
+    """
+    for i, col in enumerate(db.columns()):
+        has_low, has_up = max(col) > 0, min(col) < 0
+        if has_low != has_up:
+            return (i, has_up)
     return None
 
 def extend_cross_product(db, is_exact, i, lowers, uppers):
-    """Extend db with the cross product between lowers and uppers"""
+    """
+    Extend db with the cross product between lowers and uppers. Returns
+    Contr if a factoid contradicts the constant or another factoid.
+
+    The combinations are computed on the coefficient tuples. Redundant
+    combinations are found by looking up their keys in db, and
+    contradicting ones by looking up the negated keys.
+
+    """
     for low in lowers:
+        f1, d1 = low.factoid.coeff, low.deriv
+        a = f1[i]
         for up in uppers:
-            # Combine the two
-            f1, d1 = low.factoid, low.deriv
-            f2, d2 = up.factoid, up.deriv
+            # Combine the two, as in combine_real_factoid and combine_dark_factoid
+            f2 = up.factoid.coeff
+            b = -f2[i]
             if is_exact:
-                df = dfactoid(combine_real_factoid(i, f1, f2), RealCombine(i, d1, d2))
+                g = gcd(a, b)
+                c, d = a // g, b // g
+                coeff = [c * n + d * m for m, n in zip(f1, f2)]
             else:
-                df = dfactoid(combine_dark_factoid(i, f1, f2), d1)
+                coeff = [a * n + b * m for m, n in zip(f1, f2)]
+                coeff[-1] -= (a - 1) * (b - 1)
 
             # Reduce gcd
-            g = functools.reduce(gcd, df.factoid[:-1])
+            key = coeff[:-1]
+            g = gcd(*key)
+            if g == 0:
+                if coeff[-1] < 0:
+                    return Contr(RealCombine(i, d1, up.deriv) if is_exact else d1)
+                continue
             if g > 1:
-                elim_gcd_factoid = [floor(i / g) for i in df.factoid]
-                df = dfactoid(Factoid(elim_gcd_factoid), GCDCheck(df.deriv))
-
-            if df.factoid.is_true_factoid():
+                coeff = [k // g for k in coeff]
+                key = coeff[:-1]
+
+            # The derivation is only constructed for factoids that are not
+            # redundant
+            key, constant = tuple(key), coeff[-1]
+            old = db.lookup(key)
+            if old is not None and old.factoid.constant <= constant:
                 continue
-            elif df.factoid.is_false_factoid():
-                return Contr(df.deriv)
-            else:
-                f = df.factoid
-                found_redundant, found_contra = None, None
-                if hash(f) in db.keys():
-                    for v in db[hash(f)]:
-                        if v.factoid.key == f.key and v.factoid.constant <= f.constant:
-                            found_redundant = True
-                if hash(negate_key(f)) in db.keys():
-                    for v in db[hash(negate_key(f))]:
-                        if v.factoid.key == f.key and v.factoid.constant < -f.constant:
-                            found_contra = v.deriv
-
-                if found_redundant:
-                    continue
-                elif found_contra:
-                    return Contr(DirectContr(df.deriv, found_contra))
-                else:
-                    insert_db(db, df)
+            deriv = RealCombine(i, d1, up.deriv) if is_exact else d1
+            if g > 1:
+                deriv = GCDCheck(deriv)
+            neg = db.lookup(tuple(-k for k in key))
+            if neg is not None and neg.factoid.constant < -constant:
+                return Contr(DirectContr(deriv, neg.deriv))
+            db.insert(dfactoid(Factoid(coeff), deriv))
                     
     return db
 
@@ -617,15 +616,8 @@ def solve(em, db, width):
     elif find_redundant_var(db, width):
         # Has variable with only upper or lower bounds
         j, has_up = find_redundant_var(db, width)
-        new_db = dict()
-        elim = [] # store redundant factoids
-        for _, dfactoids in db.items():
-            for df in dfactoids:
-                fk = df.factoid.key
-                if fk[j] == 0:
-                    insert_db(new_db, df)
-                else:
-                    elim.append(df)
+        new_db = FactoidDB(df for df in db if df.factoid[j] == 0)
+        elim = [df for df in db if df.factoid[j] != 0] # store redundant factoids
 
         r = solve(em, new_db, width)
         if not isinstance(r, Satisfiable):
@@ -654,17 +646,9 @@ def solve(em, db, width):
             is_exact = False
             # print('dark elim %d' % var_to_elim)
 
-        lowers, uppers = [], []
-        newdb = dict()
-        for _, dfactoids in db.items():
-            for df in dfactoids:
-                f = df.factoid
-                if f[var_to_elim] < 0:
-                    uppers.append(df)
-                elif f[var_to_elim] == 0:
-                    insert_db(newdb, df)
-                else:
-                    lowers.append(df)
+        lowers = [df for df in db if df.factoid[var_to_elim] > 0]
+        uppers = [df for df in db if df.factoid[var_to_elim] < 0]
+        newdb = FactoidDB(df for df in db if df.factoid[var_to_elim] == 0)
 
         def drop_contr(re):
             return NoConcl() if isinstance(re, Contr) else re
@@ -677,10 +661,10 @@ def solve(em, db, width):
                 return r
 
         def db_exact():
-            return extend_cross_product(copy.deepcopy(newdb), True, var_to_elim, lowers, uppers)
+            return extend_cross_product(newdb.copy(), True, var_to_elim, lowers, uppers)
 
         def db_dark():
-            return extend_cross_product(copy.deepcopy(newdb), False, var_to_elim, lowers, uppers)
+            return extend_cross_product(newdb.copy(), False, var_to_elim, lowers, uppers)
 
         if em == EXACT:
             if is_exact:
@@ -715,9 +699,7 @@ def solve_matrix(matrix, mode=EXACT):
     Give some factoids, return the result.
     """
     fs = [Factoid(f) if isinstance(f, collections.abc.Iterable) else f for f in matrix]
-    db = dict()
-    for ft in fs:
-        insert_db(db, dfactoid(ft, ASM(ft)))
+    db = FactoidDB(dfactoid(ft, ASM(ft)) for ft in fs)
     r = solve(EXACT, db, len(matrix[0]))
     if isinstance(r, Satisfiable):
         return "SAT", r.store
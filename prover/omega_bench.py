@@ -0,0 +1,70 @@
+"""
+Benchmark for the Omega test.
+
+Solves the problems in prover/tests/omega_test.py, and random problems
+with 10 to 30 variables and twice as many rows, or 10 and 15 variables
+and three times as many rows. Each row has three variables close to each
+other in the order of variables. Reports the result, the number of
+factoids in the database after elimination, and the time taken. Usage:
+
+    python -m prover.omega_bench
+
+"""
+
+import random
+import time
+
+from prover import omega
+from prover.tests import omega_test
+
+
+def random_presburger(num_vars, num_rows, seed):
+    """Random problem 0 <= Σ ai * xi + c, with rows over three of five
+    consecutive variables.
+
+    """
+    rand = random.Random(seed)
+    matrix = []
+    for _ in range(num_rows):
+        start = rand.randrange(num_vars)
+        row = [0] * (num_vars + 1)
+        for _ in range(3):
+            row[min(num_vars - 1, start + rand.randrange(5))] = rand.choice([-3, -2, -1, 1, 2, 3])
+        row[-1] = rand.randint(16, 28)
+        matrix.append(row)
+    return matrix
+
+def run(name, matrix):
+    num_factoids = 0
+    old_extend_cross_product = omega.extend_cross_product
+    def extend_cross_product(db, is_exact, i, lowers, uppers):
+        nonlocal num_factoids
+        res = old_extend_cross_product(db, is_exact, i, lowers, uppers)
+        if isinstance(res, omega.FactoidDB):
+            num_factoids += len(res)
+        return res
+
+    omega.extend_cross_product = extend_cross_product
+    try:
+        start_time = time.perf_counter()
+        res, _ = omega.solve_matrix(matrix)
+        solve_time = time.perf_counter() - start_time
+    finally:
+        omega.extend_cross_product = old_extend_cross_product
+    print('%16s | %4d | %4d | %7s | %8d | %8.3f' % (
+        name, len(matrix[0]) - 1, len(matrix), res, num_factoids, solve_time))
+
+
+if __name__ == "__main__":
+    print('         Problem | Vars | Rows |   Res   | Factoids |   Time')
+    print('----------------------------------------------------------------')
+    for i, (matrix, _) in enumerate(omega_test.top_level_data):
+        run('top level %d' % i, matrix)
+    for i, matrix in enumerate(omega_test.contradiction_data):
+        run('contradiction %d' % i, matrix)
+    for num_vars in [10, 15, 20, 30]:
+        for seed in range(3):
+            run('random %d (%d)' % (num_vars, seed), random_presburger(num_vars, 2 * num_vars, seed))
+    for num_vars in [10, 15]:
+        for seed in range(3):
+            run('dense %d (%d)' % (num_vars, seed), random_presburger(num_vars, 3 * num_vars, seed))
@@ -27,12 +27,13 @@ from syntax.settings import settings
 from syntax import parser
 from prover import omega
 settings.unicode = True
-from collections import deque
+from collections import deque, OrderedDict
 import functools
 import operator
 import json
 import time
 import sys
+import traceback
 import multiprocessing
 # from z3 import Context, Solver, parse_smt2_file, set_param
 import z3
@@ -123,22 +124,29 @@ def translate_type(sort):
     else:
         raise NotImplementedError
 
-def solve_cnf(F):
-    encode_pt = tseitin.encode(Not(F))
+def solve_cnf(F, *, trim=True, polarity=True):
+    """Prove F using the SAT solver. If trim is set, only the learned
+    clauses needed to derive the empty clause are reconstructed. If
+    polarity is set, the polarity-based Tseitin encoding is used.
+
+    """
+    encode_pt = tseitin.encode(Not(F), polarity=polarity)
     cnf = tseitin.convert_cnf(encode_pt.prop)
     res, proof = sat.solve_cnf(cnf)
     assert res == 'unsatisfiable', 'solve_cnf: statement is not provable'
+    if trim:
+        proof = sat.trim_proof(proof)
     
     # Perform the resolution steps
-    clause_pts = [ProofTerm.assume(clause) for clause in encode_pt.prop.strip_conj()]
+    clause_pts = dict(enumerate(ProofTerm.assume(clause) for clause in encode_pt.prop.strip_conj()))
     for new_id in sorted(proof.keys()):
         steps = proof[new_id]
         pt = clause_pts[steps[0]]
         for step in steps[1:]:
             pt = resolution(pt, clause_pts[step])
-        clause_pts.append(pt)
+        clause_pts[new_id] = pt
 
-    contra_pt = clause_pts[-1]
+    contra_pt = clause_pts[max(proof.keys())]
     assert contra_pt.prop == false
     
     # Show contradiction from ~F and definitions of new variables
@@ -1805,11 +1813,234 @@ def handle_assertion(ast):
                 )
                 atoms[pt_true.lhs] = pt_true
 
-def proofrec(proof, bounds=deque(), trace=False, debug=False, assertions=None):
+class RecProfile():
+    """Profile of proof reconstruction. For each Z3 rule, records the number
+    of steps, the number of steps whose result is not computed in the main
+    pass (as it is reused from an earlier step or from lemma_cache, or is
+    computed by the worker processes), the number of steps reconstructed
+    with sorry, and the total time taken.
+
+    parallel_time is the time taken by reconstructing rewrite and th-lemma
+    steps in worker processes before the main pass, and total_time is the
+    time taken by the whole reconstruction.
+
     """
-    If trace is true, print reconstruction trace.
+    def __init__(self):
+        self.rules = dict()
+        self.gaps = set()
+        self.parallel_time = 0.0
+        self.total_time = 0.0
+
+    def add_step(self, name, step_time, reused=False, pt=None):
+        if name not in self.rules:
+            self.rules[name] = {'steps': 0, 'reused': 0, 'sorry': 0, 'time': 0.0}
+        rule = self.rules[name]
+        rule['steps'] += 1
+        rule['time'] += step_time
+        if reused:
+            rule['reused'] += 1
+        if isinstance(pt, ProofTerm) and pt.rule == 'sorry':
+            rule['sorry'] += 1
+            self.gaps |= set(pt.gaps)
+
+    def merge(self, other):
+        for name, rule in other.rules.items():
+            if name not in self.rules:
+                self.rules[name] = {'steps': 0, 'reused': 0, 'sorry': 0, 'time': 0.0}
+            for k, v in rule.items():
+                self.rules[name][k] += v
+        self.gaps |= other.gaps
+        self.parallel_time += other.parallel_time
+        self.total_time += other.total_time
+
+    def __str__(self):
+        lines = ['%16s | %5s | %6s | %5s | %8s' % ('Rule', 'Steps', 'Reused', 'Sorry', 'Time')]
+        for name, rule in sorted(self.rules.items(), key=lambda p: -p[1]['time']):
+            lines.append('%16s | %5d | %6d | %5d | %8.3f' % (
+                name, rule['steps'], rule['reused'], rule['sorry'], rule['time']))
+        lines.append('Parallel time: %.3f' % self.parallel_time)
+        lines.append('Total time: %.3f' % self.total_time)
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return str(self)
+
+    def json_data(self):
+        """Export profile to json format."""
+        return {
+            'rules': self.rules,
+            'gaps': [str(gap) for gap in self.gaps],
+            'parallel_time': self.parallel_time,
+            'total_time': self.total_time,
+        }
+
+
+"""
+Results of rewrite and th-lemma steps, kept across calls to proofrec.
+
+The key of a step is (name, prems, concl), where name is 'rewrite' or
+'th-lemma', prems are the propositions of the premises and concl is the
+conclusion. The steps are reconstructed with the premises assumed (see
+prove_lemma). Results whose hypotheses are among the premises are stored
+under the key. Rewrite steps may also use the atoms obtained from the
+assertions of the proof, so their other results (including those with
+sorry) are stored under the key extended by the theorems in atoms.
+
+At most max_lemma_cache results are kept, discarding the least recently
+used ones, so that the cache does not grow without bound in a long-running
+server.
+
+"""
+lemma_cache = OrderedDict()
+
+max_lemma_cache = 10000
+
+use_lemma_cache = True
+
+lemma_methods = {'rewrite': 'rewrite', 'commutativity': 'rewrite', 'th-lemma': 'th-lemma'}
+
+def lemma_key(name, args):
+    """Key of the step with the given rule name and arguments, or None if
+    it is not a rewrite or th-lemma step.
+
+    """
+    if name not in lemma_methods:
+        return None
+    *prems, concl = args
+    if not isinstance(concl, Term) or not all(isinstance(prem, ProofTerm) for prem in prems):
+        return None
+    return (lemma_methods[name], tuple(prem.prop for prem in prems), concl)
+
+def prove_lemma(key):
+    """Reconstruct the step with the given key, with the premises assumed."""
+    name, prems, concl = key
+    if name == 'rewrite':
+        return rewrite(concl)
+    else:
+        return th_lemma([ProofTerm.assume(prem) for prem in prems] + [concl])
+
+def atoms_key(key):
+    """Key of the rewrite step with the given key, extended by atoms."""
+    return key + (tuple(pt.th for pt in atoms.values()),)
+
+def lookup_lemma(key):
+    """Result of the step with the given key in lemma_cache, or None."""
+    if key not in lemma_cache and key[0] == 'rewrite':
+        key = atoms_key(key)
+    if key not in lemma_cache:
+        return None
+    lemma_cache.move_to_end(key)
+    return lemma_cache[key]
+
+def store_lemma(key, pt):
+    """Store the result pt of the step with the given key in lemma_cache."""
+    name, prems, _ = key
+    if not isinstance(pt, ProofTerm):
+        return
+    if not (set(pt.hyps) <= set(prems) and (name == 'th-lemma' or pt.rule != 'sorry')):
+        if name != 'rewrite':
+            return
+        key = atoms_key(key)
+    lemma_cache[key] = pt
+    lemma_cache.move_to_end(key)
+    while len(lemma_cache) > max_lemma_cache:
+        lemma_cache.popitem(last=False)
+
+def clear_cache():
+    """Clear lemma_cache, together with the records kept for the last proof."""
+    lemma_cache.clear()
+    conj_expr.clear()
+    disj_expr.clear()
+    assert_atom.clear()
+    atoms.clear()
+
+def discharge_prems(pt, prems):
+    """Replace the premises assumed in pt by their proofs prems."""
+    used = []
+    for prem in prems:
+        if prem.prop in pt.hyps and all(prem.prop != p.prop for p in used):
+            used.append(prem)
+    for prem in reversed(used):
+        pt = pt.implies_intr(prem.prop)
+    for prem in used:
+        pt = pt.implies_elim(prem)
+    return pt
+
+def lemma_keys(term, net, order):
+    """Keys of the rewrite and th-lemma steps in the proof, with the
+    propositions of the premises obtained by translating their conclusions.
+
+    These usually agree with the keys computed during reconstruction, and
+    steps whose conclusions cannot be translated are skipped.
+
+    """
+    keys = dict()
+    for i in order:
+        if z3.is_quantifier(term[i]) or term[i].decl().name() not in lemma_methods:
+            continue
+        try:
+            prems = []
+            for j in net[i][:-1]:
+                prem = term[j]
+                prems.append(translate(prem.arg(prem.num_args()-1)))
+            concl = translate(term[net[i][-1]])
+        except Exception:
+            continue
+        key = (lemma_methods[term[i].decl().name()], tuple(prems), concl)
+        if not (use_lemma_cache and lookup_lemma(key) is not None):
+            keys[key] = None
+    return list(keys)
+
+# Keys of the steps reconstructed by the worker processes.
+_lemma_state = None
+
+def prove_lemma_task(i):
+    try:
+        return prove_lemma(_lemma_state[i])
+    except Exception:
+        print('prove_lemma_task: failed on %s' % str(_lemma_state[i][2]), file=sys.stderr)
+        traceback.print_exc()
+        return None
+
+def prove_lemmas_parallel(keys, num_workers):
+    """Reconstruct the steps with the given keys using num_workers
+    processes. Returns the dictionary from keys to results, omitting
+    steps that raise an exception (which are printed to stderr by the
+    workers, and are reconstructed again by proofrec).
+
+    """
+    global _lemma_state
+
+    _lemma_state = keys
+    try:
+        with multiprocessing.get_context('fork').Pool(num_workers) as pool:
+            pts = pool.map(prove_lemma_task, range(len(keys)))
+    finally:
+        _lemma_state = None
+
+    return {key: pt for key, pt in zip(keys, pts) if pt is not None}
+
+def proofrec(proof, bounds=deque(), trace=False, debug=False, assertions=None,
+             profile=None, num_workers=1):
+    """Reconstruct the Z3 proof, returns the resulting proof term.
+
+    The steps are reconstructed in depth-first order. Rewrite and th-lemma
+    steps only depend on their conclusion, the propositions of their
+    premises and the assertions, so their results are reused within the
+    proof and across proofs (see lemma_cache). If num_workers is greater than one, these
+    steps are first reconstructed in parallel by that many worker processes.
+    This is off by default: on prover/proofrec_bench.py it is slower than
+    serial reconstruction, as most of the time of a proof is spent on a
+    single step, and the cost of starting the workers and sending the
+    results back is not recovered.
+
+    If profile is given, the time taken by each rule is added to it. If trace
+    is true, print the steps reconstructed with sorry and the profile.
+
     """
     global conj_expr, disj_expr
+    if profile is None:
+        profile = RecProfile()
     term, net = index_and_relation(proof)
     order = DepthFirstOrder(net)
     r = dict()
@@ -1817,40 +2048,53 @@ def proofrec(proof, bounds=deque(), trace=False, debug=False, assertions=None):
     disj_expr.clear()
     assert_atom.clear()
     atoms.clear()
-    gaps = set()
     time1 = time.perf_counter()
     if assertions:
-        print("start process assertion!")
         handle_assertion(assertions)
-    with open('int_prf1.txt', 'a', encoding='utf-8') as f:
-        f.seek(0)
-        f.truncate()
-    print("done")
+
+    # Results of rewrite and th-lemma steps in this proof, including those
+    # that depend on the assertions.
+    results = dict()
+    if num_workers > 1:
+        t1 = time.perf_counter()
+        keys = lemma_keys(term, net, order)
+        if keys:
+            results = prove_lemmas_parallel(keys, num_workers)
+            if use_lemma_cache:
+                for key, pt in results.items():
+                    store_lemma(key, pt)
+        profile.parallel_time += time.perf_counter() - t1
+
     for i in order:
         args = tuple(r[j] for j in net[i])
-        # if trace:
-        #     print('term['+str(i)+']', term[i])
         if z3.is_quantifier(term[i]) or term[i].decl().name() not in method:
             r[i] = translate(term[i], bounds=bounds, subterms=args)
         else:
             method_name = term[i].decl().name()
             subterms = [term[j] for j in net[i]]
             t1 = time.perf_counter()
-            r[i] = convert_method(term[i], *args, subterms=subterms)
+            key = lemma_key(method_name, args)
+            reused = True
+            if key is None:
+                reused = False
+                r[i] = convert_method(term[i], *args, subterms=subterms)
+            elif key in results:
+                r[i] = discharge_prems(results[key], args[:-1])
+            else:
+                pt = lookup_lemma(key) if use_lemma_cache else None
+                if pt is None:
+                    reused = False
+                    pt = prove_lemma(key)
+                    if use_lemma_cache:
+                        store_lemma(key, pt)
+                results[key] = pt
+                r[i] = discharge_prems(pt, args[:-1])
             t2 = time.perf_counter()
-            with open('int_prf1.txt', 'a', encoding='utf-8') as f:
-                if r[i].rule == 'sorry' and method_name != 'def-axiom':
-                    gaps |= set(r[i].gaps)
-                    print('term['+str(i)+']', term[i], file=f)
-                    print('r['+str(i)+']', r[i], t2 - t1, file=f)
-                if trace:
-                    print('r['+str(i)+']', term[i].decl().name(), t2 - t1, file=f)
-    # conclusion = delete_redundant(r[0], redundant)
-    # redundant.clear()
-    time2 = time.perf_counter()
-    print("total time: ", time2 - time1)
-    # rpt = ProofReport()
-    # theory.check_proof(r[0].export(), rpt)
-    # print(rpt)
-    # print(r[0].export())
-    return r[0]
\ No newline at end of file
+            profile.add_step(method_name, t2 - t1, reused, r[i])
+            if trace and isinstance(r[i], ProofTerm) and r[i].rule == 'sorry' and method_name != 'def-axiom':
+                print('term['+str(i)+']', term[i])
+                print('r['+str(i)+']', r[i], t2 - t1)
+    profile.total_time += time.perf_counter() - time1
+    if trace:
+        print(profile)
+    return r[0]
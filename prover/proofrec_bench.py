@@ -0,0 +1,108 @@
+"""
+Benchmark for Z3 proof reconstruction.
+
+Reconstructs the proofs found by Z3 for the problems in testRec1,
+testRecSolveSet and testRecRealSet of prover/tests/proofrec_test.py
+(including those commented out in testRecRealSet). Each proof is
+reconstructed without proofrec.lemma_cache, with an empty cache, again
+with the filled cache, and with an empty cache using num_workers worker
+processes, checking that the results agree. Reports the time taken by
+each run, and the profile of the runs without cache. Usage:
+
+    python -m prover.proofrec_bench
+
+"""
+
+import contextlib
+import io
+import time
+
+from logic import context
+from syntax import parser
+from prover import proofrec, z3wrapper
+
+
+num_workers = 4
+
+rec_vars = {"s": 'nat => nat', "A": 'nat', "B": 'nat'}
+
+set_vars = {'m': 'nat', 'S': 'nat set', 'T': 'nat set', 'x': 'nat', 'a': "'a", 'A': "'a set"}
+
+real_set_vars = {'a': 'real', 'b': 'real', 'x': 'real', 'f': 'real => real',
+                 'S': 'real set', 'T': 'real set', 'n': 'nat'}
+
+test_data = [
+    (rec_vars, 's 0 = 0 & s 1 = 0 --> s 1 = s 0 * B'),
+    (rec_vars, 's 1 = s 0 * B & ~~s 0 = A --> s 1 = A * B'),
+    (rec_vars, 's 1 = s 0 * B & ~s 0 = A --> s 1 + B = (s 0 + 1) * B'),
+    (rec_vars, 'A * B + 1 = 1 + B * A'),
+    (rec_vars, 's 0 + s 1 = A --> A + s 2 = B --> s 0 + s 2 + s 1 = B'),
+    (rec_vars, '(!n. s n = 0) --> s 2 = 0'),
+    (set_vars, 'x Mem S --> S Sub T --> x Mem T'),
+    (set_vars, 'm Mem univ'),
+    (set_vars, 'x Mem (diff S T) --> x Mem S'),
+    (set_vars, '(?x1. x = x1 & x1 Mem S) --> x Mem S'),
+    (set_vars, '(?a1. a = a1 & a1 Mem A) --> a Mem A'),
+    (real_set_vars, 'max a b = (1/2) * (a + b + abs(a - b))'),
+    (real_set_vars, '{x. (a <= x & x <= b) & ~(a < x & x < b)} Sub {a, b}'),
+    (real_set_vars, '(x Mem T --> 0 <= f x) --> S Sub T --> (if x Mem S then f x else 0) <= (if x Mem T then f x else 0)'),
+    (real_set_vars, 'max (if x Mem S then (1::real) else 0) (if x Mem T then 1 else 0) = (if x Mem (S Un T) then 1 else 0)'),
+    (real_set_vars, 'min (if x Mem S then (1::real) else 0) (if x Mem T then 1 else 0) = (if x Mem (S Int T) then 1 else 0)'),
+    (real_set_vars, 'S Int T = empty_set --> (if x Mem S then (1::real) else 0) + (if x Mem T then 1 else 0) = (if x Mem (S Un T) then 1 else 0)'),
+    (real_set_vars, 'S ∪ T = S ∩ T ∪ {x. x ∈ S & ~x ∈ T} ∪ {x. x ∈ T & ~x ∈ S}'),
+    (real_set_vars, '(0::real) <= (if x Mem s & 1 / (of_nat n + 1) <= abs (f x) then 1 else 0)'),
+    (real_set_vars, '(0::real) <= of_nat n + 1'),
+    (real_set_vars, '1 / (of_nat n + 1) < b --> 1 < (of_nat n + 1) * b'),
+    (real_set_vars, 'a <= of_nat n --> a < of_nat (n + 1)'),
+    (real_set_vars, '~(n = 0) --> of_nat (n - 1) + (1::real) = of_nat n'),
+    (real_set_vars, '(1::real) = 0 --> real_inverse a = b'),
+]
+
+def reconstruct(proof, assertions, profile, workers):
+    """Returns the result of reconstruction (the theorem, or the name of
+    the exception raised) and the time taken.
+
+    """
+    start_time = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            pt = proofrec.proofrec(proof, assertions=assertions, profile=profile, num_workers=workers)
+        res = ('sorry' if pt.rule == 'sorry' else 'OK', pt.th)
+    except Exception as e:
+        res = ('error', type(e).__name__)
+    return res, time.perf_counter() - start_time
+
+def run(vars, t, total_profile):
+    context.set_context('smt', vars=vars)
+    proof, assertions = z3wrapper.solve_and_proof(parser.parse_term(t))
+
+    proofrec.use_lemma_cache = False
+    profile = proofrec.RecProfile()
+    res, serial_time = reconstruct(proof, assertions, profile, 1)
+    total_profile.merge(profile)
+
+    proofrec.use_lemma_cache = True
+    proofrec.clear_cache()
+    res_empty, empty_time = reconstruct(proof, assertions, proofrec.RecProfile(), 1)
+    res_filled, filled_time = reconstruct(proof, assertions, proofrec.RecProfile(), 1)
+    proofrec.clear_cache()
+    res_parallel, parallel_time = reconstruct(proof, assertions, proofrec.RecProfile(), num_workers)
+
+    assert res == res_empty == res_filled == res_parallel, "proofrec_bench: results differ"
+    print('%50s | %5s | %7.2f | %7.2f | %7.2f | %8.2f' % (
+        t[:50], res[0], serial_time, empty_time, filled_time, parallel_time))
+    return serial_time, empty_time, filled_time, parallel_time
+
+
+if __name__ == "__main__":
+    print('%50s | %5s | %7s | %7s | %7s | %8s' % (
+        'Problem', 'Res', 'Serial', 'Empty', 'Filled', 'Parallel'))
+    print('-' * 98)
+    total_profile = proofrec.RecProfile()
+    total = [0.0] * 4
+    for vars, t in test_data:
+        times = run(vars, t, total_profile)
+        total = [a + b for a, b in zip(total, times)]
+    print('%50s | %5s | %7.2f | %7.2f | %7.2f | %8.2f' % ('Total', '', *total))
+    print()
+    print(total_profile)
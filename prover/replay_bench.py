@@ -0,0 +1,95 @@
+"""
+Benchmark for reconstructing proofs of the SAT solver in HOL.
+
+Proves the propositional problems in prover/tests/pelletier.json and
+pigeonhole problems using proofrec.solve_cnf, with and without trimming
+the resolution proof to the clauses needed for the empty clause. Reports
+the number of learned clauses replayed, the number of proof terms
+constructed, and the time taken. Usage:
+
+    python -m prover.replay_bench
+
+"""
+
+import json
+import time
+
+from kernel.type import BoolType
+from kernel.term import Var, Not, And, Or
+from kernel.proofterm import ProofTerm
+from logic import context
+from syntax import parser
+from prover import proofrec
+from prover import sat
+from prover.sat_bench import pigeonhole
+
+
+class ProofTermCounter():
+    """Count proof terms constructed, by rule."""
+    def __init__(self):
+        self.counts = dict()
+
+    def __enter__(self):
+        self.old_init = ProofTerm.__init__
+        counts, old_init = self.counts, self.old_init
+
+        def init(pt, rule, *args, **kwargs):
+            counts[rule] = counts.get(rule, 0) + 1
+            old_init(pt, rule, *args, **kwargs)
+
+        ProofTerm.__init__ = init
+        return self
+
+    def __exit__(self, *args):
+        ProofTerm.__init__ = self.old_init
+
+    def total(self):
+        return sum(self.counts.values())
+
+
+def hol_of_cnf(cnf):
+    """Convert CNF into a HOL term."""
+    def hol_of_lit(lit):
+        name, val = lit
+        return Var(name, BoolType) if val else Not(Var(name, BoolType))
+    return And(*(Or(*(hol_of_lit(lit) for lit in clause)) for clause in cnf))
+
+def run(name, F):
+    """Prove F with and without trimming."""
+    num_learnt = dict()
+    old_solve_cnf = sat.solve_cnf
+    def solve_cnf(cnf):
+        res, proof = old_solve_cnf(cnf)
+        num_learnt['all'] = len(proof)
+        num_learnt['trim'] = len(sat.trim_proof(proof))
+        return res, proof
+
+    line = '%16s |' % name
+    sat.solve_cnf = solve_cnf
+    try:
+        for trim in [False, True]:
+            with ProofTermCounter() as counter:
+                start_time = time.perf_counter()
+                proofrec.solve_cnf(F, trim=trim)
+                replay_time = time.perf_counter() - start_time
+            line += ' %7d | %7d | %5d | %7.2f |' % (
+                num_learnt['trim' if trim else 'all'], counter.total(),
+                counter.counts.get('resolution', 0), replay_time)
+    finally:
+        sat.solve_cnf = old_solve_cnf
+    print(line)
+
+
+if __name__ == "__main__":
+    print('                 |             No trimming             |              Trimming')
+    print('         Problem | Learned |  Terms  | Resol |  Time   | Learned |  Terms  | Resol |  Time')
+    print('--------------------------------------------------------------------------------------------')
+    with open('prover/tests/pelletier.json', 'r', encoding='utf-8') as f:
+        f_data = json.load(f)
+    for problem in f_data:
+        context.set_context('sat', vars=problem['vars'])
+        run(problem['name'], parser.parse_term(problem['prop']))
+
+    context.set_context('sat')
+    for n in range(3, 6):
+        run('pigeonhole %d' % n, Not(hol_of_cnf(pigeonhole(n))))
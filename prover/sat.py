@@ -1,4 +1,4 @@
-from copy import copy
+import heapq
 
 """
 Implementation of SAT solver.
@@ -57,130 +57,549 @@ def is_solution(cnf, assignment):
             return False
     return True
 
-def solve_cnf(cnf, *, debug=False):
-    cnf = copy(cnf)  # avoid modifying the input
-    assigns = dict()
-    level = 0
-    proofs = dict()
-    
-    def print_debug(s):
-        if debug:
+def luby(i):
+    """The i'th element (starting from 0) of the Luby sequence
+    1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ..., used for restart intervals.
+
+    """
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) // 2
+        seq -= 1
+        i = i % size
+    return 2 ** seq
+
+
+class SATSolver():
+    """CDCL solver for CNFs.
+
+    The solver uses two-watched-literal propagation, first-UIP conflict
+    analysis, VSIDS decision heuristic with phase saving, Luby restarts
+    and deletion of inactive learned clauses.
+
+    The solver is incremental: clauses can be added between calls to
+    solve, and each call can assume a list of literals. Clauses added and
+    learned clauses are numbered together, in the order they are added or
+    learned.
+
+    Internally, variable names are numbered from 0, and the literal (x, b)
+    is represented by the integer 2 * i + (0 if b else 1), where i is the
+    number of x. So the negation of a literal lit is lit ^ 1.
+
+    For each learned clause, the solver records the proof as a list of
+    clause ids [c_0, c_1, ..., c_k], meaning that the clause is obtained by
+    resolving c_0 with c_1, then the result with c_2, and so on. Each
+    resolution is on the unique variable appearing positively in one
+    clause and negatively in the other.
+
+    """
+    def __init__(self, *, debug=False):
+        self.debug = debug
+
+        # Variables
+        self.names = []           # name of each variable
+        self.var_index = dict()   # mapping from names to variables
+        self.vals = []            # for each literal, 1 if true, -1 if false, 0 if unassigned
+        self.level = []           # decision level of each assigned variable
+        self.reason = []          # id of clause implying each assigned variable (None for decisions)
+        self.activity = []        # VSIDS activity of each variable
+        self.phase = []           # saved phase of each variable
+        self.order = []           # heap of (-activity, var), may contain outdated entries
+        self.var_inc = 1.0
+
+        # Clauses, deleted learned clauses are replaced by None
+        self.clauses = []
+        self.watches = []         # for each literal, ids of clauses watching it
+        self.proofs = dict()      # proof of each learned clause
+        self.learnts = dict()     # activity of each learned clause not deleted
+        self.cla_inc = 1.0
+        self.max_learnts = 0
+
+        # Assignments
+        self.trail = []           # assigned literals, in order of assignment
+        self.trail_lim = []       # position in trail of each decision
+        self.qhead = 0            # position in trail of the next literal to propagate
+
+        # Clause found to be false at level 0 while adding clauses
+        self.confl_id = None
+
+        # Id of the empty clause, once derived
+        self.empty_id = None
+
+        # Assumptions of the current call to solve
+        self.assumptions = []
+
+        # After solve returns False: the assumptions responsible, and the id
+        # of the clause derived, consisting of negations of these assumptions.
+        self.core = []
+        self.final_id = None
+
+    def print_debug(self, s):
+        if self.debug:
             print(s)
 
-    def unit_propagate():
-        while True:
-            has_unsatisfied = False  # whether there is still clause to be satisfied
-            has_propagate = False  # whether a propagation has occurred
-            for clause_id, clause in enumerate(cnf):
-                satisfied = False  # whether the current clause is satisfied
-                unassigned = []  # list of unassigned literals
-
-                # Iterate over the literals, check if the existing assignment satisfies
-                # the clause, and if not, what are the unassigned literals.
-                for lit in clause:
-                    name, val = lit
-                    if name in assigns:
-                        if val == assigns[name][0]:
-                            satisfied = True
-                            break
-                    else:
-                        unassigned.append(lit)
-
-                # If the clause is not already satisfied, no unassigned literals implies
-                # conflict. One unassigned literals implies possibility for unit propagation.
-                if not satisfied:
-                    if len(unassigned) == 0:
-                        return 'conflict', clause_id
-                    elif len(unassigned) == 1:
-                        name, val = unassigned[0]
-                        print_debug('Unit propagate %s = %s using clause %s' % (name, val, clause_id))
-                        assigns[name] = (val, False, level, clause_id)
-                        has_propagate = True
+    def str_of_lit(self, lit):
+        return str_of_literal(self.get_literal(lit))
+
+    def get_literal(self, lit):
+        """Convert internal literal into the pair (x, b)."""
+        return (self.names[lit >> 1], lit & 1 == 0)
+
+    def add_var(self, name):
+        """Add a new variable of the given name, and return its number."""
+        if name not in self.var_index:
+            v = len(self.names)
+            self.var_index[name] = v
+            self.names.append(name)
+            self.vals.extend([0, 0])
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.phase.append(False)
+            self.watches.extend([[], []])
+            heapq.heappush(self.order, (0.0, v))
+        return self.var_index[name]
+
+    def decision_level(self):
+        return len(self.trail_lim)
+
+    def assign(self, lit, reason):
+        v = lit >> 1
+        self.vals[lit] = 1
+        self.vals[lit ^ 1] = -1
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(lit)
+
+    def add_clause(self, clause):
+        """Add a clause (in the form of list of pairs (x, b)) to the solver.
+        Return the id of the clause. Assignments found by the previous call
+        to solve are cancelled.
+
+        """
+        self.backtrack(0)
+        clause_id = len(self.clauses)
+        lits = []
+        for name, val in clause:
+            lit = 2 * self.add_var(name) + (0 if val else 1)
+            if lit not in lits:
+                lits.append(lit)
+        self.clauses.append(lits)
+
+        if any(lit ^ 1 in lits for lit in lits):
+            # Tautology, never used in propagation
+            return clause_id
+
+        if self.confl_id is not None or self.empty_id is not None:
+            return clause_id
+
+        vals = self.vals
+        if len(lits) == 0:
+            self.confl_id = clause_id
+        elif len(lits) == 1:
+            if vals[lits[0]] == 0:
+                self.assign(lits[0], clause_id)
+            elif vals[lits[0]] == -1:
+                self.confl_id = clause_id
+        else:
+            # Watch the literals not yet false, if possible
+            lits.sort(key=lambda lit: vals[lit] == -1)
+            self.watches[lits[0]].append(clause_id)
+            self.watches[lits[1]].append(clause_id)
+            if vals[lits[0]] == -1:
+                self.confl_id = clause_id
+            elif vals[lits[1]] == -1 and vals[lits[0]] == 0:
+                self.assign(lits[0], clause_id)
+        return clause_id
+
+    def propagate(self):
+        """Unit propagation using watched literals. Returns the id of a
+        conflicting clause, or None if there is no conflict.
+
+        """
+        vals, clauses, watches, trail = self.vals, self.clauses, self.watches, self.trail
+        level, reason = self.level, self.reason
+        cur_level = len(self.trail_lim)
+        qhead = self.qhead
+        while qhead < len(trail):
+            false_lit = trail[qhead] ^ 1
+            qhead += 1
+            ws = watches[false_lit]
+            keep = []
+            for i, clause_id in enumerate(ws):
+                c = clauses[clause_id]
+                if c is None:
+                    # Deleted learned clause
+                    continue
+
+                # Make sure the false literal is c[1]
+                first = c[0]
+                if first == false_lit:
+                    first = c[0] = c[1]
+                    c[1] = false_lit
+                if vals[first] == 1:
+                    keep.append(clause_id)
+                    continue
+
+                # Look for a new literal to watch
+                for k in range(2, len(c)):
+                    lit = c[k]
+                    if vals[lit] != -1:
+                        c[1] = lit
+                        c[k] = false_lit
+                        watches[lit].append(clause_id)
                         break
+                else:
+                    keep.append(clause_id)
+                    if vals[first] == -1:
+                        # Conflict, keep the remaining watches
+                        keep.extend(ws[i+1:])
+                        watches[false_lit] = keep
+                        self.qhead = len(trail)
+                        return clause_id
                     else:
-                        has_unsatisfied = True
+                        v = first >> 1
+                        vals[first] = 1
+                        vals[first ^ 1] = -1
+                        level[v] = cur_level
+                        reason[v] = clause_id
+                        trail.append(first)
+            watches[false_lit] = keep
+        self.qhead = qhead
+        return None
 
-            if not has_propagate:
-                if not has_unsatisfied:
-                    return 'satisfiable'
-                else:
-                    return None
+    def bump_var(self, v):
+        activity = self.activity
+        activity[v] += self.var_inc
+        if activity[v] > 1e100:
+            for i in range(len(activity)):
+                activity[i] *= 1e-100
+            self.var_inc *= 1e-100
+            self.order = [(-activity[i], i) for i in range(len(activity))]
+            heapq.heapify(self.order)
+        elif self.vals[2 * v] == 0:
+            heapq.heappush(self.order, (-activity[v], v))
 
-    def analyze_conflict(clause_id):
-        clause = cnf[clause_id]
-        proof = [clause_id]
-        print_debug('Analyze conflict on clause %s: %s' % (clause_id, str_of_clause(clause)))
+    def bump_clause(self, clause_id):
+        if clause_id in self.learnts:
+            self.learnts[clause_id] += self.cla_inc
+            if self.learnts[clause_id] > 1e20:
+                for i in self.learnts:
+                    self.learnts[i] *= 1e-20
+                self.cla_inc *= 1e-20
+
+    def analyze(self, confl):
+        """First-UIP conflict analysis on the given conflicting clause.
+        Returns the learned clause, with the asserting literal first, and
+        its proof.
+
+        """
+        level, reason, trail, clauses = self.level, self.reason, self.trail, self.clauses
+        cur_level = self.decision_level()
+        seen = set()
+        learnt = [None]
+        proof = [confl]
+        counter = 0
+        clause_id, p = confl, None
+        idx = len(trail) - 1
         while True:
-            has_resolution = False
-            for lit in clause:
-                name, val = lit
-                assert name in assigns and val != assigns[name][0]
-                _, is_decide, level, propagate_id = assigns[name]
-                if not is_decide:
-                    has_resolution = True
-                    proof.append(propagate_id)
-                    clause = resolution(clause, cnf[propagate_id], name)
-                    print_debug('Resolution with clause %s on atom %s, obtaining %s' % (propagate_id, name, str_of_clause(clause)))
-                    break
-
-            if not has_resolution:
+            self.bump_clause(clause_id)
+            for q in clauses[clause_id]:
+                v = q >> 1
+                if q != p and v not in seen:
+                    seen.add(v)
+                    self.bump_var(v)
+                    if level[v] == cur_level:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+
+            # Find the next literal to resolve on
+            while trail[idx] >> 1 not in seen:
+                idx -= 1
+            p = trail[idx]
+            idx -= 1
+            seen.remove(p >> 1)
+            counter -= 1
+            if counter == 0:
                 break
+            clause_id = reason[p >> 1]
+            proof.append(clause_id)
+
+        learnt[0] = p ^ 1
+        return learnt, proof
+
+    def analyze_final(self, confl, true_lit=None):
+        """Given a clause all of whose literals except true_lit are false,
+        derive by resolution a clause consisting of true_lit and the
+        negations of some decisions (the empty clause if there are no
+        decisions and true_lit is None). Returns the id of the clause.
+
+        """
+        reason, trail, clauses = self.reason, self.trail, self.clauses
+        lits = [] if true_lit is None else [true_lit]
+        seen = set(lit >> 1 for lit in clauses[confl] if lit != true_lit)
+        proof = [confl]
+        for idx in range(len(trail) - 1, -1, -1):
+            v = trail[idx] >> 1
+            if v in seen:
+                if reason[v] is None:
+                    lits.append(trail[idx] ^ 1)
+                else:
+                    proof.append(reason[v])
+                    seen.update(lit >> 1 for lit in clauses[reason[v]] if lit >> 1 != v)
+        return self.add_learnt(lits, proof)
+
+    def add_learnt(self, lits, proof):
+        """Record a learned clause with its proof, and return its id."""
+        clause_id = len(self.clauses)
+        self.clauses.append(lits)
+        self.proofs[clause_id] = proof
+        self.print_debug('Learn clause %s: %s by %s' % (
+            clause_id, str_of_clause([self.get_literal(lit) for lit in lits]), proof))
+        return clause_id
+
+    def backtrack(self, target_level):
+        """Cancel all assignments above the target level."""
+        if self.decision_level() <= target_level:
+            return
+        vals, trail, phase, activity = self.vals, self.trail, self.phase, self.activity
+        start = self.trail_lim[target_level]
+        for idx in range(len(trail) - 1, start - 1, -1):
+            lit = trail[idx]
+            v = lit >> 1
+            vals[lit] = vals[lit ^ 1] = 0
+            phase[v] = lit & 1 == 0
+            self.reason[v] = None
+            heapq.heappush(self.order, (-activity[v], v))
+        del trail[start:]
+        del self.trail_lim[target_level:]
+        self.qhead = len(trail)
+
+        # Remove outdated entries of the heap
+        if len(self.order) > 4 * len(self.names) + 100:
+            self.order = [(-activity[v], v) for v in range(len(self.names)) if vals[2 * v] == 0]
+            heapq.heapify(self.order)
+
+    def pick_branch_lit(self):
+        """Unassigned variable of highest activity, with the saved phase.
+        Returns None if all variables are assigned.
 
-        return proof, clause
-    
-    
-    def backtrack(clause_id):
-        # Analyze conflict, record the new clause and its proof
-        proof, clause = analyze_conflict(clause_id)
-        new_id = len(cnf)
-        cnf.append(clause)
-        proofs[new_id] = proof
-
-        # Sort the clause by level, find the second to last level
-        if len(clause) == 0:
-            return 'unsatisfiable'
-        elif len(clause) == 1:
-            backtrack_level = 0
+        """
+        order, vals, activity = self.order, self.vals, self.activity
+        while order:
+            neg_act, v = heapq.heappop(order)
+            if vals[2 * v] == 0 and -neg_act == activity[v]:
+                return 2 * v + (0 if self.phase[v] else 1)
+        # Heap entries may be outdated after rescaling, check all variables
+        for v in range(len(self.names)):
+            if vals[2 * v] == 0:
+                return 2 * v + (0 if self.phase[v] else 1)
+        return None
+
+    def locked(self, clause_id):
+        """Whether the clause is the reason of a current assignment."""
+        c = self.clauses[clause_id]
+        return self.vals[c[0]] == 1 and self.reason[c[0] >> 1] == clause_id
+
+    def reduce_learnts(self):
+        """Delete the half of learned clauses with lowest activity, except
+        binary clauses and reasons of current assignments.
+
+        """
+        ids = sorted(self.learnts, key=lambda i: self.learnts[i])
+        limit = self.cla_inc / len(ids)
+        for k, clause_id in enumerate(ids):
+            if len(self.clauses[clause_id]) > 2 and not self.locked(clause_id) and \
+               (k < len(ids) // 2 or self.learnts[clause_id] < limit):
+                self.clauses[clause_id] = None
+                del self.learnts[clause_id]
+
+    def search(self, num_conflicts):
+        """Search until a solution or the empty clause is found, or until
+        the given number of conflicts occurs. Returns True, False or None
+        respectively.
+
+        """
+        conflicts = 0
+        while True:
+            confl = self.propagate()
+            if confl is not None:
+                conflicts += 1
+                if self.decision_level() == 0:
+                    self.empty_id = self.final_id = self.analyze_final(confl)
+                    self.core = []
+                    return False
+
+                learnt, proof = self.analyze(confl)
+                self.print_debug('Conflict on clause %s at level %s' % (confl, self.decision_level()))
+
+                # Backtrack to the second highest level in the learned clause
+                back_level = 0
+                max_i = 1
+                for i in range(1, len(learnt)):
+                    if self.level[learnt[i] >> 1] > back_level:
+                        back_level, max_i = self.level[learnt[i] >> 1], i
+                if len(learnt) > 1:
+                    learnt[1], learnt[max_i] = learnt[max_i], learnt[1]
+                self.backtrack(back_level)
+
+                clause_id = self.add_learnt(learnt, proof)
+                if len(learnt) > 1:
+                    self.watches[learnt[0]].append(clause_id)
+                    self.watches[learnt[1]].append(clause_id)
+                    self.learnts[clause_id] = self.cla_inc
+                self.assign(learnt[0], clause_id)
+
+                self.var_inc /= 0.95
+                self.cla_inc /= 0.999
+            else:
+                if num_conflicts is not None and conflicts >= num_conflicts:
+                    self.backtrack(0)
+                    return None
+
+                if len(self.learnts) - len(self.trail) >= self.max_learnts:
+                    self.reduce_learnts()
+
+                # Assumptions are decided first, each at its own level
+                lit = None
+                while self.decision_level() < len(self.assumptions):
+                    p = self.assumptions[self.decision_level()]
+                    if self.vals[p] == 1:
+                        # Already true, use a level without decision
+                        self.trail_lim.append(len(self.trail))
+                    elif self.vals[p] == -1:
+                        self.analyze_assumption(p)
+                        return False
+                    else:
+                        lit = p
+                        break
+
+                if lit is None:
+                    lit = self.pick_branch_lit()
+                    if lit is None:
+                        return True
+                self.print_debug('Decide %s at level %s' % (self.str_of_lit(lit), self.decision_level() + 1))
+                self.trail_lim.append(len(self.trail))
+                self.assign(lit, None)
+
+    def analyze_assumption(self, p):
+        """Record the core and the final clause, when the assumption p is
+        found to be false.
+
+        """
+        reason = self.reason[p >> 1]
+        if reason is None:
+            # The negation of p is also an assumption
+            self.core = [self.get_literal(p ^ 1), self.get_literal(p)]
+            self.final_id = None
         else:
-            clause = sorted(clause, key=lambda lit: assigns[lit[0]][2])
-            name, _ = clause[-2]
-            backtrack_level = assigns[name][2]
-
-        # Backtrack to that level
-        assigned_names = list(assigns.keys())
-        for name in assigned_names:
-            if assigns[name][2] > backtrack_level:
-                del assigns[name]
-
-        return backtrack_level
-    
-    # Find set of all variables
-    variables = set()
+            self.final_id = self.analyze_final(reason, p ^ 1)
+            self.core = [self.get_literal(lit ^ 1) for lit in self.clauses[self.final_id]]
+
+    def solve(self, assumptions=None):
+        """Solve the clauses added so far, with the given list of assumed
+        literals (pairs (x, b)). Returns True if satisfiable and False if
+        unsatisfiable.
+
+        Learned clauses and activities are kept between calls. If the
+        result is False, unsat_core returns the assumptions responsible, and
+        final_id is the id of the clause derived from the clauses added,
+        consisting of negations of these assumptions (the empty clause if
+        the core is empty). Proofs of the learned clauses are in proofs.
+
+        """
+        if assumptions is None:
+            assumptions = []
+
+        self.backtrack(0)
+        self.assumptions = [2 * self.add_var(name) + (0 if val else 1) for name, val in assumptions]
+        if self.empty_id is not None:
+            self.core, self.final_id = [], self.empty_id
+            return False
+        if self.confl_id is not None:
+            self.empty_id = self.final_id = self.analyze_final(self.confl_id)
+            self.core = []
+            return False
+
+        self.max_learnts = max((len(self.clauses) - len(self.proofs)) / 3, 100)
+        restarts = 0
+        while True:
+            res = self.search(100 * luby(restarts))
+            if res is not None:
+                return res
+            restarts += 1
+            self.max_learnts *= 1.1
+
+    def unsat_core(self):
+        """Assumptions responsible for the last result False, as a list of
+        pairs (x, b).
+
+        """
+        return self.core
+
+    def get_assignment(self):
+        """Assignment of all variables, after solve returns True."""
+        return dict((name, self.vals[2 * v] == 1) for v, name in enumerate(self.names))
+
+
+def trim_proof(proofs, clause_id=None):
+    """Return the part of proofs needed to derive the given clause (by
+    default, the last clause derived).
+
+    """
+    if clause_id is None:
+        clause_id = max(proofs.keys())
+
+    res = dict()
+    stack = [clause_id]
+    while stack:
+        clause_id = stack.pop()
+        if clause_id in proofs and clause_id not in res:
+            res[clause_id] = proofs[clause_id]
+            stack.extend(proofs[clause_id])
+    return res
+
+def check_proof(cnf, proofs):
+    """Check the proof of unsatisfiability returned by solve_cnf (possibly
+    trimmed). Each resolution must be on exactly one variable, and the last
+    clause derived must be empty.
+
+    """
+    clauses = dict((i, set(clause)) for i, clause in enumerate(cnf))
+    for clause_id in sorted(proofs.keys()):
+        proof = proofs[clause_id]
+        if clause_id in clauses or any(prev_id not in clauses for prev_id in proof):
+            return False
+        clause = clauses[proof[0]]
+        for prev_id in proof[1:]:
+            prev = clauses[prev_id]
+            pivots = [name for name, val in clause if (name, not val) in prev]
+            if len(pivots) != 1:
+                return False
+            clause = set(resolution(clause, prev, pivots[0]))
+        clauses[clause_id] = clause
+    return len(proofs) > 0 and len(clauses[max(proofs.keys())]) == 0
+
+
+def solve_cnf(cnf, *, debug=False):
+    """Solve the given CNF.
+
+    If the CNF is satisfiable, returns 'satisfiable' together with an
+    assignment. Otherwise, returns 'unsatisfiable' together with a
+    dictionary mapping ids of learned clauses to their proofs (see
+    SATSolver). Learned clauses are numbered consecutively starting from
+    len(cnf), and the last learned clause is the empty clause.
+
+    """
+    solver = SATSolver(debug=debug)
     for clause in cnf:
-        for name, _ in clause:
-            variables.add(name)
-
-    propagate_res = unit_propagate()
-    while True:
-        if propagate_res == 'satisfiable':
-            # Formula is satisfiable, return only assigned values
-            assignment = dict((name, val) for name, (val, _, _, _) in assigns.items())
-            return 'satisfiable', assignment
-        elif propagate_res is None:
-            # Unit propagation stops, choose a new variable
-            level += 1
-            for var in variables:
-                if var not in assigns:
-                    assigns[var] = (True, True, level, None)
-                    break
-        else:
-            # Conflict occurs, backtrack
-            _, clause_id = propagate_res
-            backtrack_res = backtrack(clause_id)
-            if backtrack_res == 'unsatisfiable':
-                # Formula is unsatisfiable, return the proof
-                return 'unsatisfiable', proofs
-            else:
-                level = backtrack_res
-            
-        propagate_res = unit_propagate()
+        solver.add_clause(clause)
+
+    if solver.solve():
+        return 'satisfiable', solver.get_assignment()
+    else:
+        return 'unsatisfiable', solver.proofs
@@ -0,0 +1,113 @@
+"""
+Benchmark for the SAT solver.
+
+Solves a DIMACS file (sat/x.cnf by default), pigeonhole problems and
+random 3-SAT problems at the ratio 4.26 of clauses to variables, and
+reports the time taken. Solutions and proofs of unsatisfiability are
+checked.
+
+Then runs a sequence of queries with assumptions on a random 3-SAT
+problem that is strengthened by adding a clause every few queries. The
+queries are answered by a single incremental solver, and by solving each
+query from scratch. Usage:
+
+    python -m prover.sat_bench [cnf_file]
+
+"""
+
+import random
+import sys
+import time
+
+from prover import sat
+from sat import zchaff
+
+
+def pigeonhole(n):
+    """CNF stating that n+1 pigeons are placed in n holes, with at most
+    one pigeon in each hole (unsatisfiable).
+
+    """
+    def p(i, j):
+        return 'p%d_%d' % (i, j)
+
+    cnf = [[(p(i, j), True) for j in range(n)] for i in range(n+1)]
+    for j in range(n):
+        for i1 in range(n+1):
+            for i2 in range(i1+1, n+1):
+                cnf.append([(p(i1, j), False), (p(i2, j), False)])
+    return cnf
+
+def random_3sat(num_vars, num_clauses, seed):
+    """Random 3-SAT problem with the given number of variables and clauses."""
+    rand = random.Random(seed)
+    cnf = []
+    for _ in range(num_clauses):
+        names = rand.sample(range(num_vars), 3)
+        cnf.append([('x' + str(i), rand.random() < 0.5) for i in names])
+    return cnf
+
+def run(name, cnf):
+    start_time = time.perf_counter()
+    res, cert = sat.solve_cnf(cnf)
+    solve_time = time.perf_counter() - start_time
+    if res == 'satisfiable':
+        assert sat.is_solution(cnf, cert), "sat_bench: wrong solution"
+    else:
+        assert sat.check_proof(cnf, cert), "sat_bench: wrong proof"
+    print('%20s | %5d | %6d | %13s | %8.3f' % (name, len(set(lit[0] for clause in cnf for lit in clause)),
+                                              len(cnf), res, solve_time))
+
+
+def run_incremental(num_vars, num_clauses, num_queries, seed):
+    """Sequence of queries, each adding a clause with probability 1/4 and
+    assuming three random literals.
+
+    """
+    rand = random.Random(seed)
+    cnf = random_3sat(num_vars, num_clauses, seed)
+    queries = []
+    for _ in range(num_queries):
+        new_clauses = random_3sat(num_vars, 1, rand.random()) if rand.random() < 0.25 else []
+        assumptions = [('x' + str(i), rand.random() < 0.5) for i in rand.sample(range(num_vars), 3)]
+        queries.append((new_clauses, assumptions))
+
+    start_time = time.perf_counter()
+    solver = sat.SATSolver()
+    for clause in cnf:
+        solver.add_clause(clause)
+    incr_res = []
+    for new_clauses, assumptions in queries:
+        for clause in new_clauses:
+            solver.add_clause(clause)
+        incr_res.append(solver.solve(assumptions))
+    incr_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    scratch_res = []
+    for new_clauses, assumptions in queries:
+        cnf = cnf + new_clauses
+        res, _ = sat.solve_cnf(cnf + [[lit] for lit in assumptions])
+        scratch_res.append(res == 'satisfiable')
+    scratch_time = time.perf_counter() - start_time
+
+    assert incr_res == scratch_res, "sat_bench: incremental results differ"
+    print('Queries: %d (%d satisfiable), final clauses: %d' % (num_queries, sum(incr_res), len(cnf)))
+    print('Incremental:  %.2f s' % incr_time)
+    print('From scratch: %.2f s' % scratch_time)
+
+
+if __name__ == "__main__":
+    cnf_file = sys.argv[1] if len(sys.argv) > 1 else 'sat/x.cnf'
+
+    print('             Problem |  Vars | Clauses |    Result     |   Time')
+    print('----------------------------------------------------------------')
+    run(cnf_file, [list(clause) for clause in zchaff.read_cnf_file(cnf_file)])
+    for n in range(5, 9):
+        run('pigeonhole %d' % n, pigeonhole(n))
+    for num_vars in [50, 100, 150, 200]:
+        for seed in range(3):
+            run('random %d (%d)' % (num_vars, seed), random_3sat(num_vars, int(num_vars * 4.26), seed))
+
+    print()
+    run_incremental(150, 400, 1000, 0)
@@ -1,8 +1,3 @@
-"""
-Note that the equality dict in Simplex data structure can be simplified by elimate the jar whose coefficient
-is zero. This will be fixed later.
-"""
-
 """
 Implementation of Simplex-based quantifier-free linear arithmetic solver.
 
@@ -185,10 +180,27 @@ def delete_elem(s, elem):
     r.remove(elem)
     return r
 
+def slack_name(i):
+    """Name of the i-th introduced variable: $a$, ..., $z$, $a1$, ..."""
+    if i < len(string.ascii_lowercase):
+        return "$" + string.ascii_lowercase[i] + "$"
+    else:
+        n = len(string.ascii_lowercase)
+        return "$%s%d$" % (string.ascii_lowercase[i % n], i // n)
+
 class Simplex:
-    """"""
+    """
+    Each row of the tableau expresses a basic variable as a sum of non-basic
+    variables, and is stored as a dict from non-basic variables to their
+    (non-zero) coefficients.
+
+    Bounds can be asserted incrementally: bounds asserted after push() are
+    retracted by the matching pop(), keeping the tableau and the assignment,
+    so that the next check() starts from the last basis.
+    """
     def __init__(self, ilp=False):
-        # table represents the solver current tableau(state)
+        # table represents the solver current tableau(state), key is the basic
+        # variable, value is the dict from non-basic variables to coefficients
         self.equality = dict()
 
         # elementary atoms: y ⋈ b
@@ -211,7 +223,7 @@ class Simplex:
         # bounds is a dict, key is the var_name, value is a pair: (lower_bound, upper_bound)
         self.bound = dict()
 
-        # key is non-basic variable, value are the basic variables corresponding to it
+        # key is non-basic variable, value are the basic variables whose rows contain it
         self.nbasic_basic = dict()
 
         # orignial inequalities inserted into solver
@@ -232,6 +244,15 @@ class Simplex:
         # represents the input non-atom expressions
         self.matrix = dict()
 
+        # old bounds of variables whose bounds are changed in the open scopes,
+        # as pairs (var_name, bound), and the length of trail when each scope
+        # is opened.
+        self.trail = []
+        self.scopes = []
+
+        # number of pivots in each check before using Bland's rule
+        self.bland_limit = 100
+
     def __str__(self):
         s = "Original inequlities: \n"
         for ineq in self.original:
@@ -239,7 +260,7 @@ class Simplex:
 
         s += "Equality:\n"
         for lhs, rhs in self.equality.items():
-            s += "\t %s := " % str(lhs) + " + ".join(str(jar) for jar in rhs) + "\n"
+            s += "\t %s := " % str(lhs) + " + ".join("%s * %s" % (str(c), v) for v, c in rhs.items()) + "\n"
 
         s += "\nlower_atom:\n"
         for lhs, rhs in self.lower_atom:
@@ -271,153 +292,75 @@ class Simplex:
             s += "\t %s: " % str(key) + ", ".join(str(v) for v in value) + "\n"
         return s
 
+    def add_var(self, x):
+        """Add an input variable, initially non-basic and unbounded."""
+        self.input_vars.add(x)
+        if x not in self.mapping:
+            self.mapping[x] = 0
+            self.non_basic.add(x)
+            self.bound[x] = (-math.inf, math.inf)
+
+    def add_row(self, jars):
+        """
+        Return the variable equal to the sum of jars. If there is no such
+        variable, introduce a new basic variable s with the row s = jars,
+        where the variables in jars that are currently basic are replaced
+        by their rows.
+        """
+        if jars in self.matrix:
+            return self.matrix[jars]
+
+        s = slack_name(self.index)
+        self.index += 1
+        self.matrix[jars] = s
+
+        row = dict()
+        for jar in jars:
+            if jar.var in self.basic:
+                for v, c in self.equality[jar.var].items():
+                    row[v] = row.get(v, 0) + jar.coeff * c
+            else:
+                row[jar.var] = row.get(jar.var, 0) + jar.coeff
+        row = {v: c for v, c in row.items() if c != 0}
+
+        self.equality[s] = row
+        for v in row:
+            self.nbasic_basic.setdefault(v, set()).add(s)
+        self.basic.add(s)
+        self.bound[s] = (-math.inf, math.inf)
+        self.mapping[s] = sum(c * self.mapping[v] for v, c in row.items())
+        return s
+
+    def ineq_var(self, ineq):
+        """
+        Return the variable whose bound is given by ineq: x for 1 * x ⋈ c,
+        otherwise the variable equal to the left side of ineq.
+        """
+        for jar in ineq.jars:
+            self.add_var(jar.var)
+        if len(ineq.jars) == 1 and ineq.jars[0].coeff == 1: # x ⋈ b (atom)
+            return ineq.jars[0].var
+        else: # a * x + b * y + ... ⋈ c
+            return self.add_row(ineq.jars)
+
     def add_ineq(self, ineq):
         """
         Add an inequality to the current solver, and update relevant states.
+        Inequalities can also be added after check().
         """
         assert isinstance(ineq, InEquation)
         self.original.append(ineq)
-        if isinstance(ineq, GreaterEq):
-            if len(ineq.jars) == 1: # a * x >= b
-                jar = ineq.jars[0]
-                coeff, var_name, lower_bound = jar.coeff, jar.var, ineq.lower_bound
-                self.input_vars.add(var_name)
-                if coeff == 1: # x >= b (atom)
-                    self.lower_atom.append((var_name, lower_bound))
-                    self.atom.append(geq_atom(var_name, lower_bound))
-                    if var_name not in self.mapping:
-                        self.mapping[var_name] = 0
-                    self.non_basic.add(var_name)
-                    if var_name not in self.bound.keys():
-                        self.bound[var_name] = (-math.inf, math.inf)
-            
-
-                elif coeff != 0: # a * x >= b
-                    if ineq.jars not in self.matrix:
-                        s = "$" + string.ascii_lowercase[self.index] + "$"
-                        self.index += 1
-                        self.matrix[ineq.jars] = s
-                        self.equality[s] = ineq.jars
-                    else:
-                        s = self.matrix[ineq.jars]
-                    self.lower_atom.append((s, lower_bound))
-                    self.atom.append(geq_atom(s, lower_bound))
-                    self.basic.add(s)
-                    self.non_basic.add(var_name)
-                    if var_name not in self.nbasic_basic:
-                        self.nbasic_basic[var_name] = {s}
-                    else:
-                        self.nbasic_basic[var_name].add(s)        
-            
-                    if var_name not in self.mapping:
-                        self.mapping.update({var_name : 0, s : 0})
-                    self.bound[s] = (-math.inf, math.inf)
-                    if var_name not in self.bound:
-                        self.bound[var_name] = (-math.inf, math.inf)
-
-            else: # a * x + b * y + ... >= c
-                _vars = collect_vars_from_ineq(ineq)
-                # push all variables in lhs into solver
-                for v in _vars:
-                    if v not in self.mapping.keys():
-                        self.mapping.update({v: 0})
-                    if v not in self.non_basic:
-                        self.non_basic.add(v)
-                    if v not in self.bound.keys():
-                        self.bound[v] = (-math.inf, math.inf)
-                    self.input_vars.add(v) 
-
-                lower_bound = ineq.lower_bound
-                if ineq.jars not in self.matrix:
-                    s = "$" + string.ascii_lowercase[self.index] + "$"
-                    self.index += 1
-                    self.equality[s] = ineq.jars
-                    self.matrix[ineq.jars] = s
-                else:
-                    s = self.matrix[ineq.jars]
-                self.lower_atom.append((s, lower_bound))
-                self.atom.append(geq_atom(s, lower_bound))
-                self.mapping[s] = 0
-                for jar in ineq.jars:
-                    if jar.var not in self.nbasic_basic:
-                        self.nbasic_basic[jar.var] = {s}
-                    else:
-                        self.nbasic_basic[jar.var].add(s)
-                
-                self.basic.add(s)
-                self.bound[s] = (-math.inf, math.inf)
-
-        elif isinstance(ineq, LessEq):
-            if len(ineq.jars) == 1: # a * x <= b
-                jar = ineq.jars[0]
-                coeff, var_name, upper_bound = jar.coeff, jar.var, ineq.upper_bound
-                self.input_vars.add(var_name)
-                if coeff == 1: # x <= b (atom)
-                    self.upper_atom.append((var_name, upper_bound))
-                    self.atom.append(leq_atom(var_name, upper_bound))
-                    if var_name not in self.mapping:
-                        self.mapping[var_name] = 0
-                    self.non_basic.add(var_name)
-                    if var_name not in self.bound.keys():
-                        self.bound[var_name] = (-math.inf, math.inf)
-
-                elif coeff != 0: # a * x <= b
-                    if ineq.jars not in self.matrix:
-                        s = "$" + string.ascii_lowercase[self.index] + "$"
-                        self.index += 1
-                        self.equality[s] = ineq.jars
-                        self.matrix[ineq.jars] = s
-                    else:
-                        s = self.matrix[ineq.jars]
-                    self.upper_atom.append((s, upper_bound))
-                    self.atom.append(leq_atom(s, upper_bound))
-                    
-                    self.basic.add(s)
-                    self.non_basic.add(var_name)
-                    if var_name not in self.mapping:
-                        self.mapping.update({var_name : 0, s : 0})
-                    self.bound[s] = (-math.inf, math.inf)
-                    if var_name not in self.nbasic_basic:
-                        self.nbasic_basic[var_name] = {s}
-                    else:
-                        self.nbasic_basic[var_name].add(s)
-                    if var_name not in self.bound.keys():
-                        self.bound[var_name] = (-math.inf, math.inf)
-
-            else: # a * x + b * y + ... <= c
-                _vars = collect_vars_from_ineq(ineq)
-                # push all variables in lhs into solver
-                for v in _vars:
-                    if v not in self.mapping.keys():
-                        self.mapping.update({v: 0})
-                    if v not in self.non_basic:
-                        self.non_basic.add(v)
-                    if v not in self.bound.keys():
-                        self.bound[v] = (-math.inf, math.inf)
-                    self.input_vars.add(v)
-
-                upper_bound = ineq.upper_bound
-                if ineq.jars not in self.matrix:
-                    s = "$" + string.ascii_lowercase[self.index] + "$"
-                    self.index += 1
-                    self.equality[s] = ineq.jars
-                    self.matrix[ineq.jars] = s
-                else:
-                    s = self.matrix[ineq.jars]
-                self.upper_atom.append((s, upper_bound))
-                self.atom.append(leq_atom(s, upper_bound))
-                self.mapping[s] = 0
-                for jar in ineq.jars:
-                    if jar.var not in self.nbasic_basic:
-                        self.nbasic_basic[jar.var] = {s}
-                    else:
-                        self.nbasic_basic[jar.var].add(s)
-
-                self.basic.add(s)
-                self.bound[s] = (-math.inf, math.inf)
+        if len(ineq.jars) == 1 and ineq.jars[0].coeff == 0:
+            self.add_var(ineq.jars[0].var)
+            return
 
-        # if self.ilp:
-        #     self.variables_bound()
+        x = self.ineq_var(ineq)
+        if isinstance(ineq, GreaterEq):
+            self.lower_atom.append((x, ineq.lower_bound))
+            self.atom.append(geq_atom(x, ineq.lower_bound))
+        else:
+            self.upper_atom.append((x, ineq.upper_bound))
+            self.atom.append(leq_atom(x, ineq.upper_bound))
 
     def __len__(self):
         return len(self.original)
@@ -436,17 +379,13 @@ class Simplex:
         return the aij in the equation of xi = ... + aij * xj + ...
         """
         assert xi in self.basic and xj in self.non_basic
-        jars = self.equality[xi]
-        _, res =  find_coeff(xj, jars)
-        return res.coeff if res is not None else 0
+        return self.equality[xi].get(xj, 0)
     
     def update(self, x, v):
         assert x in self.non_basic
-        if x in self.nbasic_basic:
-            rlt = self.nbasic_basic[x]
-            for b in rlt:
-                a = self.aij(b, x)
-                self.mapping[b] += a * (v - self.mapping[x])
+        delta = v - self.mapping[x]
+        for b in self.nbasic_basic.get(x, ()):
+            self.mapping[b] += self.equality[b][x] * delta
             
         self.mapping[x] = v
 
@@ -462,55 +401,73 @@ class Simplex:
         substitute xj with the above equality's rhs and normalize it.
         """
         assert xi in self.basic and xj in self.non_basic
-        a = self.aij(xi, xj)
-        # get the equality
-        jars = self.equality[xi]
-        xj_repr_jars = [Jar(Fraction(1, a), xi)] + [Jar(-Fraction(1, a) * Fraction(jar.coeff), jar.var) for jar in jars if jar.var != xj]
-        xj_repr_jars = reduce_pairs(xj_repr_jars)
-        # update the state
-        
-        # update equality, delete the previous xi = ...
-        # add new term xj = ... 
-        # for the other equalities which use xj, try to substitute xj
-        # by xj_repr_jars
-        self.equality = delete_key(self.equality, xi)
-        self.equality[xj] = xj_repr_jars
-
-        for x in self.nbasic_basic[xj]:
-            if x != xi:
-                rhs = self.equality[x]
-                _, xj_jar = find_coeff(xj, rhs)
-                rhs_without_xj = reduce_pairs([j for j in rhs if j != xj_jar] + [Jar(xj_jar.coeff * v.coeff, v.var) for v in xj_repr_jars])
-                self.equality[x] = rhs_without_xj
+        row = self.equality.pop(xi)
+        for v in row:
+            self.nbasic_basic[v].discard(xi)
+
+        # the representation of xj
+        a = Fraction(row.pop(xj))
+        xj_row = {xi: 1 / a}
+        for v, c in row.items():
+            xj_row[v] = -c / a
+
+        # for the other equalities which use xj, substitute xj by xj_row
+        for x in self.nbasic_basic.pop(xj):
+            rhs = self.equality[x]
+            c = rhs.pop(xj)
+            for v, d in xj_row.items():
+                new_c = rhs.get(v, 0) + c * d
+                if new_c != 0:
+                    rhs[v] = new_c
+                    self.nbasic_basic.setdefault(v, set()).add(x)
+                else:
+                    del rhs[v]
+                    self.nbasic_basic[v].discard(x)
+
+        self.equality[xj] = xj_row
+        for v in xj_row:
+            self.nbasic_basic.setdefault(v, set()).add(xj)
 
         # update basic and non_basic variables
-        self.basic = delete_elem(self.basic, xi)
-        self.non_basic = delete_elem(self.non_basic, xj)
+        self.basic.remove(xi)
+        self.non_basic.remove(xj)
         self.basic.add(xj)
         self.non_basic.add(xi)
 
-        # update nbasic_basic
-        self.nbasic_basic = dict()
-        for key, value in self.equality.items():
-            for v in value:
-                if v.var in self.nbasic_basic:
-                    self.nbasic_basic[v.var].add(key)
-                else:
-                    self.nbasic_basic[v.var] = {key}
-
     def pivotAndUpdate(self, xi, xj, v):
         assert xi in self.basic and xj in self.non_basic
         a = self.aij(xi, xj)
         theta = Fraction(v - self.mapping[xi], a)
         self.mapping[xi] = v
         self.mapping[xj] = self.mapping[xj] + theta
-        for xk in self.basic:
+        for xk in self.nbasic_basic[xj]:
             if xk != xi:
-                k = self.aij(xk, xj)
-                self.mapping[xk] += k * theta
+                self.mapping[xk] += self.equality[xk][xj] * theta
 
         self.pivot(xi, xj)
 
+    def set_bound(self, x, bound):
+        """Set the bound of x, recording the old bound if a scope is open."""
+        if self.scopes:
+            self.trail.append((x, self.bound[x]))
+        self.bound[x] = bound
+
+    def push(self):
+        """Open a scope. Bounds asserted in the scope are retracted by pop()."""
+        self.scopes.append(len(self.trail))
+
+    def pop(self):
+        """
+        Retract the bounds asserted since the matching push(). The tableau
+        and the assignment are kept: the non-basic variables are still within
+        their bounds, so check() resumes from the current basis.
+        """
+        n = self.scopes.pop()
+        while len(self.trail) > n:
+            x, bound = self.trail.pop()
+            self.bound[x] = bound
+        self.wrong_var = None
+
     def assert_upper(self, x, c):
         assert x in self.bound, "No such variable in solver"
         l, u = self.bound[x]
@@ -518,7 +475,7 @@ class Simplex:
         if c < l:
             raise AssertUpperException("%s's lower bound %s is larger than %s" % (x, str(l), str(c)))
         elif c < u:
-            self.bound[x] = (l, c)
+            self.set_bound(x, (l, c))
             if x in self.non_basic and self.mapping[x] > c:
                 self.update(x, c)
 
@@ -528,53 +485,66 @@ class Simplex:
         if c > u:
             raise AssertLowerException("%s's lower bound %s is larger than %s" % (x, str(l), str(c)))
         elif c > l:
-            self.bound[x] = (c, u)
+            self.set_bound(x, (c, u))
             if x in self.non_basic and self.mapping[x] < c:
                 self.update(x, c)
 
+    def assert_ineq(self, ineq):
+        """
+        Assert the bound given by ineq, without adding ineq to the
+        inequalities of the solver. Bounds asserted after push() are
+        retracted by pop().
+        """
+        x = self.ineq_var(ineq)
+        if isinstance(ineq, GreaterEq):
+            self.assert_lower(x, ineq.lower_bound)
+        else:
+            self.assert_upper(x, ineq.upper_bound)
+
     def check(self):
+        """
+        Find an assignment within the bounds, starting from the current one.
+        The largest basic variable (by name) out of its bounds leaves the
+        basis, and the non-basic variable which can fix it and occurs in
+        the fewest rows enters the basis, to keep the tableau sparse. After
+        bland_limit pivots, the entering variable is the largest one instead
+        (Bland's rule), which guarantees termination.
+        """
         self.wrong_var = None
-        self.pivot_trace = []
+        num_pivots = 0
         while True:
-            basic_vars = sorted(list(self.basic))
-            flag = False
-            for v in basic_vars:
-                if self.bound[v][0] > self.mapping[v] or self.bound[v][1] < self.mapping[v]:
+            xi = None
+            for v in self.basic:
+                if (self.bound[v][0] > self.mapping[v] or self.bound[v][1] < self.mapping[v]) and \
+                    (xi is None or v > xi):
                     xi = v
-                    flag = True
-            if not flag:
+            if xi is None:
                 return SAT
-            
+
+            # whether xi should be increased, and its new value
             if self.mapping[xi] < self.bound[xi][0]:
-                flag = False
-                rhs_jars = reduce_pairs(self.equality[xi])
-                for j in rhs_jars:
-                    coeff, xj = j.coeff, j.var
-                    if coeff > 0 and self.mapping[xj] < self.bound[xj][1] or\
-                        coeff < 0 and self.mapping[xj] > self.bound[xj][0]:
-                        self.trace.append(((xi, xj), coeff, self.nbasic_basic[xj]))
-                        self.pivotAndUpdate(xi, xj, self.bound[xi][0])
-                        flag = True
-                        break
-                if not flag:
-                    self.wrong_var = xi
-                    return UNSAT
-
-            if self.mapping[xi] > self.bound[xi][1]:
-                flag = False
-                rhs_jars = reduce_pairs(self.equality[xi])
-                for j in rhs_jars:
-                    coeff, xj = j.coeff, j.var
-                    if coeff < 0 and self.mapping[xj] < self.bound[xj][1] or\
-                        coeff > 0 and self.mapping[xj] > self.bound[xj][0]:
-                        self.trace.append(((xi, xj), coeff, self.nbasic_basic[xj]))
-                        self.pivotAndUpdate(xi, xj, self.bound[xi][1])
-                        flag = True
-                        break
-                
-                if not flag:
-                    self.wrong_var = xi
-                    return UNSAT
+                increase, value = True, self.bound[xi][0]
+            else:
+                increase, value = False, self.bound[xi][1]
+
+            bland = num_pivots >= self.bland_limit
+            xj, xj_key = None, None
+            for v, coeff in self.equality[xi].items():
+                if (coeff > 0) == increase:
+                    suitable = self.mapping[v] < self.bound[v][1]
+                else:
+                    suitable = self.mapping[v] > self.bound[v][0]
+                if suitable:
+                    key = (0 if bland else -len(self.nbasic_basic[v]), v)
+                    if xj is None or key > xj_key:
+                        xj, xj_key = v, key
+            if xj is None:
+                self.wrong_var = xi
+                return UNSAT
+
+            self.trace.append(((xi, xj), self.equality[xi][xj], set(self.nbasic_basic[xj])))
+            self.pivotAndUpdate(xi, xj, value)
+            num_pivots += 1
 
     def handle_assertion(self):
         for assertion in self.atom:
@@ -609,23 +579,23 @@ class Simplex:
         """
         explain = [] # store the atoms
         if self.mapping[xi] < self.bound[xi][0]: # reason 1
-            for jar in self.equality[xi]:
-                if jar.coeff > 0:
-                    upper = self.bound[jar.var][1]
-                    explain.append(leq_atom(jar.var, upper))
-                elif jar.coeff < 0:
-                    lower = self.bound[jar.var][0]
-                    explain.append(geq_atom(jar.var, lower))
+            for var, coeff in self.equality[xi].items():
+                if coeff > 0:
+                    upper = self.bound[var][1]
+                    explain.append(leq_atom(var, upper))
+                elif coeff < 0:
+                    lower = self.bound[var][0]
+                    explain.append(geq_atom(var, lower))
             explain.append(geq_atom(xi, self.bound[xi][0]))
 
         else:
-            for jar in self.equality[xi]:
-                if jar.coeff > 0:
-                    lower = self.bound[jar.var][0]
-                    explain.append(geq_atom(jar.var, lower))
-                elif jar.coeff < 0:
-                    upper = self.bound[jar.var][1]
-                    explain.append(leq_atom(jar.var, upper))
+            for var, coeff in self.equality[xi].items():
+                if coeff > 0:
+                    lower = self.bound[var][0]
+                    explain.append(geq_atom(var, lower))
+                elif coeff < 0:
+                    upper = self.bound[var][1]
+                    explain.append(leq_atom(var, upper))
             explain.append(leq_atom(xi, self.bound[xi][1]))    
 
         return explain
@@ -698,53 +668,211 @@ class Simplex:
                     return v, val
         return None
 
-def branch_and_bound(tableau, pts1, pts2):
+    def gomory_cut(self, xi):
+        """
+        Derive an inequality from the row of the basic input variable xi,
+        assuming all input variables are integers.
+
+        Write the row as xi = β(xi) + Σ cj * sj, where sj = xj - β(xj) and
+        cj = aij if xj is at its lower bound or aij is an integer, and
+        sj = β(xj) - xj and cj = -aij if xj is at its upper bound. Then
+        sj ≥ 0 whenever cj is not an integer, so
+
+            xi - Σ ⌊cj⌋ * sj = β(xi) + Σ (cj - ⌊cj⌋) * sj ≥ β(xi).
+
+        Returns (jars, bound) such that the left side, expanded over the
+        input variables, is jars + c ≥ β(xi) and bound = β(xi) - c.
+        Returns None if some non-basic variable with non-integer aij is
+        not at a bound, or some row has non-integer coefficients.
+        """
+        rows = {s: jars for jars, s in self.matrix.items()}
+        coeffs = {xi: 1}
+        const = 0
+        for xj, aij in self.equality[xi].items():
+            value = self.mapping[xj]
+            if Fraction(aij).denominator == 1 or value == self.bound[xj][0]:
+                sign, cj = 1, aij
+            elif value == self.bound[xj][1]:
+                sign, cj = -1, -aij
+            else:
+                return None
+
+            # Add -⌊cj⌋ * sign * (xj - β(xj))
+            fj = math.floor(cj)
+            if fj == 0:
+                continue
+            const += fj * sign * value
+            for jar in (rows[xj] if xj in rows else (Jar(1, xj),)):
+                coeffs[jar.var] = coeffs.get(jar.var, 0) - fj * sign * jar.coeff
+
+        if any(Fraction(c).denominator != 1 for c in coeffs.values()):
+            return None
+        jars = [Jar(int(c), v) for v, c in sorted(coeffs.items()) if c != 0]
+        return jars, self.mapping[xi] - const
+
+
+def round_split(jars, bound, is_lower):
+    """
+    Rounding of the inequality jars ≥ bound (if is_lower) or jars ≤ bound,
+    whose variables are integers. The coefficients are divided by their
+    gcd g, giving jars', and the bound by g is rounded.
+
+    Returns (jars', k, side), where side is the one of jars' ≤ k (side 0)
+    or jars' ≥ k + 1 (side 1) which is infeasible over the reals together
+    with the inequality. Returns None if rounding does not strengthen the
+    inequality, or the coefficients are not integers.
+    """
+    if not jars or any(Fraction(jar.coeff).denominator != 1 for jar in jars):
+        return None
+    g = 0
+    for jar in jars:
+        g = math.gcd(g, int(jar.coeff))
+    b = Fraction(bound) / g
+    if b.denominator == 1:
+        return None
+    new_jars = [Jar(int(jar.coeff) // g, jar.var) for jar in jars]
+    if is_lower:
+        return new_jars, math.ceil(b) - 1, 0
+    else:
+        return new_jars, math.floor(b), 1
+
+def branch_and_bound(simplex, pts1, pts2, cuts=True):
     """
     If current solution is not a good solution(some variables' value are not integer),
     add more constraints and perform simplex again, until find a good solution.
     pts1 is the list of int = of_int, pts2 is the list of of_int v = x_i
+
+    All nodes of the search share simplex: the bound added by a branch is
+    asserted in a new scope, which is popped when the branch is finished.
+
+    If cuts is True, the search also splits on jars ≤ k or jars ≥ k + 1 for
+    the splits given by round_split, one side of which is infeasible over
+    the reals. The infeasible side is a leaf of the tree, which is proved
+    by the real simplex like the other leaves, and the search continues on
+    the other side. First the input inequalities are tightened, then at
+    most max_cuts cuts from gomory_cut are added on each path before
+    branching on a variable.
+
+    Returns an integer solution if there is one, otherwise the tree of
+    the search, from which the proof of unsatisfiability is obtained.
     """
-    T = IntSimplexTree(tableau, pts1, pts2)
-    tree = deque([T])
-    while len(tree) != 0:
+    gcd_splits = []
+    if cuts:
+        for ineq in simplex.original:
+            if isinstance(ineq, GreaterEq):
+                split = round_split(ineq.jars, ineq.lower_bound, True)
+            else:
+                split = round_split(ineq.jars, ineq.upper_bound, False)
+            if split is not None:
+                gcd_splits.append(split + ([ineq],))
+    max_cuts = len(gcd_splits) + len(simplex.input_vars) if cuts else 0
+
+    def find_cut(node, num_cuts):
+        """Return a split (jars, k, side, ineqs) cutting off the current
+        solution, where ineqs are the inequalities proving the side is
+        infeasible. Returns None if no cut is found.
+
+        """
+        if num_cuts < len(gcd_splits):
+            return gcd_splits[num_cuts]
+        if num_cuts >= max_cuts:
+            return None
+
+        # Rows of basic variables, most fractional values first
+        def frac(v):
+            f = simplex.mapping[v] - math.floor(simplex.mapping[v])
+            return abs(f - Fraction(1, 2))
+        cands = [v for v in simplex.input_vars if v in simplex.basic and \
+                 Fraction(simplex.mapping[v]).denominator != 1]
+        for v in sorted(cands, key=lambda v: (frac(v), v)):
+            cut = simplex.gomory_cut(v)
+            if cut is not None:
+                split = round_split(cut[0], cut[1], True)
+                if split is not None:
+                    return split + (node.ineqs,)
+        return None
+
+    def search(root):
+        """Return an integer solution below root, or None.
+
+        The search is depth-first, using a stack of (node, num_cuts, depth)
+        where depth is the number of scopes above those open on entry that
+        are open while node is explored.
+
+        """
+        base = len(simplex.scopes)
+        stack = [(root, 0, 0)]
         try:
-            node = tree.popleft()
-            node.simplex.handle_assertion()
-            if not node.simplex.all_integer():
-                v, val = node.simplex.find_not_int_var()
+            while stack:
+                node, num_cuts, depth = stack.pop()
+                while len(simplex.scopes) - base >= depth > 0:
+                    simplex.pop()
+                if depth > 0:
+                    simplex.push()
+
+                try:
+                    if node.new_ast is None:
+                        simplex.handle_assertion()
+                    else:
+                        simplex.assert_ineq(node.new_ast)
+                        if simplex.check() == UNSAT:
+                            continue
+                except (AssertUpperException, AssertLowerException, UNSATException):
+                    continue
+
+                if simplex.all_integer():
+                    return dict(simplex.mapping)
+
+                split = find_cut(node, num_cuts) if cuts else None
+                if split is not None:
+                    jars, k, side, ineqs = split
+                    ineq1, ineq2 = LessEq(jars, k), GreaterEq(jars, k + 1)
+                    if side == 0:
+                        b1 = IntSimplexTree([ineq1] + ineqs, pts1, pts2, new_ast=ineq1)
+                        b2 = IntSimplexTree([ineq2] + node.ineqs, pts1, pts2, new_ast=ineq2)
+                        b = b2
+                    else:
+                        b1 = IntSimplexTree([ineq1] + node.ineqs, pts1, pts2, new_ast=ineq1)
+                        b2 = IntSimplexTree([ineq2] + ineqs, pts1, pts2, new_ast=ineq2)
+                        b = b1
+                    node.branches = (b1, b2)
+                    stack.append((b, num_cuts + 1, depth + 1))
+                    continue
+
+                v, val = simplex.find_not_int_var()
                 node.var = v
-                s1, s2 = Simplex(), Simplex()
                 ineq1 = LessEq([Jar(1, v)], math.floor(val))
                 ineq2 = GreaterEq([Jar(1, v)], math.ceil(val))
-                s1.add_ineqs(ineq1, *node.simplex.original)
-                s2.add_ineqs(ineq2, *node.simplex.original)
-                b1 = IntSimplexTree(s1, pts1, pts2, new_ast=ineq1)
-                b2 = IntSimplexTree(s2, pts1, pts2, new_ast=ineq2)
+                b1 = IntSimplexTree([ineq1] + node.ineqs, pts1, pts2, new_ast=ineq1)
+                b2 = IntSimplexTree([ineq2] + node.ineqs, pts1, pts2, new_ast=ineq2)
                 node.branches = (b1, b2)
-                tree.appendleft(b1)
-                tree.appendleft(b2)
-            else:
-                return node.simplex.mapping
-                
-                
-        except:
-            continue
-    
-    print("No integer solution!")
+                # b2 is explored first
+                stack.append((b1, num_cuts, depth + 1))
+                stack.append((b2, num_cuts, depth + 1))
+            return None
+        finally:
+            while len(simplex.scopes) > base:
+                simplex.pop()
+
+    T = IntSimplexTree(list(simplex.original), pts1, pts2)
+    res = search(T)
+    if res is not None:
+        return res
     return T
 
 
 class IntSimplexTree:
     """The tree of branch and bound method."""
-    def __init__(self, simplex, of_int_pts, intro_vars_pts, var=None, branches=(), new_ast=None):
-        # var is the varible which splits the simplex
+    def __init__(self, ineqs, of_int_pts, intro_vars_pts, var=None, branches=(), new_ast=None):
+        # var is the varible which splits the simplex, None if the node
+        # is split by a cut
         self.var = var
 
-        # simplex is the problem at this node
-        self.simplex = simplex
+        # ineqs are the inequalities of the problem at this node
+        self.ineqs = ineqs
 
-        # branches are the subproblems, when simplex is UNSAT,
-        # branches would be empty
+        # branches are the subproblems jars ≤ k and jars ≥ k + 1, when
+        # simplex is UNSAT, branches would be empty
         self.branches = branches
 
         # new_ast are the newly added assertions for the non-integer var
@@ -763,33 +891,43 @@ class IntSimplexTree:
         return s + "\n"
 
     def __repr__(self):
-        s = " ".join(str(p) for p in self.simplex.original)
+        s = " ".join(str(p) for p in self.ineqs)
         for b in self.branches:
             s += "\n\t%s" % str(b)
         return s + "\n"
 
+    def size(self):
+        """Number of nodes in the tree."""
+        return 1 + sum(b.size() for b in self.branches)
+
+    def int_term(self, ineq):
+        """The comparison of integers corresponding to ineq."""
+        names = {pt.prop.lhs.name: pt.prop.rhs.arg for pt in self.intro_vars_pts}
+        lhs_atoms = [Int(int(j.coeff)) * names[j.var] for j in ineq.jars]
+        lhs = sum(lhs_atoms[1:], lhs_atoms[0])
+        if isinstance(ineq, GreaterEq):
+            return greater_eq(IntType)(lhs, Int(int(ineq.lower_bound)))
+        else:
+            return less_eq(IntType)(lhs, Int(int(ineq.upper_bound)))
 
     def branch_and_bound_pt(self):
-        """Get an unsat proof term for self.simplex."""
+        """
+        Get an unsat proof term for self.ineqs, whose hypotheses are the
+        input comparisons of integers, and those for the new_ast of the
+        ancestors.
+        """
         if not self.branches:
             solver = SimplexHOLWrapper()
-            solver.add_ineqs(self.simplex.original)
+            solver.add_ineqs(self.ineqs)
             pt_real = solver.handle_assertion()
-            pt_integer = of_int_to_int(old_name(pt_real, self.intro_vars_pts), self.of_int_pts)
-            if self.new_ast is None:
-                return pt_integer
-            pt_integer1 = pt_integer.implies_intr(pt_integer.hyps[0])
-            bound = pt_integer.hyps[0].arg
-            bound_value = of_int(RealType)(Int(real.real_eval(bound)))
-            value_pt = real.real_eval_conv().get_proof_term(bound_value)
-            pt_integer2 = pt_integer1.on_prop(top_conv(replace_conv(value_pt.symmetric())))
-            assert isinstance(pt_integer2, ProofTerm)
-            if pt_integer.hyps[0].is_less_eq():
-                return pt_integer2.on_prop(arg1_conv(rewr_conv('real_of_int_leq')))
-            else:
-                return pt_integer2.on_prop(arg1_conv(rewr_conv('real_of_int_geq')))
+            assert isinstance(pt_real, ProofTerm)
+            # Hypotheses from the input are converted to the input comparisons,
+            # the others to the comparisons given by int_term.
+            pts_ineqs = [integer.int_compare_to_real().get_proof_term(self.int_term(ineq)).symmetric()
+                         for ineq in self.ineqs]
+            return of_int_to_int(old_name(pt_real, self.intro_vars_pts), self.of_int_pts + pts_ineqs)
         else:
-            pt1, pt2 = [b.branch_and_bound_pt() for b in self.branches]
+            pt1, pt2 = [b.branch_and_bound_pt().implies_intr(b.int_term(b.new_ast)) for b in self.branches]
             th = ProofTerm.theorem('int_geq_leq_true')
             inst = matcher.first_order_match(th.lhs.arg1, pt1.prop)
             pt_concl = th.substitution(inst).on_lhs(bottom_conv(integer.int_eval_conv()))
@@ -919,6 +1057,18 @@ class SimplexHOLWrapper:
 
         return s
 
+    def ineq_var(self, ineq):
+        """
+        Return the variable whose bound is given by ineq: x for 1 * x ⋈ c,
+        otherwise the variable equal to the left side of ineq.
+        """
+        for jar in ineq.jars:
+            self.add_var(jar.var)
+        if len(ineq.jars) == 1 and ineq.jars[0].coeff == 1: # x ⋈ b (atom)
+            return ineq.jars[0].var
+        else: # a * x + b * y + ... ⋈ c
+            return self.add_row(ineq.jars)
+
     def add_ineq(self, ineq):
         """
         Take an inequation, convert it into higher-order logic terms.
@@ -943,7 +1093,7 @@ class SimplexHOLWrapper:
         
         # Check the necessity to introduce new variables
         if not (len(ineq.jars) == 1 and ineq.jars[0].coeff == 1): # need to introduce a new variable
-            s = Var('$'+string.ascii_lowercase[self.simplex.index - 1]+'$', RealType)
+            s = Var(self.simplex.matrix[ineq.jars], RealType)
             s_eq_pt = ProofTerm.assume(Eq(s, lhs))
             self.eq_pts[s] = s_eq_pt
             self.intro_eq.add(s_eq_pt)
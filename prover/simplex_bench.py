@@ -0,0 +1,132 @@
+"""
+Benchmark for the simplex solver.
+
+Solves the problems in prover/tests/simplex_test.py and random linear
+arithmetic problems with hundreds of rows, and reports the number of
+pivots and the time taken. Solutions are checked.
+
+Then runs a sequence of queries on a random problem, each asserting a few
+bounds on its rows. The queries are answered by a single solver, which
+asserts the bounds of each query in a scope that is popped afterwards,
+and by solving each query from scratch. Usage:
+
+    python -m prover.simplex_bench
+
+"""
+
+import random
+import time
+
+from logic import context
+from syntax import parser
+from prover import simplex
+from prover.simplex import Jar, GreaterEq, LessEq
+from prover.tests import simplex_test
+
+
+def random_lra(num_vars, num_rows, seed):
+    """Random problem with rows of three variables, and each variable
+    bounded by -10 and 10.
+
+    """
+    rand = random.Random(seed)
+    ineqs = []
+    for _ in range(num_rows):
+        names = sorted(rand.sample(range(num_vars), 3))
+        jars = [Jar(rand.choice([-3, -2, -1, 1, 2, 3]), 'x' + str(i)) for i in names]
+        ineqs.append(random_ineq(rand, jars))
+    for i in range(num_vars):
+        ineqs.append(GreaterEq([Jar(1, 'x' + str(i))], -10))
+        ineqs.append(LessEq([Jar(1, 'x' + str(i))], 10))
+    return ineqs
+
+def random_ineq(rand, jars):
+    if rand.random() < 0.5:
+        return GreaterEq(jars, rand.randint(-10, 10))
+    else:
+        return LessEq(jars, rand.randint(-10, 10))
+
+def is_solution(ineqs, mapping):
+    for ineq in ineqs:
+        lhs = sum(jar.coeff * mapping[jar.var] for jar in ineq.jars)
+        if isinstance(ineq, GreaterEq) and lhs < ineq.lower_bound or \
+            isinstance(ineq, LessEq) and lhs > ineq.upper_bound:
+            return False
+    return True
+
+def solve(ineqs):
+    """Solve ineqs from scratch, returns the solver and whether ineqs
+    are satisfiable.
+
+    """
+    s = simplex.Simplex()
+    s.add_ineqs(*ineqs)
+    try:
+        s.handle_assertion()
+    except (simplex.UNSATException, simplex.AssertLowerException, simplex.AssertUpperException):
+        return s, False
+    assert is_solution(ineqs, s.mapping), "simplex_bench: wrong solution"
+    return s, True
+
+def run(name, ineqs):
+    start_time = time.perf_counter()
+    s, res = solve(ineqs)
+    solve_time = time.perf_counter() - start_time
+    print('%20s | %5d | %6d | %5s | %8.3f' % (
+        name, len(ineqs), len(s.trace), 'sat' if res else 'unsat', solve_time))
+
+
+def run_incremental(num_vars, num_rows, num_queries, seed):
+    """Sequence of queries, each asserting bounds on three random rows."""
+    rand = random.Random(seed)
+    ineqs = random_lra(num_vars, num_rows, seed)
+    queries = []
+    for _ in range(num_queries):
+        queries.append([random_ineq(rand, rand.choice(ineqs[:num_rows]).jars) for _ in range(3)])
+
+    start_time = time.perf_counter()
+    s, _ = solve(ineqs)
+    incr_res = []
+    for query in queries:
+        s.push()
+        try:
+            for ineq in query:
+                s.assert_ineq(ineq)
+            incr_res.append(s.check() == simplex.SAT)
+        except (simplex.AssertLowerException, simplex.AssertUpperException):
+            incr_res.append(False)
+        finally:
+            s.pop()
+        if incr_res[-1]:
+            assert is_solution(ineqs + query, s.mapping), "simplex_bench: wrong solution"
+    incr_time = time.perf_counter() - start_time
+    incr_pivots = len(s.trace)
+
+    start_time = time.perf_counter()
+    scratch_res = []
+    scratch_pivots = 0
+    for query in queries:
+        s, res = solve(ineqs + query)
+        scratch_res.append(res)
+        scratch_pivots += len(s.trace)
+    scratch_time = time.perf_counter() - start_time
+
+    assert incr_res == scratch_res, "simplex_bench: incremental results differ"
+    print('Queries: %d (%d satisfiable), rows: %d' % (num_queries, sum(incr_res), num_rows))
+    print('Incremental:  %6d pivots  %.2f s' % (incr_pivots, incr_time))
+    print('From scratch: %6d pivots  %.2f s' % (scratch_pivots, scratch_time))
+
+
+if __name__ == "__main__":
+    print('             Problem | Ineqs | Pivots | Res   |   Time')
+    print('---------------------------------------------------------')
+    context.set_context('real', vars=simplex_test.vars)
+    for name, data in simplex_test.test_data.items():
+        ineqs, _, _ = simplex.term_to_ineq([parser.parse_term(t) for t in data])
+        run(name, ineqs)
+    for num_rows in [100, 200, 400]:
+        for seed in range(3):
+            run('random %d (%d)' % (num_rows, seed), random_lra(num_rows, num_rows, seed))
+
+    print()
+    run_incremental(100, 100, 100, 0)
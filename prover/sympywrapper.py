@@ -21,6 +21,7 @@ from data import set as hol_set
 from logic import auto
 from logic import logic
 import integral
+from util import solver_cache
 
 
 class SymPyException(Exception):
@@ -181,12 +182,16 @@ class SymPyMacro(Macro):
 
     def can_eval(self, goal, prevs):
         if len(prevs) == 0:
-            return solve_goal(goal)
+            compute = lambda: 'solved' if solve_goal(goal) else None
         elif len(prevs) == 1:
-            return solve_with_interval(goal, prevs[0].prop)
+            compute = lambda: 'solved' if solve_with_interval(goal, prevs[0].prop) else None
         else:
             return False
 
+        # Successes found in the solver cache are trusted (see util/solver_cache).
+        query = solver_cache.print_terms([prev.prop for prev in prevs] + [goal])
+        return solver_cache.cached_call('sympy', sympy.__version__, query, compute) == 'solved'
+
     def eval(self, goal, prevs):
         assert self.can_eval(goal, prevs), "sympy: not solved."
 
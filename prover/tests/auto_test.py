@@ -2,7 +2,12 @@
 
 import unittest
 
+from kernel.type import BoolType
+from kernel.term import Var, Or
+from kernel.thm import Thm
+from kernel.proofterm import ProofTerm
 from logic import basic
+from logic import context
 from prover.auto import auto
 
 
@@ -15,6 +20,27 @@ class AutoTest(unittest.TestCase):
         self.assertEqual(st.step_count, 7)
         self.assertEqual(len(st.updates), 6)
 
+    def testSubsumption(self):
+        context.set_context('logic')
+        A, B, C = [Var(name, BoolType) for name in ['A', 'B', 'C']]
+        def disj_item(*ts):
+            return auto.DisjItem(ProofTerm.sorry(Thm([], Or(*ts))))
+        def add(item):
+            st.updates.append(auto.Update(0, '$INIT', [], item))
+            st.add_item(item)
+
+        st = auto.ProofState([], [])
+        add(disj_item(A, B, C))
+        self.assertTrue(st.has_item(disj_item(C, B, A)))
+        self.assertFalse(st.has_item(disj_item(A, B)))
+        add(disj_item(A, B))
+        self.assertEqual(st.subsumed, {0})
+        self.assertTrue(st.has_item(disj_item(B, C, A)))
+        add(auto.FactItem(ProofTerm.sorry(Thm([], B))))
+        self.assertEqual(st.subsumed, {0, 1})
+        self.assertTrue(st.has_item(disj_item(C, B)))
+        self.assertFalse(st.has_item(disj_item(A, C)))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -11,7 +11,7 @@ from logic import basic
 from syntax import parser, printer
 from logic import context
 
-MERGE, CHECK, EXPLAIN, MATCH = range(4)
+MERGE, CHECK, EXPLAIN, MATCH, PUSH, POP = range(6)
 
 class CongClosureTest(unittest.TestCase):
     def run_test(self, data, verbose=False):
@@ -32,6 +32,10 @@ class CongClosureTest(unittest.TestCase):
             elif item[0] == MATCH:
                 _, pat, t, res = item
                 self.assertEqual(closure.ematch(pat, t), res)
+            elif item[0] == PUSH:
+                closure.push()
+            elif item[0] == POP:
+                closure.pop()
             else:
                 raise NotImplementedError
 
@@ -77,6 +81,59 @@ class CongClosureTest(unittest.TestCase):
             (MATCH, ("?x1", "?x2"), "t3", [{"?x1": "t4", "?x2": "t5"}]),
         ])
 
+    def test5(self):
+        self.run_test([
+            (MERGE, ("t1", "t2"), "t3"),
+            (MERGE, ("t1", "t4"), "t5"),
+            (MATCH, ("t1", "?x1"), "t3", [{"?x1": "t2"}]),
+            (MERGE, "t3", "t5"),
+            (MATCH, ("t1", "?x1"), "t3", [{"?x1": "t4"}, {"?x1": "t2"}]),
+            (MERGE, "t2", "t4"),
+            (MATCH, ("t1", "?x1"), "t5", [{"?x1": "t4"}]),
+            (EXPLAIN, "t2", "t4", 1),
+        ])
+
+    def testPushPop(self):
+        self.run_test([
+            (MERGE, ("t1", "t2"), "t3"),
+            (MERGE, ("t4", "t5"), "t6"),
+            (MERGE, "t1", "t4"),
+            (PUSH,),
+            (MERGE, "t2", "t5"),
+            (CHECK, "t3", "t6", True),
+            (EXPLAIN, "t3", "t6", 3),
+            (MATCH, ("t1", "?x1"), "t3", [{"?x1": "t5"}]),
+            (PUSH,),
+            (MERGE, "t3", "t7"),
+            (CHECK, "t7", "t6", True),
+            (POP,),
+            (CHECK, "t3", "t6", True),
+            (POP,),
+            (CHECK, "t3", "t6", False),
+            (CHECK, "t2", "t5", False),
+            (MATCH, ("t1", "?x1"), "t3", [{"?x1": "t2"}]),
+            (MERGE, "t3", "t6"),
+            (CHECK, "t2", "t5", False),
+            (EXPLAIN, "t3", "t6", 1),
+        ])
+
+    def testNewMatches(self):
+        closure = congc.CongClosure()
+        closure.merge(("t1", "t2"), "t3")
+        closure.add_pattern("p1", ("t1", "?x1"))
+        self.assertEqual(closure.new_matches(), [("p1", {"?x1": "t2"}, "t3")])
+        self.assertEqual(closure.new_matches(), [])
+        closure.merge(("t4", "t5"), "t6")
+        self.assertEqual(closure.new_matches(), [])
+        closure.merge("t1", "t4")
+        self.assertEqual(closure.new_matches(), [("p1", {"?x1": "t5"}, "t6"), ("p1", {"?x1": "t2"}, "t3")])
+
+        closure.add_pattern("p2", ("?x1", "?x1"))
+        closure.merge(("t7", "t8"), "t9")
+        self.assertEqual(closure.new_matches(), [])
+        closure.merge("t7", "t8")
+        self.assertEqual(closure.new_matches(), [("p2", {"?x1": "t8"}, "t9")])
+
 
 class CongClosureHOLTest(unittest.TestCase):
     def run_test(self, data, verbose=False):
@@ -127,8 +184,15 @@ class CongClosureHOLTest(unittest.TestCase):
                 for res_inst in res:
                     for k in res_inst:
                         res_inst[k] = parser.parse_term(res_inst[k])
-                inst = closure.ematch(pat, t)
-                self.assertEqual(inst, res)
+                matches = closure.ematch(pat, t)
+                self.assertEqual([inst for inst, _ in matches], res)
+                for inst, pt in matches:
+                    self.assertEqual(pt.rhs, t)
+                    self.assertEqual(theory.check_proof(pt.export()), pt.th)
+            elif item[0] == PUSH:
+                closure.push()
+            elif item[0] == POP:
+                closure.pop()
             else:
                 raise NotImplementedError
 
@@ -181,6 +245,57 @@ class CongClosureHOLTest(unittest.TestCase):
             (MATCH, "(x + y) + z", "p + q", [{'x': 'm', 'y': 'n', 'z': 'q'}]),
         ])
 
+    def testNewMatches(self):
+        Ta = TVar('a')
+        context.set_context('nat', vars={'a': Ta, 'b': Ta, 'x': Ta, 'f': TFun(Ta, Ta), 'g': TFun(Ta, Ta)})
+        closure = congc.CongClosureHOL()
+        closure.add_pattern('fg', parser.parse_term('f (g x)'))
+        closure.add_term(parser.parse_term('f a'))
+        self.assertEqual(closure.new_matches(), [])
+        closure.merge(parser.parse_term('a'), parser.parse_term('g b'))
+        matches = closure.new_matches()
+        inst = {'f': parser.parse_term('f'), 'g': parser.parse_term('g'), 'x': parser.parse_term('b')}
+        self.assertEqual(matches, [('fg', inst, parser.parse_term('f a'))])
+        pt = closure.explain_match(*matches[0])
+        self.assertEqual(pt.prop, parser.parse_term('f (g b) = f a'))
+        self.assertEqual(theory.check_proof(pt.export()), pt.th)
+
+    def testAddPatternScope(self):
+        Ta = TVar('a')
+        context.set_context('nat', vars={'b': Ta, 'x': 'nat', 'f': TFun(Ta, Ta)})
+        closure = congc.CongClosureHOL()
+        closure.push()
+        self.assertRaises(AssertionError, closure.add_pattern, 'ss', parser.parse_term('Suc (Suc x)'))
+        closure.pop()
+        closure.add_term(parser.parse_term('f (f b)'))
+        self.assertEqual(closure.new_matches(), [])
+
+        closure.add_pattern('ss', parser.parse_term('Suc (Suc x)'))
+        closure.push()
+        closure.add_term(parser.parse_term('Suc (Suc 0)'))
+        self.assertEqual(len(closure.new_matches()), 1)
+        closure.pop()
+        closure.add_term(parser.parse_term('f (f (f b))'))
+        self.assertEqual(closure.new_matches(), [])
+
+    def testPushPop(self):
+        self.run_test([
+            (MERGE, "f a", "c"),
+            (PUSH,),
+            (MERGE, "a", "b"),
+            (CHECK, "f b", "c", True),
+            (EXPLAIN, "f b", "c"),
+            (POP,),
+            (CHECK, "f b", "c", False),
+            (PUSH,),
+            (MERGE, "b", "d"),
+            (MERGE, "a", "d"),
+            (CHECK, "f b", "c", True),
+            (EXPLAIN, "f b", "c"),
+            (POP,),
+            (CHECK, "f b", "c", False),
+        ])
+
 
 if __name__ == "__main__":
     unittest.main()
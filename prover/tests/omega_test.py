@@ -5,6 +5,35 @@ from kernel.type import IntType
 #     dest_plus, dest_times, term_to_factoid, database
 from prover.omega import *
 
+# Satisfiable problems and their solutions
+top_level_data = [
+    ([[2,3,6],[-1,-4,7]], {0: -9, 1: 4}),
+    ([[2,3,4],[-3,-4,7]], {0: 34, 1: -24}),
+    ([[2,3,4],[-3,-4,7],[4,5,-10]], {1: -8, 0: 13}),
+    ([[2,3,4],[-3,-4,7],[4,-5,-10]], {1: -1, 0: 2}),
+    ([[1,0,-1], [0,1,-1], [-1,0,1]], {0: 1, 1: 1}),
+    ([[1,2,3,4],[2,1,4,3],[5,6,7,-8],[-3,2,-1,6]], {0: 0, 1: 2, 2: 0}),
+    ([[1,2,3,4],[2,-2,3,-10],[2,3,-5,6],[-3,-2,1,7]], {2: 2, 1: 0, 0: 2}),
+    ([[-9, -11, -8, 9, 11], [15, 0, 8, -7, 8], [4, 3, 11, -2, -13]], {0: 8, 1: -6, 2: 0, 3: 0}),
+    ([[-13, -8, -14, 15, 8], [-10, 9, 15, -13, 9], [-15, -14, -3, 2, 5]], {0: 0, 1: 0, 2: 0, 3: 0}),
+    ([[2, -1, -5, 14, -7]], {0: 4, 1: 0, 2: 0, 3: 0})
+]
+
+# Unsatisfiable problems
+contradiction_data = [
+    [(0, 1, 0, 1, 0, 1, 0, -1, 0, 0, 1), (0, -1, 0, -1, 0, 0, -1, 0, 0, 1, 1), 
+    (0, -1, -1, 0, 0, 0, -1, 1, 1, 0, 0), (0, 0, 0, 0, 0, 0, 1, 0, -2, 0, 0),
+    (0, 0, 1, 0, -1, 0, -1, 0, 0, -1, -1), (-2, 0, 0, 0, 0, 1, -1, 0, 0, 1, 0),
+    (1, -1, 0, 1, 0, -1, -1, 0, 1, 0, 0), (0, -2, 0, 0, -1, 0, 0, 0, 0, 2, 0),
+    (0, 0, 0, 0, 1, 0, 2, 1, 0, 0, -1), (1, 0, 1, 1, 0, 0, 0, 0, 0, 0, 0),
+    (0, 0, 0, 0, 0, 0, 0, 1, -2, -1, 1), (0, -1, 0, 0, 0, 0, -1, -2, -1, -1, 0),
+    (0, 0, -1, -1, 0, -1, -1, 0, 1, 0, -1), (0, 0, -1, 1, 0, 1, 0, -1, 0, 0, -1),
+    (0, 0, 0, -1, 0, 1, 0, -1, 0, 0, 0), (-1, 0, 1, 1, 0, 1, 0, 0, 1, 0, 1),
+    (1, 0, 0, 0, -1, 0, 0, 0, 0, 0, -1), (0, 0, 0, 1, 0, -1, 0, 0, 0, -1, 0),
+    (1, 0, 0, 0, -3, 0, 0, 0, 0, 0, 1), (-1, 0, 1, 0, 0, -1, 1, 1, 0, 0, -1)],
+]
+
+
 class OmegaTest(unittest.TestCase):
     """
     For now, we assume that there is at least one var in inequality.
@@ -161,40 +190,34 @@ class OmegaTest(unittest.TestCase):
             self.assertEqual(lookup_fkey(db, r).factoid.key, res)
 
     def testTopLevel(self):
-        test_data = [
-            ([[2,3,6],[-1,-4,7]], {0: -9, 1: 4}),
-            ([[2,3,4],[-3,-4,7]], {0: 34, 1: -24}),
-            ([[2,3,4],[-3,-4,7],[4,5,-10]], {1: -8, 0: 13}),
-            ([[2,3,4],[-3,-4,7],[4,-5,-10]], {1: -1, 0: 2}),
-            ([[1,0,-1], [0,1,-1], [-1,0,1]], {0: 1, 1: 1}),
-            ([[1,2,3,4],[2,1,4,3],[5,6,7,-8],[-3,2,-1,6]], {0: 0, 1: 2, 2: 0}),
-            ([[1,2,3,4],[2,-2,3,-10],[2,3,-5,6],[-3,-2,1,7]], {2: 2, 1: 0, 0: 2}),
-            ([[-9, -11, -8, 9, 11], [15, 0, 8, -7, 8], [4, 3, 11, -2, -13]], {0: 8, 1: -6, 2: 0, 3: 0}),
-            ([[-13, -8, -14, 15, 8], [-10, 9, 15, -13, 9], [-15, -14, -3, 2, 5]], {0: 0, 1: 0, 2: 0, 3: 0}),
-            ([[2, -1, -5, 14, -7]], {0: 4, 1: 0, 2: 0, 3: 0})
-        ]
-
-        for matrix, sol in test_data:
+        for matrix, sol in top_level_data:
             self.assertEqual(solve_matrix(matrix), ("SAT", sol))
 
     def testContradiction(self):
-        test_data = [
-            [(0, 1, 0, 1, 0, 1, 0, -1, 0, 0, 1), (0, -1, 0, -1, 0, 0, -1, 0, 0, 1, 1), 
-            (0, -1, -1, 0, 0, 0, -1, 1, 1, 0, 0), (0, 0, 0, 0, 0, 0, 1, 0, -2, 0, 0),
-            (0, 0, 1, 0, -1, 0, -1, 0, 0, -1, -1), (-2, 0, 0, 0, 0, 1, -1, 0, 0, 1, 0),
-            (1, -1, 0, 1, 0, -1, -1, 0, 1, 0, 0), (0, -2, 0, 0, -1, 0, 0, 0, 0, 2, 0),
-            (0, 0, 0, 0, 1, 0, 2, 1, 0, 0, -1), (1, 0, 1, 1, 0, 0, 0, 0, 0, 0, 0),
-            (0, 0, 0, 0, 0, 0, 0, 1, -2, -1, 1), (0, -1, 0, 0, 0, 0, -1, -2, -1, -1, 0),
-            (0, 0, -1, -1, 0, -1, -1, 0, 1, 0, -1), (0, 0, -1, 1, 0, 1, 0, -1, 0, 0, -1),
-            (0, 0, 0, -1, 0, 1, 0, -1, 0, 0, 0), (-1, 0, 1, 1, 0, 1, 0, 0, 1, 0, 1),
-            (1, 0, 0, 0, -1, 0, 0, 0, 0, 0, -1), (0, 0, 0, 1, 0, -1, 0, 0, 0, -1, 0),
-            (1, 0, 0, 0, -3, 0, 0, 0, 0, 0, 1), (-1, 0, 1, 0, 0, -1, 1, 1, 0, 0, -1)],         
-        ]
-
-        for f in test_data:
+        for f in contradiction_data:
             status, _ = solve_matrix(f)
             assert status == "UNSAT"
 
+    def testFactoidDB(self):
+        db = FactoidDB()
+        df1 = dfactoid(Factoid([1, -2, 3]), NoConcl())
+        df2 = dfactoid(Factoid([1, -2, 1]), NoConcl())
+        df3 = dfactoid(Factoid([-1, 2, 0]), NoConcl())
+        self.assertTrue(db.insert(df1))
+        self.assertTrue(db.insert(df2))
+        self.assertFalse(db.insert(df1))
+        self.assertTrue(db.insert(df3))
+        self.assertEqual(len(db), 2)
+        self.assertEqual(db.lookup((1, -2)), df2)
+        self.assertEqual(db.columns(), [(1, -1), (-2, 2)])
+
+        # Combining 0 <= x + 1 and 0 <= -x - 2 * y - 3 gives 0 <= -2 * y - 2,
+        # that is 0 <= -y - 1 after reducing gcd, contradicting 0 <= y.
+        db = FactoidDB([dfactoid(Factoid([0, 1, 0]), NoConcl())])
+        lowers = [dfactoid(Factoid([1, 0, 1]), NoConcl())]
+        uppers = [dfactoid(Factoid([-1, -2, -3]), NoConcl())]
+        self.assertIsInstance(extend_cross_product(db, True, 0, lowers, uppers), Contr)
+
     def testHOLRealCombine(self):
         test_data = [
             ([2, 1, -5], [-3, -1, 6], 1, 1, [-1, 0, 1]),
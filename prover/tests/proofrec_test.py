@@ -245,6 +245,39 @@ class ProofrecTest(unittest.TestCase):
             res = parse_term(res)
             self.assertEqual(proofrec.th_lemma([*assms, res]).prop, res)
 
+    def testLemmaCache(self):
+        context.set_context('smt', vars={"s": 'nat => nat', "A": 'nat', "B": 'nat'})
+        t = parse_term('s 1 = s 0 * B & ~s 0 = A --> s 1 + B = (s 0 + 1) * B')
+        proof, assertions = z3wrapper.solve_and_proof(t)
+
+        proofrec.clear_cache()
+        profile = proofrec.RecProfile()
+        r1 = proofrec.proofrec(proof, assertions=assertions, profile=profile)
+        self.assertNotEqual(r1.rule, 'sorry')
+        self.assertGreater(profile.rules['rewrite']['steps'], 0)
+        self.assertGreater(len(proofrec.lemma_cache), 0)
+
+        profile = proofrec.RecProfile()
+        r2 = proofrec.proofrec(proof, assertions=assertions, profile=profile)
+        self.assertEqual(r1.th, r2.th)
+        for name in ('rewrite', 'th-lemma'):
+            if name in profile.rules:
+                self.assertEqual(profile.rules[name]['reused'], profile.rules[name]['steps'])
+
+        proofrec.clear_cache()
+        r3 = proofrec.proofrec(proof, assertions=assertions, num_workers=2)
+        self.assertEqual(r1.th, r3.th)
+
+        max_lemma_cache = proofrec.max_lemma_cache
+        try:
+            proofrec.clear_cache()
+            proofrec.max_lemma_cache = 2
+            r4 = proofrec.proofrec(proof, assertions=assertions)
+            self.assertEqual(r1.th, r4.th)
+            self.assertEqual(len(proofrec.lemma_cache), 2)
+        finally:
+            proofrec.max_lemma_cache = max_lemma_cache
+
     def testRewriteIntWithAsserstion(self):
         test_data = [
             ("¬(¬(¬(¬P8 ∨ ¬(F20 + -1 * F18 ≤ 0)) ∨ ¬(P8 ∨ ¬(F4 + -1 * F2 ≤ 0))) ∨ ¬(¬(P8 ∨ ¬(F6 + -1 * F4 ≤ 0)) ∨ \
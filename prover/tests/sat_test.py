@@ -1,5 +1,7 @@
 import unittest
 import json
+import itertools
+import random
 
 from kernel.term import Not
 from logic import logic
@@ -54,6 +56,81 @@ class SATTest(unittest.TestCase):
         self.assertEqual(res, 'satisfiable')
         self.assertTrue(sat.is_solution(cnf, cert))
     
+    def testSolveCNFRandom(self):
+        rand = random.Random(0)
+        names = ['x', 'y', 'z', 'w', 'u']
+        for _ in range(300):
+            cnf = [[(name, rand.random() < 0.5) for name in rand.sample(names, rand.randint(1, 3))]
+                   for _ in range(rand.randint(1, 20))]
+            expected = any(sat.is_solution(cnf, dict(zip(names, vals)))
+                           for vals in itertools.product([True, False], repeat=len(names)))
+            res, cert = sat.solve_cnf(cnf)
+            if expected:
+                self.assertEqual(res, 'satisfiable')
+                self.assertTrue(sat.is_solution(cnf, cert))
+            else:
+                self.assertEqual(res, 'unsatisfiable')
+                self.assertTrue(sat.check_proof(cnf, cert))
+
+    def testSolveCNFPigeonhole(self):
+        # Five pigeons in four holes
+        cnf = [[('p%d_%d' % (i, j), True) for j in range(4)] for i in range(5)]
+        for j in range(4):
+            for i1, i2 in itertools.combinations(range(5), 2):
+                cnf.append([('p%d_%d' % (i1, j), False), ('p%d_%d' % (i2, j), False)])
+        res, cert = sat.solve_cnf(cnf)
+        self.assertEqual(res, 'unsatisfiable')
+        self.assertTrue(sat.check_proof(cnf, cert))
+
+    def testTrimProof(self):
+        rand = random.Random(0)
+        for _ in range(10):
+            cnf = [[('x' + str(i), rand.random() < 0.5) for i in rand.sample(range(20), 3)]
+                   for _ in range(120)]
+            res, cert = sat.solve_cnf(cnf)
+            self.assertEqual(res, 'unsatisfiable')
+            trimmed = sat.trim_proof(cert)
+            self.assertTrue(all(cert[k] == v for k, v in trimmed.items()))
+            self.assertEqual(max(trimmed), max(cert))
+            self.assertTrue(sat.check_proof(cnf, trimmed))
+
+    def testIncremental(self):
+        rand = random.Random(0)
+        names = ['x', 'y', 'z', 'w', 'u', 'v']
+        for _ in range(30):
+            solver = sat.SATSolver()
+            cnf, clauses = [], dict()
+            for _ in range(20):
+                clause = [(name, rand.random() < 0.5) for name in rand.sample(names, 3)]
+                cnf.append(clause)
+                clauses[solver.add_clause(clause)] = set(clause)
+
+                assumptions = [(name, rand.random() < 0.5) for name in rand.sample(names, 2)]
+                models = [dict(zip(names, vals)) for vals in itertools.product([True, False], repeat=len(names))]
+                expected = any(sat.is_solution(cnf + [[lit] for lit in assumptions], model) for model in models)
+                if solver.solve(assumptions):
+                    self.assertTrue(expected)
+                    assignment = solver.get_assignment()
+                    self.assertTrue(sat.is_solution(cnf + [[lit] for lit in assumptions], assignment))
+                    continue
+
+                self.assertFalse(expected)
+                core = solver.unsat_core()
+                self.assertTrue(set(core).issubset(set(assumptions)))
+                self.assertFalse(any(sat.is_solution(cnf + [[lit] for lit in core], model) for model in models))
+
+                # Replay the proof of the final clause
+                for clause_id in sorted(solver.proofs):
+                    if clause_id not in clauses:
+                        proof = solver.proofs[clause_id]
+                        clause = clauses[proof[0]]
+                        for prev_id in proof[1:]:
+                            pivots = [name for name, val in clause if (name, not val) in clauses[prev_id]]
+                            self.assertEqual(len(pivots), 1)
+                            clause = set(sat.resolution(clause, clauses[prev_id], pivots[0]))
+                        clauses[clause_id] = clause
+                self.assertEqual(clauses[solver.final_id], set((name, not val) for name, val in core))
+
     def testPelletier(self):
         with open('prover/tests/pelletier.json', 'r', encoding='utf-8') as f:
             f_data = json.load(f)
@@ -64,6 +141,7 @@ class SATTest(unittest.TestCase):
             cnf = tseitin.convert_cnf(tseitin.encode(Not(prop)).prop)
             res, cert = sat.solve_cnf(cnf)
             self.assertEqual(res, 'unsatisfiable')
+            self.assertTrue(sat.check_proof(cnf, cert))
 
 
 if __name__ == "__main__":
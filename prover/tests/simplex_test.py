@@ -1,104 +1,171 @@
 import unittest
+import math
 from logic import context
 from syntax import parser
+from kernel import theory
 from prover import simplex
+from prover.simplex import Jar, GreaterEq, LessEq
 
-context.set_context('real', vars={
-    "x9_plus": "real", "x9_minus": "real", "x6_plus": "real", "x6_minus": "real", "x5_plus": "real", "x5_minus": "real", "x4_plus": "real", "x4_minus": "real",
-    "x3_plus": "real", "x3_minus": "real", "x2_plus": "real", "x2_minus": "real", "x0_plus": "real", "x0_minus": "real", "x7_plus": "real", "x7_minus": "real",
-    "x1_plus": "real", "x1_minus": "real", "x8_plus": "real", "x8_minus": "real",
-    "x14_plus": "real", "x14_minus": "real", "x12_plus": "real", "x12_minus": "real", "x10_plus": "real", "x10_minus": "real",
-    "x13_plus": "real", "x13_minus": "real", "x19_plus": "real", "x19_minus": "real", "x18_plus": "real", "x18_minus": "real",
-    "x17_plus": "real", "x17_minus": "real", "x16_plus": "real", "x16_minus": "real", "x15_plus": "real", "x15_minus": "real",
-    'x': 'real', 'y': 'real', 'z': 'real'
-})
+vars = {"x%d_%s" % (i, s): "real" for i in range(20) for s in ["plus", "minus"]}
+vars.update({'x': 'real', 'y': 'real', 'z': 'real'})
+
+# Unsatisfiable problems
+test_data = {
+    '10 vars': [
+        "7 * x6_plus + -7 * x6_minus + x5_plus + -1 * x5_minus + 4 * x3_plus + -4 * x3_minus + x7_plus + -1 * x7_minus + -5 * x1_plus + 5 * x1_minus + -7 * x8_plus + 7 * x8_minus ≥ 1",
+        "2 * x9_plus + -2 * x9_minus + 14 * x6_plus + -14 * x6_minus + 6 * x4_plus + -6 * x4_minus + -5 * x3_plus + 5 * x3_minus + -1 * x2_plus + x2_minus + 4 * x7_plus + -4 * x7_minus ≤ 0",
+        "4 * x9_plus + -4 * x9_minus + x6_plus + -1 * x6_minus + -8 * x4_plus + 8 * x4_minus + 15 * x2_plus + -15 * x2_minus + 4 * x0_plus + -4 * x0_minus + 4 * x1_plus + -4 * x1_minus ≥ 0",
+        "3 * x9_plus + -3 * x9_minus + 9 * x6_plus + -9 * x6_minus + 2 * x5_plus + -2 * x5_minus + -1 * x4_plus + x4_minus + 16 * x2_plus + -16 * x2_minus + -6 * x0_plus + 6 * x0_minus ≤ -9",
+        "2 * x5_plus + -2 * x5_minus + 2 * x4_plus + -2 * x4_minus + 4 * x3_plus + -4 * x3_minus + 9 * x7_plus + -9 * x7_minus + 11 * x1_plus + -11 * x1_minus + -2 * x8_plus + 2 * x8_minus ≤ 5",
+        "3 * x9_plus + -3 * x9_minus + 9 * x5_plus + -9 * x5_minus + -9 * x4_plus + 9 * x4_minus + 5 * x2_plus + -5 * x2_minus + 2 * x0_plus + -2 * x0_minus + -1 * x7_plus + x7_minus + x1_plus + -1 * x1_minus ≤ -5",
+        "9 * x9_plus + -9 * x9_minus + 4 * x4_plus + -4 * x4_minus + -12 * x2_plus + 12 * x2_minus + 6 * x0_plus + -6 * x0_minus + 5 * x7_plus + -5 * x7_minus + 8 * x8_plus + -8 * x8_minus ≤ 4",
+        "5 * x9_plus + -5 * x9_minus + -3 * x6_plus + 3 * x6_minus + -7 * x5_plus + 7 * x5_minus + x4_plus + -1 * x4_minus + 7 * x3_plus + -7 * x3_minus + 4 * x2_plus + -4 * x2_minus + 13 * x0_plus + -13 * x0_minus ≤ 6",
+        "8 * x9_plus + -8 * x9_minus + -7 * x6_plus + 7 * x6_minus + 17 * x5_plus + -17 * x5_minus + -3 * x4_plus + 3 * x4_minus + -3 * x0_plus + 3 * x0_minus + 5 * x1_plus + -5 * x1_minus + 3 * x8_plus + -3 * x8_minus ≥ -1",
+        "3 * x9_plus + -3 * x9_minus + -7 * x6_plus + 7 * x6_minus + -7 * x5_plus + 7 * x5_minus + 4 * x4_plus + -4 * x4_minus + 4 * x2_plus + -4 * x2_minus + -8 * x0_plus + 8 * x0_minus + -6 * x1_plus + 6 * x1_minus ≤ -9",
+        "7 * x6_plus + -7 * x6_minus + -7 * x5_plus + 7 * x5_minus + 6 * x4_plus + -6 * x4_minus + -4 * x3_plus + 4 * x3_minus + -14 * x0_plus + 14 * x0_minus + -19 * x1_plus + 19 * x1_minus + 9 * x8_plus + -9 * x8_minus ≥ 7"
+    ],
+    '15 vars (1)': [
+        "2 * x10_plus + -2 * x10_minus + -1 * x2_plus + x2_minus + -1 * x4_plus + x4_minus + x6_plus + -1 * x6_minus ≤ 0",
+        "2 * x14_plus + -2 * x14_minus + -1 * x10_plus + x10_minus + -1 * x8_plus + x8_minus + x0_plus + -1 * x0_minus ≤ 0",
+        "x9_plus + -1 * x9_minus + -1 * x7_plus + x7_minus + x1_plus + -1 * x1_minus + -1 * x4_plus + x4_minus + x6_plus + -1 * x6_minus ≥ 0",
+        "x13_plus + -1 * x13_minus + x11_plus + -1 * x11_minus + x3_plus + -1 * x3_minus + -1 * x2_plus + x2_minus + x6_plus + -1 * x6_minus ≤ 0",
+        "x9_plus + -1 * x9_minus + x8_plus + -1 * x8_minus + -1 * x5_plus + x5_minus + -2 * x4_plus + 2 * x4_minus + -1 * x6_plus + x6_minus ≤ -1",
+        "x12_plus + -1 * x12_minus + -1 * x8_plus + x8_minus + -1 * x0_plus + x0_minus + 2 * x11_plus + -2 * x11_minus + -1 * x3_plus + x3_minus + x2_plus + -1 * x2_minus ≤ 1",
+        "x14_plus + -1 * x14_minus + x10_plus + -1 * x10_minus + x1_plus + -1 * x1_minus + x3_plus + -1 * x3_minus + -1 * x2_plus + x2_minus + x4_plus + -1 * x4_minus + x6_plus + -1 * x6_minus ≥ 0",
+        "x14_plus + -1 * x14_minus + -1 * x12_plus + x12_minus + -1 * x5_plus + x5_minus + -1 * x1_plus + x1_minus + x13_plus + -1 * x13_minus + -1 * x4_plus + x4_minus + x6_plus + -1 * x6_minus ≥ 0",
+        "x12_plus + -1 * x12_minus + x10_plus + -1 * x10_minus + x7_plus + -1 * x7_minus + x5_plus + -1 * x5_minus + x11_plus + -1 * x11_minus + -1 * x2_plus + x2_minus + -1 * x6_plus + x6_minus ≥ 0",
+        "2 * x10_plus + -2 * x10_minus + x8_plus + -1 * x8_minus + x7_plus + -1 * x7_minus + x5_plus + -1 * x5_minus + x3_plus + -1 * x3_minus + x4_plus + -1 * x4_minus + -1 * x6_plus + x6_minus ≥ 1",
+        "x14_plus + -1 * x14_minus + x12_plus + -1 * x12_minus + -1 * x9_plus + x9_minus + -1 * x8_plus + x8_minus + -1 * x5_plus + x5_minus + x11_plus + -1 * x11_minus + -1 * x3_plus + x3_minus + x6_plus + -1 * x6_minus ≥ 1",
+        "x12_plus + -1 * x12_minus + -1 * x7_plus + x7_minus + -1 * x5_plus + x5_minus + -1 * x1_plus + x1_minus + x0_plus + -1 * x0_minus + -1 * x13_plus + x13_minus + x3_plus + -1 * x3_minus + -1 * x6_plus + x6_minus ≥ 1",
+        "2 * x10_plus + -2 * x10_minus + -1 * x8_plus + x8_minus + -1 * x5_plus + x5_minus + x1_plus + -1 * x1_minus + 2 * x2_plus + -2 * x2_minus + x4_plus + -1 * x4_minus + -1 * x6_plus + x6_minus ≥ -1",
+        "x14_plus + -1 * x14_minus + x12_plus + -1 * x12_minus + x10_plus + -1 * x10_minus + x9_plus + -1 * x9_minus + x8_plus + -1 * x8_minus + x7_plus + -1 * x7_minus + -1 * x5_plus + x5_minus + -1 * x1_plus + x1_minus + x0_plus + -1 * x0_minus ≤ 1",
+        "x12_plus + -1 * x12_minus + -1 * x9_plus + x9_minus + x8_plus + -1 * x8_minus + -1 * x7_plus + x7_minus + x13_plus + -1 * x13_minus + -1 * x11_plus + x11_minus + -1 * x3_plus + x3_minus + -1 * x2_plus + x2_minus + x4_plus + -1 * x4_minus ≤ 0",
+        "x14_plus + -1 * x14_minus + -1 * x12_plus + x12_minus + x5_plus + -1 * x5_minus + 2 * x1_plus + -2 * x1_minus + -1 * x0_plus + x0_minus + x13_plus + -1 * x13_minus + -1 * x11_plus + x11_minus + x3_plus + -1 * x3_minus + -2 * x2_plus + 2 * x2_minus ≤ 0"
+    ],
+    '15 vars (2)': [
+        "2 * x14_plus + -2 * x14_minus + x2_plus + -1 * x2_minus + -1 * x1_plus + x1_minus + -1 * x0_plus + x0_minus ≤ 0",
+        "x13_plus + -1 * x13_minus + -1 * x6_plus + x6_minus + -1 * x2_plus + x2_minus + x0_plus + -1 * x0_minus + -1 * x9_plus + x9_minus ≤ 0",
+        "x11_plus + -1 * x11_minus + -1 * x8_plus + x8_minus + x4_plus + -1 * x4_minus + x3_plus + -1 * x3_minus + -2 * x1_plus + 2 * x1_minus ≥ 0",
+        "x11_plus + -1 * x11_minus + -1 * x8_plus + x8_minus + -1 * x3_plus + x3_minus + -2 * x5_plus + 2 * x5_minus + x9_plus + -1 * x9_minus ≤ 1",
+        "x14_plus + -1 * x14_minus + x10_plus + -1 * x10_minus + -1 * x7_plus + x7_minus + 2 * x2_plus + -2 * x2_minus + x0_plus + -1 * x0_minus ≤ -1",
+        "3 * x13_plus + -3 * x13_minus + x4_plus + -1 * x4_minus + x2_plus + -1 * x2_minus + -1 * x1_plus + x1_minus + -1 * x5_plus + x5_minus ≤ -1",
+        "x13_plus + -1 * x13_minus + -2 * x10_plus + 2 * x10_minus + x6_plus + -1 * x6_minus + x4_plus + -1 * x4_minus + -1 * x2_plus + x2_minus + -1 * x0_plus + x0_minus ≤ -1",
+        "x14_plus + -1 * x14_minus + x13_plus + -1 * x13_minus + -1 * x12_plus + x12_minus + x11_plus + -1 * x11_minus + x8_plus + -1 * x8_minus + -1 * x4_plus + x4_minus + -1 * x1_plus + x1_minus ≥ 0",
+        "x14_plus + -1 * x14_minus + -1 * x13_plus + x13_minus + -1 * x11_plus + x11_minus + x10_plus + -1 * x10_minus + -1 * x4_plus + x4_minus + x3_plus + -1 * x3_minus + -1 * x2_plus + x2_minus ≤ -1",
+        "x14_plus + -1 * x14_minus + -1 * x11_plus + x11_minus + x10_plus + -1 * x10_minus + x8_plus + -1 * x8_minus + -1 * x7_plus + x7_minus + -1 * x4_plus + x4_minus + -1 * x3_plus + x3_minus ≤ -1",
+        "2 * x8_plus + -2 * x8_minus + x7_plus + -1 * x7_minus + -1 * x2_plus + x2_minus + 2 * x0_plus + -2 * x0_minus + -1 * x5_plus + x5_minus + x9_plus + -1 * x9_minus ≤ 0",
+        "x12_plus + -1 * x12_minus + -1 * x11_plus + x11_minus + 3 * x7_plus + -3 * x7_minus + x6_plus + -1 * x6_minus + -1 * x3_plus + x3_minus + x2_plus + -1 * x2_minus + -1 * x0_plus + x0_minus ≤ 0",
+        "2 * x13_plus + -2 * x13_minus + -1 * x12_plus + x12_minus + x11_plus + -1 * x11_minus + -1 * x8_plus + x8_minus + -1 * x7_plus + x7_minus + x1_plus + -1 * x1_minus + 2 * x5_plus + -2 * x5_minus ≤ 1",
+        "x14_plus + -1 * x14_minus + x10_plus + -1 * x10_minus + -1 * x6_plus + x6_minus + -1 * x3_plus + x3_minus + x1_plus + -1 * x1_minus + -1 * x0_plus + x0_minus + -1 * x5_plus + x5_minus + -2 * x9_plus + 2 * x9_minus ≥ -1",
+        "x14_plus + -1 * x14_minus + 4 * x13_plus + -4 * x13_minus + x12_plus + -1 * x12_minus + -2 * x11_plus + 2 * x11_minus + -1 * x10_plus + x10_minus + -1 * x8_plus + x8_minus + 2 * x7_plus + -2 * x7_minus + x6_plus + -1 * x6_minus + x4_plus + -1 * x4_minus + -1 * x3_plus + x3_minus + x1_plus + -1 * x1_minus + -1 * x0_plus + x0_minus ≥ -1",
+        "308 * x14_plus + -308 * x14_minus + 1391 * x13_plus + -1391 * x13_minus + 308 * x12_plus + -308 * x12_minus + -669 * x11_plus + 669 * x11_minus + -308 * x10_plus + 308 * x10_minus + -361 * x8_plus + 361 * x8_minus + 616 * x7_plus + -616 * x7_minus + 308 * x6_plus + -308 * x6_minus + 308 * x4_plus + -308 * x4_minus + -308 * x3_plus + 308 * x3_minus + -53 * x2_plus + 53 * x2_minus + 308 * x1_plus + -308 * x1_minus + -308 * x0_plus + 308 * x0_minus ≥ -615"
+    ],
+    '20 vars': [
+        "x18_plus + -1 * x18_minus + x12_plus + -1 * x12_minus + -1 * x4_plus + x4_minus + -1 * x8_plus + x8_minus + -1 * x5_plus + x5_minus ≥ 0",
+        "x14_plus + -1 * x14_minus + -1 * x13_plus + x13_minus + x12_plus + -1 * x12_minus + 2 * x4_plus + -2 * x4_minus + x2_plus + -1 * x2_minus ≤ 1",
+        "x16_plus + -1 * x16_minus + -1 * x14_plus + x14_minus + x13_plus + -1 * x13_minus + -1 * x6_plus + x6_minus + x0_plus + -1 * x0_minus + x1_plus + -1 * x1_minus ≥ 1",
+        "x19_plus + -1 * x19_minus + -1 * x11_plus + x11_minus + -1 * x15_plus + x15_minus + x10_plus + -1 * x10_minus + -1 * x8_plus + x8_minus + x3_plus + -1 * x3_minus ≤ 0",
+        "x14_plus + -1 * x14_minus + -1 * x13_plus + x13_minus + x12_plus + -1 * x12_minus + -1 * x11_plus + x11_minus + -1 * x4_plus + x4_minus + -1 * x5_plus + x5_minus ≤ 0",
+        "x16_plus + -1 * x16_minus + x14_plus + -1 * x14_minus + -2 * x13_plus + 2 * x13_minus + -1 * x9_plus + x9_minus + -1 * x6_plus + x6_minus + x17_plus + -1 * x17_minus ≥ 1",
+        "x18_plus + -1 * x18_minus + x13_plus + -1 * x13_minus + x9_plus + -1 * x9_minus + -1 * x17_plus + x17_minus + x15_plus + -1 * x15_minus + x5_plus + -1 * x5_minus + -1 * x7_plus + x7_minus ≤ 0",
+        "x18_plus + -1 * x18_minus + x4_plus + -1 * x4_minus + -1 * x2_plus + x2_minus + x0_plus + -1 * x0_minus + x10_plus + -1 * x10_minus + x7_plus + -1 * x7_minus + -1 * x1_plus + x1_minus ≤ -1",
+        "2 * x19_plus + -2 * x19_minus + x18_plus + -1 * x18_minus + 2 * x16_plus + -2 * x16_minus + -1 * x0_plus + x0_minus + -1 * x3_plus + x3_minus + x1_plus + -1 * x1_minus ≤ 0",
+        "x18_plus + -1 * x18_minus + -1 * x12_plus + x12_minus + -1 * x11_plus + x11_minus + 2 * x4_plus + -2 * x4_minus + -1 * x17_plus + x17_minus + -1 * x15_plus + x15_minus + -1 * x5_plus + x5_minus ≥ 0",
+        "x19_plus + -1 * x19_minus + -1 * x18_plus + x18_minus + x11_plus + -1 * x11_minus + x0_plus + -1 * x0_minus + -1 * x10_plus + x10_minus + -1 * x7_plus + x7_minus + x3_plus + -1 * x3_minus + x1_plus + -1 * x1_minus ≤ 0",
+        "x19_plus + -1 * x19_minus + -1 * x14_plus + x14_minus + x13_plus + -1 * x13_minus + x12_plus + -1 * x12_minus + -1 * x11_plus + x11_minus + -1 * x9_plus + x9_minus + -1 * x3_plus + x3_minus + -1 * x1_plus + x1_minus ≤ 0",
+        "2 * x12_plus + -2 * x12_minus + 2 * x11_plus + -2 * x11_minus + x4_plus + -1 * x4_minus + x2_plus + -1 * x2_minus + -2 * x5_plus + 2 * x5_minus + x3_plus + -1 * x3_minus ≥ 0",
+        "x19_plus + -1 * x19_minus + x14_plus + -1 * x14_minus + x13_plus + -1 * x13_minus + -1 * x6_plus + x6_minus + -1 * x4_plus + x4_minus + x2_plus + -1 * x2_minus + -1 * x17_plus + x17_minus + -1 * x15_plus + x15_minus + x3_plus + -1 * x3_minus ≥ 0",
+        "2 * x19_plus + -2 * x19_minus + -2 * x18_plus + 2 * x18_minus + x16_plus + -1 * x16_minus + -1 * x13_plus + x13_minus + x0_plus + -1 * x0_minus + 2 * x15_plus + -2 * x15_minus + -1 * x7_plus + x7_minus ≥ 1",
+        "2 * x16_plus + -2 * x16_minus + -1 * x14_plus + x14_minus + -2 * x9_plus + 2 * x9_minus + -2 * x0_plus + 2 * x0_minus + -1 * x17_plus + x17_minus + -1 * x15_plus + x15_minus + x8_plus + -1 * x8_minus ≤ 0",
+        "x14_plus + -1 * x14_minus + -1 * x13_plus + x13_minus + 3 * x9_plus + -3 * x9_minus + 2 * x6_plus + -2 * x6_minus + x2_plus + -1 * x2_minus + -1 * x0_plus + x0_minus + -2 * x1_plus + 2 * x1_minus ≥ -1",
+        "x16_plus + -1 * x16_minus + -1 * x14_plus + x14_minus + -1 * x13_plus + x13_minus + x11_plus + -1 * x11_minus + -2 * x6_plus + 2 * x6_minus + x0_plus + -1 * x0_minus + x15_plus + -1 * x15_minus + x10_plus + -1 * x10_minus + -1 * x5_plus + x5_minus ≤ 0",
+        "x18_plus + -1 * x18_minus + 3 * x16_plus + -3 * x16_minus + x14_plus + -1 * x14_minus + -1 * x11_plus + x11_minus + x9_plus + -1 * x9_minus + x4_plus + -1 * x4_minus + -1 * x15_plus + x15_minus + x10_plus + -1 * x10_minus + x5_plus + -1 * x5_minus ≤ -1",
+        "x19_plus + -1 * x19_minus + x14_plus + -1 * x14_minus + x13_plus + -1 * x13_minus + -1 * x4_plus + x4_minus + x2_plus + -1 * x2_minus + -1 * x17_plus + x17_minus + x15_plus + -1 * x15_minus + -1 * x10_plus + x10_minus + -1 * x8_plus + x8_minus + -3 * x5_plus + 3 * x5_minus ≤ 0",
+        "x19_plus + -1 * x19_minus + -1 * x18_plus + x18_minus + x16_plus + -1 * x16_minus + x14_plus + -1 * x14_minus + -1 * x13_plus + x13_minus + x12_plus + -1 * x12_minus + -1 * x11_plus + x11_minus + x9_plus + -1 * x9_minus + x6_plus + -1 * x6_minus + x4_plus + -1 * x4_minus + x2_plus + -1 * x2_minus + x0_plus + -1 * x0_minus ≤ 0"
+    ],
+}
 
 class SimplexTest(unittest.TestCase):
+    def testUnsat(self):
+        context.set_context('real', vars=vars)
+        for name, data in test_data.items():
+            ineqs, _, _ = simplex.term_to_ineq([parser.parse_term(t) for t in data])
+            s = simplex.Simplex()
+            s.add_ineqs(*ineqs)
+            self.assertRaises(simplex.UNSATException, s.handle_assertion)
+
+    def testSimplexMacro(self):
+        context.set_context('real', vars=vars)
+        ts = [parser.parse_term(t) for t in ["x + y >= 2", "x + -1 * y >= 1", "2 * x + y <= 2"]]
+        pt = simplex.SimplexMacro().get_proof_term(ts)
+        self.assertEqual(pt.prop, parser.parse_term("false"))
+        self.assertEqual(set(pt.hyps), set(ts))
+        self.assertEqual(theory.check_proof(pt.export()), pt.th)
+
+    def testPushPop(self):
+        s = simplex.Simplex()
+        s.add_ineqs(GreaterEq([Jar(1, 'x'), Jar(1, 'y')], 2), LessEq([Jar(1, 'x'), Jar(-1, 'y')], 0))
+        s.handle_assertion()
+
+        s.push()
+        s.assert_ineq(LessEq([Jar(1, 'y')], 0))
+        self.assertEqual(s.check(), simplex.UNSAT)
+        s.pop()
+        self.assertEqual(s.check(), simplex.SAT)
+
+        s.push()
+        s.assert_ineq(LessEq([Jar(1, 'x')], 1))
+        s.assert_ineq(GreaterEq([Jar(2, 'x'), Jar(1, 'y')], 4))
+        self.assertEqual(s.check(), simplex.SAT)
+        self.assertTrue(s.mapping['x'] <= 1 and 2 * s.mapping['x'] + s.mapping['y'] >= 4)
+        s.push()
+        self.assertRaises(simplex.AssertLowerException, s.assert_ineq, GreaterEq([Jar(1, 'x')], 2))
+        s.pop()
+        s.pop()
+        self.assertEqual(s.bound['x'], (-math.inf, math.inf))
+
+    def testManyRows(self):
+        s = simplex.Simplex()
+        for i in range(30):
+            s.add_ineq(GreaterEq([Jar(1, 'x' + str(i)), Jar(1, 'x' + str(i+1))], 1))
+            s.add_ineq(LessEq([Jar(1, 'x' + str(i)), Jar(-1, 'x' + str(i+1))], 0))
+        s.handle_assertion()
+        self.assertEqual(len(s.basic), 60)
+        self.assertRaises(simplex.AssertUpperException, s.assert_ineq,
+                          LessEq([Jar(1, 'x29'), Jar(1, 'x30')], 0))
 
-    # def test10Vars(self):
-    #     test_data = [
-    #                     "7 * x6_plus + -7 * x6_minus + x5_plus + -1 * x5_minus + 4 * x3_plus + -4 * x3_minus + x7_plus + -1 * x7_minus + -5 * x1_plus + 5 * x1_minus + -7 * x8_plus + 7 * x8_minus ≥ 1", 
-    #                     "2 * x9_plus + -2 * x9_minus + 14 * x6_plus + -14 * x6_minus + 6 * x4_plus + -6 * x4_minus + -5 * x3_plus + 5 * x3_minus + -1 * x2_plus + x2_minus + 4 * x7_plus + -4 * x7_minus ≤ 0", 
-    #                     "4 * x9_plus + -4 * x9_minus + x6_plus + -1 * x6_minus + -8 * x4_plus + 8 * x4_minus + 15 * x2_plus + -15 * x2_minus + 4 * x0_plus + -4 * x0_minus + 4 * x1_plus + -4 * x1_minus ≥ 0", 
-    #                     "3 * x9_plus + -3 * x9_minus + 9 * x6_plus + -9 * x6_minus + 2 * x5_plus + -2 * x5_minus + -1 * x4_plus + x4_minus + 16 * x2_plus + -16 * x2_minus + -6 * x0_plus + 6 * x0_minus ≤ -9", 
-    #                     "2 * x5_plus + -2 * x5_minus + 2 * x4_plus + -2 * x4_minus + 4 * x3_plus + -4 * x3_minus + 9 * x7_plus + -9 * x7_minus + 11 * x1_plus + -11 * x1_minus + -2 * x8_plus + 2 * x8_minus ≤ 5",
-    #                     "3 * x9_plus + -3 * x9_minus + 9 * x5_plus + -9 * x5_minus + -9 * x4_plus + 9 * x4_minus + 5 * x2_plus + -5 * x2_minus + 2 * x0_plus + -2 * x0_minus + -1 * x7_plus + x7_minus + x1_plus + -1 * x1_minus ≤ -5", 
-    #                     "9 * x9_plus + -9 * x9_minus + 4 * x4_plus + -4 * x4_minus + -12 * x2_plus + 12 * x2_minus + 6 * x0_plus + -6 * x0_minus + 5 * x7_plus + -5 * x7_minus + 8 * x8_plus + -8 * x8_minus ≤ 4", 
-    #                     "5 * x9_plus + -5 * x9_minus + -3 * x6_plus + 3 * x6_minus + -7 * x5_plus + 7 * x5_minus + x4_plus + -1 * x4_minus + 7 * x3_plus + -7 * x3_minus + 4 * x2_plus + -4 * x2_minus + 13 * x0_plus + -13 * x0_minus ≤ 6", 
-    #                     "8 * x9_plus + -8 * x9_minus + -7 * x6_plus + 7 * x6_minus + 17 * x5_plus + -17 * x5_minus + -3 * x4_plus + 3 * x4_minus + -3 * x0_plus + 3 * x0_minus + 5 * x1_plus + -5 * x1_minus + 3 * x8_plus + -3 * x8_minus ≥ -1", 
-    #                     "3 * x9_plus + -3 * x9_minus + -7 * x6_plus + 7 * x6_minus + -7 * x5_plus + 7 * x5_minus + 4 * x4_plus + -4 * x4_minus + 4 * x2_plus + -4 * x2_minus + -8 * x0_plus + 8 * x0_minus + -6 * x1_plus + 6 * x1_minus ≤ -9", 
-    #                     "7 * x6_plus + -7 * x6_minus + -7 * x5_plus + 7 * x5_minus + 6 * x4_plus + -6 * x4_minus + -4 * x3_plus + 4 * x3_minus + -14 * x0_plus + 14 * x0_minus + -19 * x1_plus + 19 * x1_minus + 9 * x8_plus + -9 * x8_minus ≥ 7"
-    #     ]
-    #     comparsions = [parser.parse_term(c) for c in test_data]
-    #     unsat_pt = simplex.solve_hol_ineqs(comparsions)
-    #     self.assertNotEqual(unsat_pt.rule, "sorry")
+    def testBranchAndCut(self):
+        # 2 * x + 2 * y = 7, solved by tightening the rows
+        ineqs = [GreaterEq([Jar(2, 'x'), Jar(2, 'y')], 7), LessEq([Jar(2, 'x'), Jar(2, 'y')], 7),
+                 GreaterEq([Jar(1, 'x')], 0), LessEq([Jar(1, 'x')], 10),
+                 GreaterEq([Jar(1, 'y')], 0), LessEq([Jar(1, 'y')], 10)]
+        for cuts, size in [(False, 17), (True, 3)]:
+            s = simplex.Simplex()
+            s.add_ineqs(*ineqs)
+            T = simplex.branch_and_bound(s, [], [], cuts=cuts)
+            self.assertEqual(T.size(), size)
 
-    # def test15Vars1(self):
-    #     test_data = [
-    #         "2 * x10_plus + -2 * x10_minus + -1 * x2_plus + x2_minus + -1 * x4_plus + x4_minus + x6_plus + -1 * x6_minus ≤ 0",
-    #         "2 * x14_plus + -2 * x14_minus + -1 * x10_plus + x10_minus + -1 * x8_plus + x8_minus + x0_plus + -1 * x0_minus ≤ 0",
-    #         "x9_plus + -1 * x9_minus + -1 * x7_plus + x7_minus + x1_plus + -1 * x1_minus + -1 * x4_plus + x4_minus + x6_plus + -1 * x6_minus ≥ 0",
-    #         "x13_plus + -1 * x13_minus + x11_plus + -1 * x11_minus + x3_plus + -1 * x3_minus + -1 * x2_plus + x2_minus + x6_plus + -1 * x6_minus ≤ 0",
-    #         "x9_plus + -1 * x9_minus + x8_plus + -1 * x8_minus + -1 * x5_plus + x5_minus + -2 * x4_plus + 2 * x4_minus + -1 * x6_plus + x6_minus ≤ -1",
-    #         "x12_plus + -1 * x12_minus + -1 * x8_plus + x8_minus + -1 * x0_plus + x0_minus + 2 * x11_plus + -2 * x11_minus + -1 * x3_plus + x3_minus + x2_plus + -1 * x2_minus ≤ 1", 
-    #         "x14_plus + -1 * x14_minus + x10_plus + -1 * x10_minus + x1_plus + -1 * x1_minus + x3_plus + -1 * x3_minus + -1 * x2_plus + x2_minus + x4_plus + -1 * x4_minus + x6_plus + -1 * x6_minus ≥ 0", 
-    #         "x14_plus + -1 * x14_minus + -1 * x12_plus + x12_minus + -1 * x5_plus + x5_minus + -1 * x1_plus + x1_minus + x13_plus + -1 * x13_minus + -1 * x4_plus + x4_minus + x6_plus + -1 * x6_minus ≥ 0",
-    #         "x12_plus + -1 * x12_minus + x10_plus + -1 * x10_minus + x7_plus + -1 * x7_minus + x5_plus + -1 * x5_minus + x11_plus + -1 * x11_minus + -1 * x2_plus + x2_minus + -1 * x6_plus + x6_minus ≥ 0",
-    #         "2 * x10_plus + -2 * x10_minus + x8_plus + -1 * x8_minus + x7_plus + -1 * x7_minus + x5_plus + -1 * x5_minus + x3_plus + -1 * x3_minus + x4_plus + -1 * x4_minus + -1 * x6_plus + x6_minus ≥ 1", 
-    #         "x14_plus + -1 * x14_minus + x12_plus + -1 * x12_minus + -1 * x9_plus + x9_minus + -1 * x8_plus + x8_minus + -1 * x5_plus + x5_minus + x11_plus + -1 * x11_minus + -1 * x3_plus + x3_minus + x6_plus + -1 * x6_minus ≥ 1", 
-    #         "x12_plus + -1 * x12_minus + -1 * x7_plus + x7_minus + -1 * x5_plus + x5_minus + -1 * x1_plus + x1_minus + x0_plus + -1 * x0_minus + -1 * x13_plus + x13_minus + x3_plus + -1 * x3_minus + -1 * x6_plus + x6_minus ≥ 1", 
-    #         "2 * x10_plus + -2 * x10_minus + -1 * x8_plus + x8_minus + -1 * x5_plus + x5_minus + x1_plus + -1 * x1_minus + 2 * x2_plus + -2 * x2_minus + x4_plus + -1 * x4_minus + -1 * x6_plus + x6_minus ≥ -1", 
-    #         "x14_plus + -1 * x14_minus + x12_plus + -1 * x12_minus + x10_plus + -1 * x10_minus + x9_plus + -1 * x9_minus + x8_plus + -1 * x8_minus + x7_plus + -1 * x7_minus + -1 * x5_plus + x5_minus + -1 * x1_plus + x1_minus + x0_plus + -1 * x0_minus ≤ 1",
-    #         "x12_plus + -1 * x12_minus + -1 * x9_plus + x9_minus + x8_plus + -1 * x8_minus + -1 * x7_plus + x7_minus + x13_plus + -1 * x13_minus + -1 * x11_plus + x11_minus + -1 * x3_plus + x3_minus + -1 * x2_plus + x2_minus + x4_plus + -1 * x4_minus ≤ 0", 
-    #         "x14_plus + -1 * x14_minus + -1 * x12_plus + x12_minus + x5_plus + -1 * x5_minus + 2 * x1_plus + -2 * x1_minus + -1 * x0_plus + x0_minus + x13_plus + -1 * x13_minus + -1 * x11_plus + x11_minus + x3_plus + -1 * x3_minus + -2 * x2_plus + 2 * x2_minus ≤ 0"]
+        # 3 * x + 5 * y = 4 has the solution x = 3, y = -1
+        s = simplex.Simplex()
+        s.add_ineqs(GreaterEq([Jar(3, 'x'), Jar(5, 'y')], 4), LessEq([Jar(3, 'x'), Jar(5, 'y')], 4),
+                    GreaterEq([Jar(1, 'x')], 1), LessEq([Jar(1, 'y')], 0))
+        res = simplex.branch_and_bound(s, [], [])
+        self.assertEqual((res['x'], res['y']), (3, -1))
 
-    #     comparsions = [parser.parse_term(c) for c in test_data]
-    #     unsat_pt = simplex.solve_hol_ineqs(comparsions)
-    #     self.assertNotEqual(unsat_pt.rule, "sorry")
+    def testIntegerSimplexMacro(self):
+        context.set_context('real', vars={'x': 'int', 'y': 'int', 'z': 'int'})
+        test_data = [
+            ["2 * x + 2 * y >= 1", "2 * x + 2 * y <= 1", "1 * x >= 0", "1 * x <= 3", "1 * y >= 0", "1 * y <= 3"],
+            ["7 * x + 5 * y + 3 * z >= 2", "7 * x + 5 * y + 3 * z <= 2", "1 * x >= 0", "1 * y >= 0",
+             "1 * z >= 1", "1 * x <= 4", "1 * y <= 4", "1 * z <= 4"],
+        ]
+        for data in test_data:
+            ts = [parser.parse_term(t) for t in data]
+            pt = simplex.IntegerSimplexMacro().get_proof_term(ts)
+            self.assertEqual(pt.prop, parser.parse_term("false"))
+            self.assertTrue(set(pt.hyps) <= set(ts))
+            self.assertEqual(theory.check_proof(pt.export()), pt.th)
 
-    # def test15Vars2(self):
-    #     test_data = [
-    #         "2 * x14_plus + -2 * x14_minus + x2_plus + -1 * x2_minus + -1 * x1_plus + x1_minus + -1 * x0_plus + x0_minus ≤ 0",
-    #         "x13_plus + -1 * x13_minus + -1 * x6_plus + x6_minus + -1 * x2_plus + x2_minus + x0_plus + -1 * x0_minus + -1 * x9_plus + x9_minus ≤ 0",
-    #         "x11_plus + -1 * x11_minus + -1 * x8_plus + x8_minus + x4_plus + -1 * x4_minus + x3_plus + -1 * x3_minus + -2 * x1_plus + 2 * x1_minus ≥ 0", 
-    #         "x11_plus + -1 * x11_minus + -1 * x8_plus + x8_minus + -1 * x3_plus + x3_minus + -2 * x5_plus + 2 * x5_minus + x9_plus + -1 * x9_minus ≤ 1", 
-    #         "x14_plus + -1 * x14_minus + x10_plus + -1 * x10_minus + -1 * x7_plus + x7_minus + 2 * x2_plus + -2 * x2_minus + x0_plus + -1 * x0_minus ≤ -1", 
-    #         "3 * x13_plus + -3 * x13_minus + x4_plus + -1 * x4_minus + x2_plus + -1 * x2_minus + -1 * x1_plus + x1_minus + -1 * x5_plus + x5_minus ≤ -1", 
-    #         "x13_plus + -1 * x13_minus + -2 * x10_plus + 2 * x10_minus + x6_plus + -1 * x6_minus + x4_plus + -1 * x4_minus + -1 * x2_plus + x2_minus + -1 * x0_plus + x0_minus ≤ -1",
-    #         "x14_plus + -1 * x14_minus + x13_plus + -1 * x13_minus + -1 * x12_plus + x12_minus + x11_plus + -1 * x11_minus + x8_plus + -1 * x8_minus + -1 * x4_plus + x4_minus + -1 * x1_plus + x1_minus ≥ 0", 
-    #         "x14_plus + -1 * x14_minus + -1 * x13_plus + x13_minus + -1 * x11_plus + x11_minus + x10_plus + -1 * x10_minus + -1 * x4_plus + x4_minus + x3_plus + -1 * x3_minus + -1 * x2_plus + x2_minus ≤ -1",
-    #         "x14_plus + -1 * x14_minus + -1 * x11_plus + x11_minus + x10_plus + -1 * x10_minus + x8_plus + -1 * x8_minus + -1 * x7_plus + x7_minus + -1 * x4_plus + x4_minus + -1 * x3_plus + x3_minus ≤ -1", 
-    #         "2 * x8_plus + -2 * x8_minus + x7_plus + -1 * x7_minus + -1 * x2_plus + x2_minus + 2 * x0_plus + -2 * x0_minus + -1 * x5_plus + x5_minus + x9_plus + -1 * x9_minus ≤ 0", 
-    #         "x12_plus + -1 * x12_minus + -1 * x11_plus + x11_minus + 3 * x7_plus + -3 * x7_minus + x6_plus + -1 * x6_minus + -1 * x3_plus + x3_minus + x2_plus + -1 * x2_minus + -1 * x0_plus + x0_minus ≤ 0", 
-    #         "2 * x13_plus + -2 * x13_minus + -1 * x12_plus + x12_minus + x11_plus + -1 * x11_minus + -1 * x8_plus + x8_minus + -1 * x7_plus + x7_minus + x1_plus + -1 * x1_minus + 2 * x5_plus + -2 * x5_minus ≤ 1", 
-    #         "x14_plus + -1 * x14_minus + x10_plus + -1 * x10_minus + -1 * x6_plus + x6_minus + -1 * x3_plus + x3_minus + x1_plus + -1 * x1_minus + -1 * x0_plus + x0_minus + -1 * x5_plus + x5_minus + -2 * x9_plus + 2 * x9_minus ≥ -1", 
-    #         "x14_plus + -1 * x14_minus + 4 * x13_plus + -4 * x13_minus + x12_plus + -1 * x12_minus + -2 * x11_plus + 2 * x11_minus + -1 * x10_plus + x10_minus + -1 * x8_plus + x8_minus + 2 * x7_plus + -2 * x7_minus + x6_plus + -1 * x6_minus + x4_plus + -1 * x4_minus + -1 * x3_plus + x3_minus + x1_plus + -1 * x1_minus + -1 * x0_plus + x0_minus ≥ -1", 
-    #         "308 * x14_plus + -308 * x14_minus + 1391 * x13_plus + -1391 * x13_minus + 308 * x12_plus + -308 * x12_minus + -669 * x11_plus + 669 * x11_minus + -308 * x10_plus + 308 * x10_minus + -361 * x8_plus + 361 * x8_minus + 616 * x7_plus + -616 * x7_minus + 308 * x6_plus + -308 * x6_minus + 308 * x4_plus + -308 * x4_minus + -308 * x3_plus + 308 * x3_minus + -53 * x2_plus + 53 * x2_minus + 308 * x1_plus + -308 * x1_minus + -308 * x0_plus + 308 * x0_minus ≥ -615"]
-            
-    #         # 20-vars very slow
-    #         # ("x18_plus + -1 * x18_minus + x12_plus + -1 * x12_minus + -1 * x4_plus + x4_minus + -1 * x8_plus + x8_minus + -1 * x5_plus + x5_minus ≥ 0",
-    #         # "x14_plus + -1 * x14_minus + -1 * x13_plus + x13_minus + x12_plus + -1 * x12_minus + 2 * x4_plus + -2 * x4_minus + x2_plus + -1 * x2_minus ≤ 1",
-    #         # "x16_plus + -1 * x16_minus + -1 * x14_plus + x14_minus + x13_plus + -1 * x13_minus + -1 * x6_plus + x6_minus + x0_plus + -1 * x0_minus + x1_plus + -1 * x1_minus ≥ 1",
-    #         # "x19_plus + -1 * x19_minus + -1 * x11_plus + x11_minus + -1 * x15_plus + x15_minus + x10_plus + -1 * x10_minus + -1 * x8_plus + x8_minus + x3_plus + -1 * x3_minus ≤ 0",
-    #         # "x14_plus + -1 * x14_minus + -1 * x13_plus + x13_minus + x12_plus + -1 * x12_minus + -1 * x11_plus + x11_minus + -1 * x4_plus + x4_minus + -1 * x5_plus + x5_minus ≤ 0",
-    #         # "x16_plus + -1 * x16_minus + x14_plus + -1 * x14_minus + -2 * x13_plus + 2 * x13_minus + -1 * x9_plus + x9_minus + -1 * x6_plus + x6_minus + x17_plus + -1 * x17_minus ≥ 1",
-    #         # "x18_plus + -1 * x18_minus + x13_plus + -1 * x13_minus + x9_plus + -1 * x9_minus + -1 * x17_plus + x17_minus + x15_plus + -1 * x15_minus + x5_plus + -1 * x5_minus + -1 * x7_plus + x7_minus ≤ 0",
-    #         # "x18_plus + -1 * x18_minus + x4_plus + -1 * x4_minus + -1 * x2_plus + x2_minus + x0_plus + -1 * x0_minus + x10_plus + -1 * x10_minus + x7_plus + -1 * x7_minus + -1 * x1_plus + x1_minus ≤ -1", 
-    #         # "2 * x19_plus + -2 * x19_minus + x18_plus + -1 * x18_minus + 2 * x16_plus + -2 * x16_minus + -1 * x0_plus + x0_minus + -1 * x3_plus + x3_minus + x1_plus + -1 * x1_minus ≤ 0",
-    #         # "x18_plus + -1 * x18_minus + -1 * x12_plus + x12_minus + -1 * x11_plus + x11_minus + 2 * x4_plus + -2 * x4_minus + -1 * x17_plus + x17_minus + -1 * x15_plus + x15_minus + -1 * x5_plus + x5_minus ≥ 0",
-    #         # "x19_plus + -1 * x19_minus + -1 * x18_plus + x18_minus + x11_plus + -1 * x11_minus + x0_plus + -1 * x0_minus + -1 * x10_plus + x10_minus + -1 * x7_plus + x7_minus + x3_plus + -1 * x3_minus + x1_plus + -1 * x1_minus ≤ 0",
-    #         # "x19_plus + -1 * x19_minus + -1 * x14_plus + x14_minus + x13_plus + -1 * x13_minus + x12_plus + -1 * x12_minus + -1 * x11_plus + x11_minus + -1 * x9_plus + x9_minus + -1 * x3_plus + x3_minus + -1 * x1_plus + x1_minus ≤ 0",
-    #         # "2 * x12_plus + -2 * x12_minus + 2 * x11_plus + -2 * x11_minus + x4_plus + -1 * x4_minus + x2_plus + -1 * x2_minus + -2 * x5_plus + 2 * x5_minus + x3_plus + -1 * x3_minus ≥ 0", 
-    #         # "x19_plus + -1 * x19_minus + x14_plus + -1 * x14_minus + x13_plus + -1 * x13_minus + -1 * x6_plus + x6_minus + -1 * x4_plus + x4_minus + x2_plus + -1 * x2_minus + -1 * x17_plus + x17_minus + -1 * x15_plus + x15_minus + x3_plus + -1 * x3_minus ≥ 0",
-    #         # "2 * x19_plus + -2 * x19_minus + -2 * x18_plus + 2 * x18_minus + x16_plus + -1 * x16_minus + -1 * x13_plus + x13_minus + x0_plus + -1 * x0_minus + 2 * x15_plus + -2 * x15_minus + -1 * x7_plus + x7_minus ≥ 1", 
-    #         # "2 * x16_plus + -2 * x16_minus + -1 * x14_plus + x14_minus + -2 * x9_plus + 2 * x9_minus + -2 * x0_plus + 2 * x0_minus + -1 * x17_plus + x17_minus + -1 * x15_plus + x15_minus + x8_plus + -1 * x8_minus ≤ 0",
-    #         # "x14_plus + -1 * x14_minus + -1 * x13_plus + x13_minus + 3 * x9_plus + -3 * x9_minus + 2 * x6_plus + -2 * x6_minus + x2_plus + -1 * x2_minus + -1 * x0_plus + x0_minus + -2 * x1_plus + 2 * x1_minus ≥ -1", 
-    #         # "x16_plus + -1 * x16_minus + -1 * x14_plus + x14_minus + -1 * x13_plus + x13_minus + x11_plus + -1 * x11_minus + -2 * x6_plus + 2 * x6_minus + x0_plus + -1 * x0_minus + x15_plus + -1 * x15_minus + x10_plus + -1 * x10_minus + -1 * x5_plus + x5_minus ≤ 0", 
-    #         # "x18_plus + -1 * x18_minus + 3 * x16_plus + -3 * x16_minus + x14_plus + -1 * x14_minus + -1 * x11_plus + x11_minus + x9_plus + -1 * x9_minus + x4_plus + -1 * x4_minus + -1 * x15_plus + x15_minus + x10_plus + -1 * x10_minus + x5_plus + -1 * x5_minus ≤ -1", 
-    #         # "x19_plus + -1 * x19_minus + x14_plus + -1 * x14_minus + x13_plus + -1 * x13_minus + -1 * x4_plus + x4_minus + x2_plus + -1 * x2_minus + -1 * x17_plus + x17_minus + x15_plus + -1 * x15_minus + -1 * x10_plus + x10_minus + -1 * x8_plus + x8_minus + -3 * x5_plus + 3 * x5_minus ≤ 0",
-    #         # "x19_plus + -1 * x19_minus + -1 * x18_plus + x18_minus + x16_plus + -1 * x16_minus + x14_plus + -1 * x14_minus + -1 * x13_plus + x13_minus + x12_plus + -1 * x12_minus + -1 * x11_plus + x11_minus + x9_plus + -1 * x9_minus + x6_plus + -1 * x6_minus + x4_plus + -1 * x4_minus + x2_plus + -1 * x2_minus + x0_plus + -1 * x0_minus ≤ 0")
 
-    #     comparsions = [parser.parse_term(c) for c in test_data]
-    #     unsat_pt = simplex.solve_hol_ineqs(comparsions)
-    #     self.assertNotEqual(unsat_pt.rule, "sorry")
-    pass
\ No newline at end of file
+if __name__ == "__main__":
+    unittest.main()
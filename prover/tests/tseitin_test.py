@@ -1,7 +1,7 @@
 import unittest
 
 from kernel.type import BoolType
-from kernel.term import Term, Var, Implies, And, Or
+from kernel.term import Term, Var, Implies, And, Or, Not
 from kernel import report
 from kernel import theory
 from logic import basic
@@ -40,6 +40,27 @@ class TseitinTest(unittest.TestCase):
         cnf = tseitin.convert_cnf(pt.prop)
         self.assertEqual(len(cnf), 16)
 
+    def testPolaritySubterms(self):
+        t = Implies(And(a,b,c),Or(Not(a),And(b,c)))
+        res = {
+            t: {True}, And(a,b,c): {False}, Or(Not(a),And(b,c)): {True},
+            a: {False}, b: {True, False}, c: {True, False}, And(b,c): {True}
+        }
+        self.assertEqual(tseitin.polarity_subterms(t), res)
+
+    def testTseitinPolarity(self):
+        t = Or(Implies(a,And(c,d)),Implies(b,And(c,e)))
+        pt = tseitin.encode(t, polarity=True)
+        self.assertEqual(len(pt.hyps), 11)
+        self.assertEqual(len(pt.prop.strip_conj()), 8)
+
+        rpt = report.ProofReport()
+        self.assertEqual(theory.check_proof(pt.export(), rpt, check_level=1), pt.th)
+        self.assertEqual(len(rpt.gaps), 0)
+
+        cnf = tseitin.convert_cnf(pt.prop)
+        self.assertEqual(len(cnf), 8)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,9 +1,15 @@
 # Author: Bohua Zhan
 
+import os
+import tempfile
+import threading
 import unittest
 
 from kernel.type import TFun
 from kernel.thm import Thm
+from kernel.proofterm import ProofTerm
+from kernel.report import ProofReport
+from kernel import theory
 from data import nat
 from logic import basic
 from logic.tests.logic_test import test_macro
@@ -11,6 +17,7 @@ from syntax import parser
 from logic import context
 from prover import z3wrapper
 from server.tests.method_test import test_method
+from util import solver_cache
 
 
 class Z3WrapperTest(unittest.TestCase):
@@ -111,6 +118,41 @@ class Z3WrapperTest(unittest.TestCase):
             t = parser.parse_term(s)
             self.assertEqual(z3wrapper.solve(t), res)
 
+    def testSolveIncremental(self):
+        if not z3wrapper.z3_loaded:
+            return
+
+        # Consecutive goals share some of their assumptions
+        context.set_context('real', vars={'x': 'int', 'y': 'int', 'a': 'real', 'b': 'real', 'S': 'real set'})
+        test_data = [
+            ("x > 0 --> y > x --> y > 1", True),
+            ("x > 0 --> y > x --> y > 2", False),
+            ("x > 0 --> y > x --> x + y > 2", True),
+            ("x > 0 --> y < x --> y < 1", False),
+            ("x > 0 --> y < x --> y < x + 1", True),
+            ("x > 0 --> y > x --> y > 1", True),
+            ("a Mem S --> (!x. x Mem S --> x > b) --> a > b", True),
+            ("a Mem S --> (!x. x Mem S --> x > b) --> a > b + 1", False),
+            ("a * a < 0 --> b > 0", True),
+            ("x > 0 --> x * x > 0", True),
+        ]
+
+        for s, res in test_data:
+            t = parser.parse_term(s)
+            self.assertEqual(z3wrapper.solve(t), res)
+
+        # Each thread uses its own context
+        ctxs, res = [], []
+        def solve():
+            ctxs.append(z3wrapper.get_context())
+            res.append(z3wrapper.solve(parser.parse_term(test_data[0][0])))
+
+        thread = threading.Thread(target=solve)
+        thread.start()
+        thread.join()
+        self.assertEqual(res, [True])
+        self.assertIsNot(ctxs[0], z3wrapper.get_context())
+
     def testZ3Macro(self):
         if not z3wrapper.z3_loaded:
             return
@@ -136,6 +178,33 @@ class Z3WrapperTest(unittest.TestCase):
             failed=AssertionError
         )
 
+    def testZ3MacroCache(self):
+        if not z3wrapper.z3_loaded:
+            return
+
+        context.set_context('real', vars={'S': 'real set', 'T': 'real set', 'x': 'real', 'y': 'real'})
+        assm = parser.parse_term('S Int T = empty_set')
+        goal = parser.parse_term('(if x Mem S then (1::real) else 0) + (if x Mem T then 1 else 0) = (if x Mem (S Un T) then 1 else 0)')
+        goal2 = parser.parse_term('(if y Mem S then (1::real) else 0) + (if y Mem T then 1 else 0) = (if y Mem (S Un T) then 1 else 0)')
+        prf = ProofTerm('z3', args=goal, prevs=[ProofTerm.assume(assm)]).export()
+        prf2 = ProofTerm('z3', args=goal2, prevs=[ProofTerm.assume(assm)]).export()
+
+        old_cache_file = solver_cache.cache_file
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            solver_cache.cache_file = os.path.join(tmp_dir, 'solver.db')
+            try:
+                # The second check, and the check of the same goal with
+                # variables renamed, are answered by the cache.
+                stats = []
+                for p in [prf, prf2, prf]:
+                    rpt = ProofReport()
+                    self.assertEqual(theory.check_proof(p, rpt), Thm([assm], p.items[-1].th.prop))
+                    stats.append((rpt.cache_hits, rpt.cache_misses))
+                self.assertEqual(stats, [(0, 1), (1, 0), (1, 0)])
+            finally:
+                solver_cache.get_cache().close()
+                solver_cache.cache_file = old_cache_file
+
     def testZ3Method(self):
         if not z3wrapper.z3_loaded:
             return
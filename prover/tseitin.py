@@ -27,8 +27,10 @@ def logic_subterms(t):
 
     return term_ord.sorted_terms(rec(t))
 
-def encode(t):
+def encode(t, *, polarity=False):
     """Given a propositional formula t, compute its Tseitin encoding.
+    If polarity is set, use the polarity-based encoding (see
+    encode_polarity).
 
     The theorem is structured as follows:
 
@@ -43,6 +45,9 @@ def encode(t):
     substitutions of As on F.
 
     """
+    if polarity:
+        return encode_polarity(t)
+
     # Mapping from subterms to newly introduced variables
     subterm_dict = dict()
     for i, subt in enumerate(logic_subterms(t)):
@@ -80,6 +85,152 @@ def encode(t):
     # Normalize the conjuncts
     return encode_pt.on_prop(logic.conj_norm())
 
+def polarity_subterms(t):
+    """Returns a dictionary mapping the subterms of t, other than
+    negations, to the set of polarities at which they occur (True for
+    positive and False for negative). Conjunctions and disjunctions are
+    flattened, so their right arguments that are again conjunctions
+    (resp. disjunctions) are not included.
+
+    """
+    pols = dict()
+
+    def rec(t, pol):
+        if t.is_not():
+            return rec(t.arg, not pol)
+        if t in pols and pol in pols[t]:
+            return
+        pols.setdefault(t, set()).add(pol)
+        if t.is_conj() or t.is_disj():
+            for arg in (t.strip_conj() if t.is_conj() else t.strip_disj()):
+                rec(arg, pol)
+        elif t.is_implies():
+            rec(t.arg1, not pol)
+            rec(t.arg, pol)
+        elif t.is_equals():
+            for arg in (t.arg1, t.arg):
+                rec(arg, True)
+                rec(arg, False)
+
+    rec(t, True)
+    return pols
+
+def encode_clauses(eq_pt, pols):
+    """Given eq_pt of the form l = r, where r is a logical operation
+    between literals, return the list of clauses from the expansion of
+    eq_pt needed for the given polarities of r (l --> r for positive
+    polarity, r --> l for negative polarity).
+
+    """
+    l = eq_pt.lhs
+    if eq_pt.rhs.is_implies():
+        eq_pt = eq_pt.on_rhs(rewr_conv('disj_conv_imp', sym=True))
+    r = eq_pt.rhs
+
+    # Each clause is first proved in the form A1 --> ... --> An --> B
+    imp_pts = []
+    if True in pols:
+        l_pt = eq_pt.equal_elim(ProofTerm.assume(l))
+        if r.is_conj():
+            for _ in range(len(r.strip_conj()) - 1):
+                imp_pts.append(logic.apply_theorem('conjD1', l_pt).implies_intr(l))
+                l_pt = logic.apply_theorem('conjD2', l_pt)
+            imp_pts.append(l_pt.implies_intr(l))
+        elif r.is_disj():
+            imp_pts.append(l_pt.implies_intr(l))
+        else:
+            r1, r2 = r.arg1, r.arg
+            imp_pts.append(l_pt.equal_elim(ProofTerm.assume(r1)).implies_intr(r1).implies_intr(l))
+            imp_pts.append(l_pt.symmetric().equal_elim(ProofTerm.assume(r2)).implies_intr(r2).implies_intr(l))
+
+    if False in pols:
+        if r.is_conj():
+            lits = r.strip_conj()
+            pt = eq_pt.symmetric().equal_elim(logic.conj_thms(*(ProofTerm.assume(lit) for lit in lits)))
+            for lit in reversed(lits):
+                pt = pt.implies_intr(lit)
+            imp_pts.append(pt)
+        elif r.is_disj():
+            for lit in r.strip_disj():
+                pt = ProofTerm('imp_disj', Implies(lit, r)).implies_elim(ProofTerm.assume(lit))
+                imp_pts.append(eq_pt.symmetric().equal_elim(pt).implies_intr(lit))
+        else:
+            r1, r2 = r.arg1, r.arg
+            pt1 = ProofTerm.assume(r2).implies_intr(r1)
+            pt2 = ProofTerm.assume(r1).implies_intr(r2)
+            pt = eq_pt.symmetric().equal_elim(pt1.equal_intr(pt2))
+            imp_pts.append(pt.implies_intr(r2).implies_intr(r1))
+
+            # From ~r1 and ~r2, prove r1 --> r2 and r2 --> r1
+            def imp_from_neg(A, B):
+                pt = logic.apply_theorem('negE', ProofTerm.assume(Not(A)), ProofTerm.assume(A))
+                return logic.apply_theorem('falseE', pt, concl=B).implies_intr(A)
+            pt = eq_pt.symmetric().equal_elim(imp_from_neg(r1, r2).equal_intr(imp_from_neg(r2, r1)))
+            imp_pts.append(pt.implies_intr(Not(r2)).implies_intr(Not(r1)))
+
+    return [pt.on_prop(top_conv(rewr_conv('disj_conv_imp', sym=True)),
+                       top_conv(rewr_conv('double_neg'))) for pt in imp_pts]
+
+def encode_polarity(t):
+    """Polarity-based (Plaisted-Greenbaum) encoding of a propositional
+    formula t.
+
+    The theorem is structured as in encode. Each distinct subterm of t,
+    other than negations, is represented by one new variable, and
+    conjunctions and disjunctions are flattened. Negations are
+    represented by negated literals. For each equation in As, only the
+    clauses for the directions needed by the polarities of the subterm
+    in t are included.
+
+    """
+    pols = polarity_subterms(t)
+
+    # Mapping from subterms to proofs of t = lit, where lit is the
+    # literal representing t.
+    lit_pts = dict()
+    clause_pts = []
+    num_vars = 0
+
+    def flatten_pt(t, is_op):
+        # Proof of t = r, where r replaces the arguments of the operation
+        # by their literals.
+        if is_op(t):
+            return ProofTerm.reflexive(t.fun.fun).combination(lit_pt(t.arg1)) \
+                            .combination(flatten_pt(t.arg, is_op))
+        else:
+            return lit_pt(t)
+
+    def lit_pt(t):
+        nonlocal num_vars
+        if t in lit_pts:
+            return lit_pts[t]
+
+        if t.is_not():
+            pt = ProofTerm.reflexive(t.fun).combination(lit_pt(t.arg))
+            if pt.rhs.arg.is_not():
+                pt = pt.on_rhs(rewr_conv('double_neg'))
+        else:
+            if t.is_conj():
+                pt = flatten_pt(t, lambda t: t.is_conj())
+            elif t.is_disj():
+                pt = flatten_pt(t, lambda t: t.is_disj())
+            elif is_logical(t):
+                pt = ProofTerm.reflexive(t.fun.fun).combination(lit_pt(t.arg1)) \
+                                .combination(lit_pt(t.arg))
+            else:
+                pt = ProofTerm.reflexive(t)
+            num_vars += 1
+            eq_pt = ProofTerm.assume(Eq(Var('x' + str(num_vars), BoolType), pt.rhs))
+            if is_logical(t):
+                clause_pts.extend(encode_clauses(eq_pt, pols[t]))
+            pt = pt.transitive(eq_pt.symmetric())
+
+        lit_pts[t] = pt
+        return pt
+
+    encode_pt = lit_pt(t).equal_elim(ProofTerm.assume(t))
+    return logic.conj_thms(*clause_pts, encode_pt).on_prop(logic.conj_norm())
+
 def convert_cnf(t):
     """Convert a term to CNF form (as a list of lists of literals)."""
     def convert_literal(lit):
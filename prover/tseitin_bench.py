@@ -0,0 +1,45 @@
+"""
+Benchmark for the Tseitin encoding.
+
+Encodes the negation of the propositional problems in
+prover/tests/pelletier.json with the full encoding and with the
+polarity-based encoding. Reports the number of variables and clauses,
+and the time taken by proofrec.solve_cnf (encoding, SAT solving and
+reconstruction of the proof in HOL). Usage:
+
+    python -m prover.tseitin_bench
+
+"""
+
+import json
+import time
+
+from kernel.term import Not
+from logic import context
+from syntax import parser
+from prover import tseitin
+from prover import proofrec
+
+
+def run(name, F):
+    line = '%8s |' % name
+    for polarity in [False, True]:
+        cnf = tseitin.convert_cnf(tseitin.encode(Not(F), polarity=polarity).prop)
+        num_vars = len(set(lit[0] for clause in cnf for lit in clause))
+        start_time = time.perf_counter()
+        pt = proofrec.solve_cnf(F, polarity=polarity)
+        solve_time = time.perf_counter() - start_time
+        assert pt.prop == F and not pt.hyps, "tseitin_bench: wrong theorem"
+        line += ' %4d | %7d | %6.3f |' % (num_vars, len(cnf), solve_time)
+    print(line)
+
+
+if __name__ == "__main__":
+    print('         |           Full            |      Polarity-based')
+    print(' Problem | Vars | Clauses |  Time  | Vars | Clauses |  Time')
+    print('-----------------------------------------------------------------')
+    with open('prover/tests/pelletier.json', 'r', encoding='utf-8') as f:
+        f_data = json.load(f)
+    for problem in f_data:
+        context.set_context('sat', vars=problem['vars'])
+        run(problem['name'], parser.parse_term(problem['prop']))
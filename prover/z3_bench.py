@@ -0,0 +1,70 @@
+"""
+Benchmark for solving small goals with Z3.
+
+Generates 1000 small linear arithmetic goals over integers and reals, in
+groups of 20 goals sharing the same three assumptions, as in checking a
+proof with many calls to z3. Each goal is solved from scratch with a new
+context and solver, and by z3wrapper.solve, which reuses the context and
+solver of the current thread, and the assumptions shared with the
+previous goal. Reports the latency of each goal. Results are compared.
+Usage:
+
+    python -m prover.z3_bench
+
+"""
+
+import random
+import time
+
+import z3
+
+from logic import context
+from syntax import parser
+from kernel.term import Implies
+from prover import z3wrapper
+
+
+def random_goals(num_groups, group_size, seed):
+    """List of goals, each a pair of a list of assumptions and a conclusion."""
+    rand = random.Random(seed)
+
+    def ineq(names):
+        lhs = ' + '.join('%d * %s' % (rand.randint(-3, 3), name) for name in names)
+        return parser.parse_term('%s %s %d' % (lhs, rand.choice(['<=', '>=', '<']), rand.randint(-5, 5)))
+
+    goals = []
+    for _ in range(num_groups):
+        names = rand.choice([['x', 'y', 'z'], ['a', 'b']])
+        assms = [ineq(names) for _ in range(3)]
+        for _ in range(group_size):
+            goals.append((assms, ineq(names)))
+    return goals
+
+def solve_fresh(t):
+    """Solve t with a new context and solver."""
+    s = z3wrapper.solve_core(z3.Solver(ctx=z3.Context()), t)
+    return s.check() == z3.unsat
+
+def run(name, solve, goals):
+    times, res = [], []
+    for assms, concl in goals:
+        start_time = time.perf_counter()
+        res.append(solve(Implies(*(assms + [concl]))))
+        times.append(time.perf_counter() - start_time)
+    times.sort()
+    print('%8s | %6.2f | %6.2f | %6.2f | %6.2f' % (
+        name, 1000 * sum(times) / len(times), 1000 * times[len(times) // 2],
+        1000 * times[len(times) * 95 // 100], sum(times)))
+    return res
+
+
+if __name__ == "__main__":
+    context.set_context('real', vars={'x': 'int', 'y': 'int', 'z': 'int', 'a': 'real', 'b': 'real'})
+    goals = random_goals(50, 20, 0)
+
+    print('  Solver | Mean ms| Med ms | p95 ms | Total s')
+    print('--------------------------------------------')
+    fresh_res = run('fresh', solve_fresh, goals)
+    pooled_res = run('pooled', z3wrapper.solve, goals)
+    assert fresh_res == pooled_res, "z3_bench: results differ"
+    print('Goals: %d (%d solved)' % (len(goals), sum(pooled_res)))
@@ -1,6 +1,8 @@
 # Author: Bohua Zhan
 
 import importlib
+import os
+import threading
 
 if importlib.util.find_spec("z3"):
     import z3
@@ -12,6 +14,13 @@ else:
 # Whether to check using z3.
 check_z3 = True
 
+# Timeout for each goal in milliseconds, or None for no timeout.
+solve_timeout = 60000
+
+# Timeout in milliseconds for solving a goal with the incremental solver
+# (see SolverPool), after which it is solved again with a new solver.
+incremental_timeout = 1000
+
 from kernel.type import TFun, BoolType, NatType, IntType, RealType
 from kernel import term
 from kernel.term import Term, Var, BoolType, Implies, true, false
@@ -20,6 +29,7 @@ from kernel.macro import Macro
 from kernel.theory import register_macro
 from kernel.proofterm import ProofTerm
 from kernel import theory
+from kernel.term_index import TermIndex
 from logic import logic
 from logic import conv
 from data import nat
@@ -28,6 +38,7 @@ from syntax import pprint, settings
 from server.method import Method, register_method
 from prover import fologic
 from util import name
+from util import solver_cache
 
 
 class Z3Exception(Exception):
@@ -38,7 +49,24 @@ class Z3Exception(Exception):
         return self.err
 
 
+def decl_cache(ctx):
+    """Sorts and declarations created for ctx, indexed by type, and by
+    pair of name and type. These are kept only for the context of the
+    solver pool.
+
+    """
+    if _pool is not None and _pool.pid == os.getpid() and ctx is _pool.ctx:
+        return _pool.decls
+    else:
+        return dict()
+
 def convert_type(T, ctx):
+    cache = decl_cache(ctx)
+    if T not in cache:
+        cache[T] = convert_type_core(T, ctx)
+    return cache[T]
+
+def convert_type_core(T, ctx):
     if T.is_tvar():
         return z3.DeclareSort(T.name, ctx)
     if T == NatType or T == IntType:
@@ -65,11 +93,14 @@ def convert_type(T, ctx):
         raise Z3Exception("convert: unsupported type " + repr(T))
 
 def convert_const(name, T, ctx):
-    z3_T = convert_type(T, ctx)
-    if isinstance(z3_T, tuple):
-        return z3.Function(name, *z3_T)
-    else:
-        return z3.Const(name, z3_T)
+    cache = decl_cache(ctx)
+    if (name, T) not in cache:
+        z3_T = convert_type(T, ctx)
+        if isinstance(z3_T, tuple):
+            cache[(name, T)] = z3.Function(name, *z3_T)
+        else:
+            cache[(name, T)] = z3.Const(name, z3_T)
+    return cache[(name, T)]
 
 def convert(t, var_names, assms, to_real, ctx):
     """Convert term t to Z3 input."""
@@ -94,7 +125,7 @@ def convert(t, var_names, assms, to_real, ctx):
         elif t.is_number():
             return t.dest_number()
         elif t.is_implies():
-            return z3.Implies(rec(t.arg1), rec(t.arg))
+            return z3.Implies(rec(t.arg1), rec(t.arg), ctx)
         elif t.is_equals():
             return rec(t.arg1) == rec(t.arg)
         elif t.is_conj():
@@ -189,30 +220,89 @@ norm_thms = [
     'real_closed_interval_def',
 ]
 
-def norm_term(t):
-    # Collect list of theorems that can be used.
-    cvs = []
+# Index of the left sides of norm_thms available in the current theory,
+# and the list of available rules it is built from.
+_norm_index = (None, None)
+
+def norm_rules(t):
+    """List of rewrite rules in norm_thms that apply to some subterm of t,
+    as pairs of theorem name and direction.
+
+    """
+    global _norm_index
+
+    rules = []
     for th_name in norm_thms:
-        if isinstance(th_name, str) and theory.thy.has_theorem(th_name):
-            cvs.append(conv.try_conv(conv.rewr_conv(th_name)))
-        elif theory.thy.has_theorem(th_name[0]):
-            cvs.append(conv.try_conv(conv.rewr_conv(th_name[0], sym=True)))
-    cvs.append(conv.try_conv(conv.beta_conv()))
-    cv = conv.top_conv(conv.every_conv(*cvs))
+        th_name, sym = (th_name, False) if isinstance(th_name, str) else th_name
+        if theory.thy.has_theorem(th_name):
+            rules.append((th_name, sym))
+
+    if _norm_index[0] != rules:
+        index = TermIndex()
+        for th_name, sym in rules:
+            eq = theory.thy.get_theorem(th_name).prop
+            index.insert(eq.rhs if sym else eq.lhs, (th_name, sym))
+        _norm_index = (rules, index)
+
+    cands = _norm_index[1].lookup_subterms(t)
+    return [(th_name, sym) for th_name, sym in rules
+            if (th_name, sym) in cands and conv.has_rewrite(th_name, t, sym=sym)]
+
+def norm_term(t):
+    """Rewrite t with norm_thms and beta-conversion until no rule
+    applies, then simplify. In each round, only the rules that apply to
+    some subterm are used.
+
+    """
     while True:
-        rhs = cv.eval(t).rhs
+        cvs = [conv.try_conv(conv.rewr_conv(th_name, sym=sym)) for th_name, sym in norm_rules(t)]
+        if not t.is_beta_normal():
+            cvs.append(conv.try_conv(conv.beta_conv()))
+        if not cvs:
+            break
+        rhs = conv.top_conv(conv.every_conv(*cvs)).eval(t).rhs
         if rhs == t:
             break
         else:
             t = rhs
     return fologic.simplify(t)
 
-def solve_core(s, t, debug=False):
-    # First strip foralls from t.
+def convert_bool(t, var_names, assms, to_real, ctx):
+    """Convert formula t to Z3 input, as a formula in ctx."""
+    z3_t = convert(t, var_names, assms, to_real, ctx)
+    if isinstance(z3_t, bool):
+        # For example from equality between numbers
+        z3_t = z3.BoolVal(z3_t, ctx)
+    return z3_t
+
+def has_quantifier(t):
+    """Whether t contains a forall or exists quantifier."""
+    if t.is_forall() or t.is_exists():
+        return True
+    elif t.is_comb():
+        return has_quantifier(t.fun) or has_quantifier(t.arg)
+    elif t.is_abs():
+        return has_quantifier(t.body)
+    else:
+        return False
+
+def strip_goal(t):
+    """Normalize the goal t, then strip outer foralls and implications.
+    Returns the list of assumptions and the conclusion.
+
+    """
     t = norm_term(t)
     new_names = logic.get_forall_names(t, svar=False)
     _, As, C = logic.strip_all_implies(t, new_names, svar=False)
+    return As, C
+
+def convert_goal(As, C, ctx, debug=False):
+    """Convert the goal with assumptions As and conclusion C to Z3 input.
+    Returns the list of assumptions and the list of formulas asserting
+    that the conclusion fails. Assumptions and the conclusion that cannot
+    be converted are skipped.
 
+    """
     def print_debug(*args):
         if debug:
             print(*args)
@@ -220,30 +310,139 @@ def solve_core(s, t, debug=False):
     var_names = [v.name for v in term.get_vars(As + [C])]
     assms = dict()
     to_real = dict()
+    z3_As = []
     for A in As:
         try:
-            z3_A = convert(A, var_names, assms, to_real, s.ctx)
+            z3_A = convert_bool(A, var_names, assms, to_real, ctx)
             print_debug('A', z3_A)
-            s.add(z3_A)
+            z3_As.append(z3_A)
         except Z3Exception as e:
             print_debug(e)
+    neg_C = []
     try:
-        z3_C = convert(C, var_names, assms, to_real, s.ctx)
+        z3_C = convert_bool(C, var_names, assms, to_real, ctx)
         print_debug('C', z3_C)
-        s.add(z3.Not(z3_C))
+        neg_C.append(z3.Not(z3_C, ctx))
     except Z3Exception as e:
         print_debug(e)
 
     for nm, A in assms.items():
         print_debug('A', A)
+        neg_C.append(A)
+
+    return z3_As, neg_C
+
+def solve_core(s, t, debug=False):
+    As, C = strip_goal(t)
+    z3_As, neg_C = convert_goal(As, C, s.ctx, debug)
+    for A in z3_As + neg_C:
         s.add(A)
-    
     return s
 
-def solve(t, debug=False):
-    """Solve the given goal using Z3."""
-    s = solve_core(z3.Solver(), t, debug)
-    return str(s.check()) == 'unsat'
+
+class SolverPool(threading.local):
+    """Z3 context and solver reused between goals.
+
+    Each thread has its own pool, as Z3 contexts cannot be shared between
+    threads. A new context is created after a fork.
+
+    The solver keeps the assumptions of the last goal, each asserted in
+    its own scope. A new goal pops the scopes of the assumptions that are
+    not shared with it, so consecutive goals with the same assumptions
+    (for example when checking a proof) reuse the work done on them.
+
+    After the first push, Z3 solves with its incremental solver, which
+    is weaker on quantifiers and nonlinear arithmetic than the solvers
+    used when all formulas are given at once. Moreover, its heuristics
+    for quantifiers depend on earlier terms in the context. Hence goals
+    with quantifiers, and goals not solved by the incremental solver
+    within incremental_timeout, are solved by a new solver in a new
+    context, as without the pool.
+
+    """
+    def __init__(self):
+        self.pid = None
+        self.ctx = None
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.ctx = z3.Context()
+        self.solver = z3.Solver(ctx=self.ctx)
+        self.assms = []
+        self.decls = dict()
+
+    def get_context(self):
+        if self.pid != os.getpid():
+            self.reset()
+        return self.ctx
+
+    def solve_incremental(self, z3_As, neg_C, timeout):
+        s = self.solver
+        try:
+            n = 0
+            while n < min(len(self.assms), len(z3_As)) and self.assms[n].eq(z3_As[n]):
+                n += 1
+            if n < len(self.assms):
+                s.pop(len(self.assms) - n)
+                del self.assms[n:]
+            for A in z3_As[n:]:
+                s.push()
+                s.add(A)
+                self.assms.append(A)
+
+            s.push()
+            s.add(*neg_C)
+            s.set(timeout=timeout)
+            res = s.check()
+            s.pop()
+        except BaseException:
+            # Discard the solver in an unknown state
+            self.reset()
+            raise
+        return res
+
+    def solve(self, t, timeout=None, debug=False):
+        """Solve goal t, with timeout in milliseconds or None for no timeout."""
+        As, C = strip_goal(t)
+        if timeout is None:
+            timeout = 4294967295
+
+        res = z3.unknown
+        if not any(has_quantifier(A) for A in As + [C]):
+            z3_As, neg_C = convert_goal(As, C, self.get_context(), debug)
+            res = self.solve_incremental(z3_As, neg_C, min(timeout, incremental_timeout))
+        if res == z3.unknown:
+            s = z3.Solver(ctx=z3.Context())
+            s.set(timeout=timeout)
+            z3_As, neg_C = convert_goal(As, C, s.ctx, debug)
+            s.add(*(z3_As + neg_C))
+            res = s.check()
+
+        return res == z3.unsat
+
+_pool = SolverPool() if z3_loaded else None
+
+def get_context():
+    """The Z3 context of the current thread."""
+    return _pool.get_context()
+
+def solve(t, debug=False, timeout=None):
+    """Solve the given goal using Z3. Returns False if the goal is not
+    solved in timeout milliseconds (by default solve_timeout).
+
+    """
+    return _pool.solve(t, solve_timeout if timeout is None else timeout, debug)
+
+def cached_solve(assms, goal):
+    """Solve the goal with the given assumptions using Z3, with results
+    stored in the solver cache. Only successes are stored. Note a success
+    found in the cache is trusted (see util/solver_cache).
+
+    """
+    res = solver_cache.cached_call(
+        'z3', z3.get_version_string(), solver_cache.print_terms(assms + [goal]),
+        lambda: 'unsat' if solve(Implies(*(assms + [goal]))) else None)
+    return res == 'unsat'
  
 
 def solve_and_proof(t, debug=False):
@@ -264,7 +463,7 @@ class Z3Macro(Macro):
         if z3_loaded:
             assms = [prev.prop for prev in prevs]
             if check_z3:
-                assert solve(Implies(*(assms + [args]))), "Z3: not solved."
+                assert cached_solve(assms, args), "Z3: not solved."
         else:
             print("Warning: Z3 is not installed")
 
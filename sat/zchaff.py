@@ -192,6 +192,41 @@ class Conflict(ProofTrace):
         return self.s
         
 
+def trim_trace(clause_num, first, second, third):
+    """Find the parts of the proof trace needed to derive the conflict.
+
+    clause_num is the number of clauses in the input, the resolvents in
+    first are numbered starting from clause_num. Returns the set of ids of
+    resolvents and the set of implied variables that are needed.
+
+    """
+    second_by_var = dict((s.var, s) for s in second)
+
+    # Implied variables used in the conflict, and the clauses implying them
+    conflict_cls = third[0]
+    needed_vars = set()
+    needed_cls = {conflict_cls.cls}
+    stack = [floor(l/2) for l in conflict_cls.lits]
+    while stack:
+        var = stack.pop()
+        if var not in needed_vars:
+            needed_vars.add(var)
+            s = second_by_var[var]
+            needed_cls.add(s.act)
+            stack.extend(floor(l/2) for l in s.lits if floor(l/2) != var)
+
+    # Resolvents used to derive the clauses
+    needed_rsl = set()
+    stack = list(needed_cls)
+    while stack:
+        cl_id = stack.pop()
+        if cl_id >= clause_num and cl_id not in needed_rsl:
+            needed_rsl.add(cl_id)
+            stack.extend(first[cl_id - clause_num].rsl)
+
+    return needed_rsl, needed_vars
+
+
 class zChaff:
     """Data structure for cnf term."""
     def __init__(self, t):
@@ -282,19 +317,26 @@ class zChaff:
                     second.append(ImpliedVarValue(l))
                 else:
                     third.append(Conflict(l))
-                
+
+        # Only reconstruct the resolvents and implied values needed
+        needed_rsl, needed_vars = trim_trace(self.clause_num, first, second, third)
+
         for j, f in enumerate(first):
+            if self.clause_num + j not in needed_rsl:
+                continue
             res_cls = f.rsl
             pt = self.clause_pt[res_cls[0]]
             for i in range(len(res_cls)-1):
                 pt = resolution(pt, self.clause_pt[res_cls[i+1]])
-            self.clause_pt[len(self.clause_pt)] = pt
+            self.clause_pt[self.clause_num + j] = pt
 
         second = sorted(second, key=lambda x: x.level)
         
         # dictionary from var index to its true value
         var_pt = {}
         for s in second:
+            if s.var not in needed_vars:
+                continue
             cls_pt = self.clause_pt[s.act]
             pts = []
             lits = [floor(l/2) for l in s.lits if floor(l/2) != s.var]
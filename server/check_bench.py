@@ -0,0 +1,69 @@
+# Author: Bohua Zhan
+
+"""Benchmark for incremental proof checking.
+
+Replays the saved steps of a theorem in the library, and after each step
+measures the time of a full check of the current proof, with and without
+incremental checking. With incremental checking, the time per edit
+should not grow with the length of the proof. Usage:
+
+    python -m server.check_bench [theory_name thm_name]
+
+"""
+
+import time
+
+from kernel import theory
+from kernel import report
+from logic import basic
+from logic import context
+from server import server
+from prover import z3wrapper
+
+
+def count_items(prf):
+    """Number of items in the proof, including subproofs."""
+    return sum(1 + (count_items(item.subproof) if item.subproof else 0) for item in prf.items)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) == 3:
+        filename, thm_name = sys.argv[1:]
+    else:
+        filename, thm_name = 'realderivative', 'lhospital_lemma'
+
+    basic.load_metadata()
+    z3wrapper.check_z3 = False
+
+    item = None
+    for cur_item in basic.load_theory_cache(filename)['content']:
+        if cur_item.ty == 'thm' and cur_item.name == thm_name:
+            item = cur_item
+    assert item is not None and item.steps, "check_bench: theorem with steps not found"
+
+    context.set_context(filename, limit=('thm', thm_name), vars=item.vars)
+    state = server.parse_init_state(item.prop)
+
+    print(' Step | Items |  Full  | Incremental')
+    print('-------------------------------------')
+    total_full, total_incr = 0.0, 0.0
+    for i, step in enumerate(item.steps):
+        history = state.parse_steps([step])
+        assert 'error' not in history[-1], "check_bench: step %d failed" % i
+
+        start_time = time.perf_counter()
+        theory.check_proof(state.prf, report.ProofReport())
+        full_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        state.check_proof()
+        incr_time = time.perf_counter() - start_time
+
+        total_full += full_time
+        total_incr += incr_time
+        if i % 10 == 0 or i == len(item.steps) - 1:
+            print('%5d | %5d | %6.3f | %6.3f' % (i, count_items(state.prf), full_time, incr_time))
+
+    print('Total: %.2f s (full), %.2f s (incremental)' % (total_full, total_incr))
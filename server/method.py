@@ -207,11 +207,10 @@ class rewrite_goal(Method):
                 sym = data['sym']
             search_thm(data['theorem'], sym)
         else:
-            for th_name in theory.thy.get_data("theorems"):
-                if 'hint_rewrite' in theory.thy.get_attributes(th_name):
-                    search_thm(th_name, 'false')
-                if 'hint_rewrite_sym' in theory.thy.get_attributes(th_name):
-                    search_thm(th_name, 'true')
+            # Only try theorems whose left side may match a subterm of the goal
+            rewrite_index = theory.thy.get_data("rewrite_index")
+            for th_name, sym_b in sorted(rewrite_index.lookup_subterms(cur_item.th.prop)):
+                search_thm(th_name, 'true' if sym_b else 'false')
 
         return sorted(results, key=lambda d: d['theorem'])
 
@@ -253,12 +252,11 @@ class rewrite_fact(Method):
 
         if data:
             search_thm(data['theorem'], data['sym'])
-        else:
-            for th_name in theory.thy.get_data("theorems"):
-                if 'hint_rewrite' in theory.thy.get_attributes(th_name):
-                    search_thm(th_name, 'false')
-                if 'hint_rewrite_sym' in theory.thy.get_attributes(th_name):
-                    search_thm(th_name, 'true')
+        elif prevs:
+            # Only try theorems whose left side may match a subterm of the fact
+            rewrite_index = theory.thy.get_data("rewrite_index")
+            for th_name, sym_b in sorted(rewrite_index.lookup_subterms(prevs[0].prop)):
+                search_thm(th_name, 'true' if sym_b else 'false')
 
         return sorted(results, key=lambda d: d['theorem'])
 
@@ -350,10 +348,11 @@ class apply_forward_step(Method):
 
         if data:
             search_thm(data['theorem'], min_prevs=0)
-        else:
-            for th_name in theory.thy.get_data("theorems"):
-                if 'hint_forward' in theory.thy.get_attributes(th_name):
-                    search_thm(th_name, min_prevs=1)
+        elif prevs:
+            # Only try theorems whose first assumption may match the first fact
+            forward_index = theory.thy.get_data("forward_index")
+            for th_name in sorted(forward_index.lookup(prev_ths[0].prop)):
+                search_thm(th_name, min_prevs=1)
 
         return sorted(results, key=lambda d: d['theorem'])
 
@@ -421,10 +420,14 @@ class apply_backward_step(Method):
         if data:
             search_thm(data['theorem'])
         else:
-            for th_name in theory.thy.get_data("theorems"):
-                if 'hint_backward' in theory.thy.get_attributes(th_name) or \
-                   ('hint_backward1' in theory.thy.get_attributes(th_name) and len(prevs) >= 1):
-                    search_thm(th_name)
+            # Only try theorems whose conclusion may match the goal
+            backward_index = theory.thy.get_data("backward_index")
+            th_names = set()
+            for th_name, attribute in backward_index.lookup(cur_item.th.prop):
+                if attribute == 'hint_backward' or len(prevs) >= 1:
+                    th_names.add(th_name)
+            for th_name in sorted(th_names):
+                search_thm(th_name)
 
         return sorted(results, key=lambda d: d['theorem'])
 
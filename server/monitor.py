@@ -1,11 +1,20 @@
 # Author: Bohua Zhan
 
-"""Facility for checking theory files."""
+"""Facility for checking theory files. Usage:
+
+    python -m server.monitor [-p] [-n] [-j num_workers] [theory_name ...]
+
+With -j, the items of each theory file are checked by num_workers
+processes in parallel. With -n, the solver cache is not used, so all
+solver calls made by macros are checked by the solvers.
+
+"""
 
 import traceback2
 import json
 import copy
 import time
+import multiprocessing
 from pstats import Stats
 import cProfile
 
@@ -18,6 +27,7 @@ from logic import logic
 from server import items
 from syntax import parser
 from prover import z3wrapper
+from util import solver_cache
 from syntax.settings import settings, global_setting
 
 
@@ -75,8 +85,123 @@ def check_proof(item, *, rewrite):
             'status': 'NoSteps'
         }
 
-def check_theory(filename, username='master', rewrite=False):
-    """Check the theory with the given name."""
+def check_item(item, rewrite=False):
+    """Check a single parsed item against the current theory, then
+    extend the current theory by the item. Returns the result of the check.
+
+    """
+    if item.error:
+        e = item.error
+        return {
+            'ty': item.ty,
+            'name': item.name,
+            'status': 'ParseFail',
+            'err_type': e.__class__.__name__,
+            'err_str': str(e),
+            'trace': item.trace
+        }
+
+    exts = item.get_extension()
+    old_thy = copy.copy(theory.thy)
+    theory.thy.unchecked_extend(exts)
+    new_thy = theory.thy
+
+    # Check consistency with edit_item
+    with global_setting(unicode=True, highlight=False):
+        edit_item = item.get_display()
+    theory.thy = old_thy
+    item2 = items.parse_edit(edit_item)
+    if item.ty == 'thm':
+        item2.proof = item.proof
+        item2.steps = item.steps
+        item2.num_gaps = item.num_gaps
+    if item2.error or item != item2:
+        item_res = {
+            'ty': item.ty,
+            'name': item.name,
+            'status': 'EditFail'
+        }
+    elif item.ty == 'thm':
+        item_res = check_proof(item, rewrite=rewrite)
+        item_res['ty'] = 'thm'
+        item_res['name'] = item.name
+    else:
+        item_res = {
+            'ty': item.ty,
+            'name': item.name,
+            'status': 'ParseOK'
+        }
+    theory.thy = new_thy
+    return item_res
+
+
+"""State shared with the worker processes of check_theory, set before the
+workers are forked: the list of raw items, the list of slices (pairs of
+start and end index), the theory at the start of each slice, and whether
+to rewrite the items.
+
+"""
+_slice_state = None
+
+def check_slice(i):
+    """Check the i'th slice of items in a worker process. Returns the list
+    of results, paired with the exported item if rewriting.
+
+    """
+    raw_items, slices, snapshots, rewrite = _slice_state
+    start, end = slices[i]
+    theory.thy = snapshots[i]
+    res = []
+    for raw_item in raw_items[start:end]:
+        item = items.parse_item(raw_item)
+        item_res = check_item(item, rewrite=rewrite)
+        res.append((item_res, item.export_json() if rewrite else None))
+    return res
+
+def check_items_parallel(raw_items, rewrite, num_workers):
+    """Check the given items using num_workers processes. Returns the
+    list of results, paired with the exported item if rewriting.
+
+    The items are divided into contiguous slices, which are checked by
+    the workers against their own copy of the theory. The theory at the
+    start of each slice is obtained in the current process by parsing
+    the items and extending the theory, without checking proofs.
+
+    """
+    global _slice_state
+
+    # Use several slices per worker, as the time to check an item varies
+    # widely between items.
+    num_items = len(raw_items)
+    num_slices = min(num_items, 4 * num_workers)
+    bounds = [num_items * i // num_slices for i in range(num_slices + 1)]
+    slices = list(zip(bounds[:-1], bounds[1:]))
+
+    snapshots = []
+    for start, end in slices:
+        snapshots.append(copy.copy(theory.thy))
+        for raw_item in raw_items[start:end]:
+            item = items.parse_item(raw_item)
+            if not item.error:
+                theory.thy.unchecked_extend(item.get_extension())
+
+    _slice_state = (raw_items, slices, snapshots, rewrite)
+    try:
+        with multiprocessing.get_context('fork').Pool(num_workers) as pool:
+            slice_res = pool.map(check_slice, range(num_slices))
+    finally:
+        _slice_state = None
+
+    return sum(slice_res, [])
+
+def check_theory(filename, username='master', rewrite=False, num_workers=1):
+    """Check the theory with the given name.
+
+    If num_workers is greater than one, the items are checked in parallel
+    by that many worker processes. The result is the same as checking
+    in a single process.
+
+    """
     start_time = time.perf_counter()
 
     data = basic.load_json_data(filename, username)
@@ -88,56 +213,21 @@ def check_theory(filename, username='master', rewrite=False):
 
     content = []
 
-    for raw_item in data['content']:
-        item = items.parse_item(raw_item)
-        if item.error:
-            e = item.error
-            item_res = {
-                'ty': item.ty,
-                'name': item.name,
-                'status': 'ParseFail',
-                'err_type': e.__class__.__name__,
-                'err_str': str(e),
-                'trace': item.trace
-            }
-        else:
-            exts = item.get_extension()
-            old_thy = copy.copy(theory.thy)
-            theory.thy.unchecked_extend(exts)
-            new_thy = theory.thy
-
-            # Check consistency with edit_item
-            with global_setting(unicode=True, highlight=False):
-                edit_item = item.get_display()
-            theory.thy = old_thy
-            item2 = items.parse_edit(edit_item)
-            if item.ty == 'thm':
-                item2.proof = item.proof
-                item2.steps = item.steps
-                item2.num_gaps = item.num_gaps
-            if item2.error or item != item2:
-                item_res = {
-                    'ty': item.ty,
-                    'name': item.name,
-                    'status': 'EditFail'
-                }
-            elif item.ty == 'thm':
-                item_res = check_proof(item, rewrite=rewrite)
-                item_res['ty'] = 'thm'
-                item_res['name'] = item.name
-            else:
-                item_res = {
-                    'ty': item.ty,
-                    'name': item.name,
-                    'status': 'ParseOK'
-                }
-            theory.thy = new_thy
+    if num_workers > 1 and data['content']:
+        all_res = check_items_parallel(data['content'], rewrite, num_workers)
+    else:
+        all_res = []
+        for raw_item in data['content']:
+            item = items.parse_item(raw_item)
+            item_res = check_item(item, rewrite=rewrite)
+            all_res.append((item_res, item.export_json() if rewrite else None))
 
+    for item_res, item_json in all_res:
         stat[item_res['status']] += 1
         res.append(item_res)
 
         if rewrite:
-            content.append(item.export_json())
+            content.append(item_json)
 
     if rewrite:
         data['content'] = content
@@ -155,7 +245,7 @@ def check_theory(filename, username='master', rewrite=False):
 if __name__ == "__main__":
     import sys, getopt
 
-    opts, args = getopt.getopt(sys.argv[1:], 'p')
+    opts, args = getopt.getopt(sys.argv[1:], 'pnj:')
 
     basic.load_metadata()
     z3wrapper.check_z3 = False
@@ -172,9 +262,14 @@ if __name__ == "__main__":
         files = args
 
     profile = False
+    num_workers = 1
     for opt, arg in opts:
         if opt == '-p':
             profile = True
+        elif opt == '-n':
+            solver_cache.use_solver_cache = False
+        elif opt == '-j':
+            num_workers = int(arg)
 
     if profile:
         pr = cProfile.Profile()
@@ -192,7 +287,7 @@ if __name__ == "__main__":
         'ProofOK': 0, 'ProofFail': 0, 'ParseOK': 0, 'ParseFail': 0, 'EditFail': 0, 'exec_time': 0.0
     }
     for filename in files:
-        res = check_theory(filename)
+        res = check_theory(filename, num_workers=num_workers)
         print(print_stat(filename, res['stat']))
         for s in total_stat.keys():
             total_stat[s] += res['stat'][s]
@@ -0,0 +1,124 @@
+# Author: Bohua Zhan
+
+"""Benchmark for searching theorems to apply.
+
+Replays the saved steps of a theorem in the library, and before each step
+runs the search of the methods using theorems with hint attributes
+(rewrite_goal, rewrite_fact, apply_forward_step and apply_backward_step)
+on the goal and facts of the step. Reports the number of theorems tried
+and the time taken, when candidates are obtained from the indices in the
+theory (see Theory.index_attribute), and when every theorem with the
+attribute is tried. Usage:
+
+    python -m server.search_bench [theory_name thm_name]
+
+"""
+
+import time
+
+from kernel import theory
+from kernel.proof import ItemID
+from logic import basic
+from logic import context
+from server import server
+from server import method
+from prover import z3wrapper
+
+
+class FullIndex():
+    """Stand-in for an index in the theory, returning all values."""
+    def __init__(self, values):
+        self.values = set(values)
+
+    def lookup(self, t):
+        return self.values
+
+    def lookup_subterms(self, t):
+        return self.values
+
+
+def full_indices(thy):
+    """Stand-ins for the indices in thy, trying every theorem with
+    the attribute.
+
+    """
+    values = {"rewrite_index": [], "backward_index": [], "forward_index": []}
+    for th_name in thy.get_data("theorems"):
+        for attribute in thy.get_attributes(th_name):
+            if attribute in ('hint_rewrite', 'hint_rewrite_sym'):
+                values["rewrite_index"].append((th_name, attribute == 'hint_rewrite_sym'))
+            elif attribute in ('hint_backward', 'hint_backward1'):
+                values["backward_index"].append((th_name, attribute))
+            elif attribute == 'hint_forward':
+                values["forward_index"].append(th_name)
+    return {name: FullIndex(vals) for name, vals in values.items()}
+
+def run_search(state, step, indices):
+    """Run the searches before step using the given indices. Return the
+    number of candidates, the results and the time taken.
+
+    """
+    goal_id = ItemID(step['goal_id'])
+    prevs = [ItemID(prev) for prev in step.get('fact_ids', [])]
+    goal = state.get_proof_item(goal_id).th.prop
+    num_cands = len(indices["rewrite_index"].lookup_subterms(goal)) + \
+                len(indices["backward_index"].lookup(goal))
+    if prevs:
+        fact = state.get_proof_item(prevs[0]).th.prop
+        num_cands += len(indices["rewrite_index"].lookup_subterms(fact)) + \
+                     len(indices["forward_index"].lookup(fact))
+
+    saved_indices = {name: theory.thy.data[name] for name in indices}
+    theory.thy.data.update(indices)
+    try:
+        start_time = time.perf_counter()
+        results = []
+        for cur_method in [method.rewrite_goal(), method.rewrite_fact(),
+                           method.apply_forward_step(), method.apply_backward_step()]:
+            results.append(cur_method.search(state, goal_id, prevs))
+        search_time = time.perf_counter() - start_time
+    finally:
+        theory.thy.data.update(saved_indices)
+
+    return num_cands, results, search_time
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) == 3:
+        filename, thm_name = sys.argv[1:]
+    else:
+        filename, thm_name = 'realderivative', 'lhospital_lemma'
+
+    basic.load_metadata()
+    z3wrapper.check_z3 = False
+
+    item = None
+    for cur_item in basic.load_theory_cache(filename)['content']:
+        if cur_item.ty == 'thm' and cur_item.name == thm_name:
+            item = cur_item
+    assert item is not None and item.steps, "search_bench: theorem with steps not found"
+
+    context.set_context(filename, limit=('thm', thm_name), vars=item.vars)
+    state = server.parse_init_state(item.prop)
+    indices = {name: theory.thy.get_data(name) for name in ["rewrite_index", "backward_index", "forward_index"]}
+    full = full_indices(theory.thy)
+
+    print(' Step | Candidates (full) | Candidates (index) |  Full  | Index')
+    print('----------------------------------------------------------------')
+    total_full, total_index = 0.0, 0.0
+    for i, step in enumerate(item.steps):
+        full_cands, full_res, full_time = run_search(state, step, full)
+        index_cands, index_res, index_time = run_search(state, step, indices)
+        assert full_res == index_res, "search_bench: results differ at step %d" % i
+
+        total_full += full_time
+        total_index += index_time
+        if i % 10 == 0 or i == len(item.steps) - 1:
+            print('%5d | %17d | %18d | %6.3f | %6.3f' % (i, full_cands, index_cands, full_time, index_time))
+
+        history = state.parse_steps([step])
+        assert 'error' not in history[-1], "search_bench: step %d failed" % i
+
+    print('Total: %.2f s (full), %.2f s (index)' % (total_full, total_index))
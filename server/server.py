@@ -81,9 +81,15 @@ class ProofState():
         return res
 
     def check_proof(self, *, no_gaps=False, compute_only=False):
-        """Check the given proof. Report is stored in rpt."""
+        """Check the given proof. Report is stored in rpt.
+
+        The proof is checked incrementally: after an edit, only the items
+        whose inputs changed are checked again.
+
+        """
         self.rpt = report.ProofReport()
-        return theory.check_proof(self.prf, rpt=self.rpt, no_gaps=no_gaps, compute_only=compute_only)
+        return theory.check_proof(self.prf, rpt=self.rpt, no_gaps=no_gaps, compute_only=compute_only,
+                                  incremental=True)
 
     def add_line_before(self, id, n):
         """Add n lines before the given id."""
@@ -0,0 +1,69 @@
+"""
+Benchmark for the solver cache.
+
+Checks theories in the library with calls to z3 enabled, three times:
+without the solver cache, with an empty cache, and again with the cache
+filled by the previous check. Reports the time taken and the number of
+solver queries answered by the cache (hits) and passed to the solver
+(misses). The results of the checks are compared. On the last check,
+there should be no misses. Each check is run in a new process, so it
+does not depend on the state of z3 left by earlier checks. Usage:
+
+    python -m server.solver_cache_bench [theory_name ...]
+
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+
+from logic import basic
+from server import monitor
+from prover import z3wrapper
+from util import solver_cache
+
+
+def check(filename, use_cache, cache_file):
+    """Check the theory, returns the result, the time taken and the
+    number of hits and misses.
+
+    """
+    basic.load_metadata()
+    z3wrapper.check_z3 = True
+    solver_cache.use_solver_cache = use_cache
+    solver_cache.cache_file = cache_file
+
+    start_time = time.perf_counter()
+    res = monitor.check_theory(filename)
+    check_time = time.perf_counter() - start_time
+    del res['stat']['exec_time']
+    return res, check_time, solver_cache.hits, solver_cache.misses
+
+def run(filename, cache_file):
+    line = '%16s |' % filename
+    results = []
+    for use_cache in [False, True, True]:
+        with multiprocessing.get_context('spawn').Pool(1) as pool:
+            res, check_time, hits, misses = pool.apply(check, (filename, use_cache, cache_file))
+        results.append(res)
+        if use_cache:
+            line += ' %7.2f | %5d | %5d |' % (check_time, hits, misses)
+        else:
+            line += ' %7.2f |' % check_time
+    assert results[0] == results[1] == results[2], "solver_cache_bench: results differ"
+    print(line)
+
+
+if __name__ == "__main__":
+    import sys
+
+    filenames = sys.argv[1:] or ['logic', 'set', 'nat', 'real']
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_file = os.path.join(tmp_dir, 'solver.db')
+        print('                 | No cache |       Empty cache       |       Filled cache')
+        print('          Theory |   Time   |  Time   | Hits  | Miss  |  Time   | Hits  | Miss')
+        print('-------------------------------------------------------------------------------')
+        for filename in filenames:
+            run(filename, cache_file)
@@ -373,6 +373,23 @@ class MethodTest(unittest.TestCase):
             res=['double_neg', 'eq_sym_eq', 'image_combine', 'image_def', 'set_equal_iff']
         )
 
+    def testRewriteGoalThmsPartial(self):
+        # Left sides matching a function applied to some of its arguments
+        self.run_search_thm(
+            'set',
+            vars={'f': "nat => nat", 'g': "nat => nat", 'x': "nat"},
+            concl='(f O g) x = f (g x)',
+            method_name='rewrite_goal',
+            res=['comp_fun_def', 'comp_fun_eval', 'double_neg', 'eq_sym_eq']
+        )
+        self.run_search_thm(
+            'set',
+            vars={'x': "nat"},
+            concl='id_fun x = x',
+            method_name='rewrite_goal',
+            res=['double_neg', 'eq_sym_eq', 'id_fun_def']
+        )
+
     def testRewriteGoal(self):
         test_method(self,
             'logic_base',
@@ -0,0 +1,21 @@
+# Author: Bohua Zhan
+
+import unittest
+
+from logic import basic
+from server import monitor
+
+
+class MonitorTest(unittest.TestCase):
+    def testCheckTheoryParallel(self):
+        basic.load_metadata()
+        res = monitor.check_theory('logic')
+        res2 = monitor.check_theory('logic', num_workers=3)
+        del res['stat']['exec_time']
+        del res2['stat']['exec_time']
+        self.assertEqual(res, res2)
+        self.assertGreater(res['stat']['OK'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,9 +3,12 @@ VeriT Interface.
 """
 
 import z3
+import os
+import shutil
 import subprocess
 from prover import z3wrapper
 from smt.veriT import parser, proof
+from util import solver_cache
 from sys import platform
 import time
 
@@ -17,30 +20,96 @@ class SATException(Exception):
     def __str__(self):
         return self.msg
 
+def solver_version():
+    """Identify the installed veriT by the path, size and modification
+    time of its executable, without running it.
+
+    """
+    path = shutil.which("veriT")
+    if path is None:
+        return None
+    st = os.stat(path)
+    return "%s:%d:%d" % (path, st.st_size, st.st_mtime_ns)
+
+def is_unsat(output):
+    """Whether the output of veriT reports unsat, after an optional
+    line "unsupported".
+
+    """
+    lines = output.split("\n") if output else []
+    if lines and lines[0] == "unsupported":
+        lines = lines[1:]
+    return bool(lines) and lines[0] == "unsat"
+
 def solve(f):
-    """Use veriT solver to solve a smt2 file"""
-    args = "--proof-prune "\
-            "--proof-with-sharing "\
-            "--proof-merge "\
-            "--disable-print-success "\
-            "--disable-banner "\
-            "--proof-version=2 "\
-            "--proof=-"
+    """Use veriT solver to solve a smt2 file. Outputs reporting unsat are
+    stored in the solver cache, keyed by the content of the file. Other
+    outputs (sat, unknown or errors) are not stored, so the solver is run
+    again next time.
+
+    """
+    version = solver_version()
+    if version is None:
+        output = run_solver(f)
+    else:
+        with open(f, encoding="utf-8") as file:
+            query = file.read()
+        outputs = []
+        def compute():
+            outputs.append(run_solver(f))
+            return outputs[0] if is_unsat(outputs[0]) else None
+        output = solver_cache.cached_call("veriT", version, query, compute)
+        if output is None and outputs:
+            output = outputs[0]
+    output = output or ""
+    print(output)
+    return output
 
+solver_args = "--proof-prune "\
+              "--proof-with-sharing "\
+              "--proof-merge "\
+              "--disable-print-success "\
+              "--disable-banner "\
+              "--proof-version=2 "\
+              "--proof=-"
+
+def start_solver(f, stderr=subprocess.PIPE):
+    """Start veriT on a smt2 file, with the output sent to a pipe."""
     if platform == "win32":
-        p = subprocess.Popen("veriT %s %s" % (args, f), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return subprocess.Popen("veriT %s %s" % (solver_args, f), stdout=subprocess.PIPE, stderr=stderr)
     else:
-        p = subprocess.Popen("veriT %s %s" % (args, f), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                            shell=True)
+        return subprocess.Popen("veriT %s %s" % (solver_args, f), stdout=subprocess.PIPE, stderr=stderr,
+                                shell=True)
+
+def run_solver(f):
+    """Run veriT on a smt2 file and return its output, or None if it
+    failed without output.
 
+    """
+    p = start_solver(f)
     output, err = p.communicate()
-    print(output.decode("utf-8"))
+    if p.returncode != 0 and not output:
+        return None
     return output.decode("utf-8")
-    
+
+def run_solver_stream(f):
+    """Run veriT on a smt2 file, yielding the lines of its output as they
+    are produced. The solver is stopped if the generator is closed early.
+
+    """
+    p = start_solver(f, stderr=subprocess.DEVNULL)
+    try:
+        for line in p.stdout:
+            yield line.decode("utf-8").rstrip("\r\n")
+    finally:
+        p.stdout.close()
+        if p.poll() is None:
+            p.kill()
+        p.wait()
 
 def solve_and_proof(tm):
     """Use veriT to determine whether a logical term is satisfiable."""
-    s = z3wrapper.solve_core(z3.Solver(ctx=z3.Context()) ,tm, False)
+    s = z3wrapper.solve_core(z3.Solver(ctx=z3wrapper.get_context()), tm, False)
     with open("proof.smt2", "a") as f:
         f.seek(0)
         f.truncate()
@@ -48,8 +117,20 @@ def solve_and_proof(tm):
 
     proof_rec("proof.smt2")
 
-def proof_rec(file_name):
-    """Given a smt2 file, get the proof and reconstruct it."""
+def proof_rec(file_name, stream=False):
+    """Given a smt2 file, get the proof and reconstruct it.
+
+    If stream is true, the output of veriT is not kept in memory (nor in
+    the solver cache): it is written to a temporary file as it is produced,
+    and the steps are parsed from the file during reconstruction, with the
+    proof of each step released after its last use (see parser.StepStream).
+    Reconstruction only starts after the solver has finished, so this
+    reduces the memory used for long proofs, not the time to the first step.
+
+    """
+    if stream:
+        return proof_rec_stream(file_name)
+
     res = solve(file_name).split("\n")
     if res[0] in ("sat", "unsat", "unknown"):
         status, proof_steps = res[0], res[1:-1]
@@ -69,4 +150,33 @@ def proof_rec(file_name):
     hol_proof = rct.main()
     time2 = time.perf_counter()
     print("total time: ", time2 - time1)
-    return hol_proof
\ No newline at end of file
+    return hol_proof
+
+def proof_rec_stream(file_name, progress=1000):
+    """Reconstruct the proof of a smt2 file, buffering the output of veriT
+    to disk (see proof_rec). Progress is printed every progress steps.
+
+    """
+    lines = run_solver_stream(file_name)
+    status = next(lines, "")
+    if status == "unsupported":
+        status = next(lines, "")
+    if status not in ("sat", "unsat", "unknown"):
+        lines.close()
+        raise NotImplementedError
+    if status in ("sat", "unknown"):
+        lines.close()
+        print(status)
+        return
+
+    ctx = parser.bind_var(file_name)
+    steps = parser.StepStream(lines, ctx)
+    try:
+        rct = proof.ProofReconstruction(steps, refs=steps.refs, progress=progress)
+        time1 = time.perf_counter()
+        hol_proof = rct.main()
+        time2 = time.perf_counter()
+    finally:
+        steps.close()
+    print("total time: ", time2 - time1)
+    return hol_proof
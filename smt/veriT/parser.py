@@ -12,6 +12,8 @@ from logic import context
 from syntax import parser as hol_parser
 from fractions import Fraction
 import numbers
+import re
+import tempfile
 
 grammar = r"""
     ?type: "(declare-sort" NAME INT ")" -> sort_type
@@ -128,9 +130,6 @@ class TermTransformer(Transformer):
         # names mapping a sequence number to a term
         self.names = dict()
 
-        # clauses mapping a sequence number to a proof term
-        self.clauses = dict()
-
         # ite_num mapping a number to an ite term
         self.ites = dict()
 
@@ -258,7 +257,6 @@ class TermTransformer(Transformer):
         return name
 
     def step_proof1(self, num, proof_name, assms, concl):
-        self.clauses[int(num.value)] = concl
         return Rule(int(num), str(proof_name), concl, assms=assms)
 
     def step_proof2(self, num, proof_name, args, concl):
@@ -268,7 +266,6 @@ class TermTransformer(Transformer):
         return Rule(int(num), str(proof_name), concl)
 
     def input_proof(self, num, concl):
-        self.clauses[num] = concl
         return Rule(int(num), "input", concl)
 
 type_parser = Lark(grammar, start="type", parser="lalr", transformer=TypeTransformer())
@@ -282,4 +279,67 @@ def parse_step(s, ctx):
         return term_parser(ctx).parse(s)
     except (exceptions.UnexpectedCharacters, exceptions.UnexpectedToken) as e:
         print("When parsing:", s)
-        raise e
\ No newline at end of file
+        raise e
+
+clauses_pattern = re.compile(r":clauses \(([^)]*)\)")
+clause_name_pattern = re.compile(r"\.c(\d+)")
+name_pattern = re.compile(r"#(\d+)")
+
+class StepStream(object):
+    """The proof steps in lines of veriT output, parsed one at a time.
+
+    The lines are first read once and written to a temporary file. This
+    pass only records, for each step, the number of steps using it (refs),
+    and for each name #n, the last line where it occurs. Iterating over
+    the stream then parses the lines from the file, removing each name
+    from the table of the parser after its last occurrence, so the table
+    only holds the names still to be used.
+
+    Since the number of uses of a step is only known at the end, the first
+    pass reads all of lines before the first step is returned.
+
+    """
+    def __init__(self, lines, ctx):
+        self.ctx = ctx
+
+        # map seq number to the number of steps using it
+        self.refs = dict()
+
+        # map line number to the names last occurring in that line
+        self.expire = dict()
+
+        self.num_steps = 0
+        self.file = tempfile.TemporaryFile("w+", encoding="utf-8")
+
+        last_line = dict()
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            clauses = clauses_pattern.search(line)
+            if clauses:
+                for num in clause_name_pattern.findall(clauses.group(1)):
+                    self.refs[int(num)] = self.refs.get(int(num), 0) + 1
+            for name in name_pattern.findall(line):
+                last_line[name] = self.num_steps
+            self.file.write(line + "\n")
+            self.num_steps += 1
+
+        for name, k in last_line.items():
+            self.expire.setdefault(k, []).append(name)
+
+    def __len__(self):
+        return self.num_steps
+
+    def __iter__(self):
+        transformer = TermTransformer(self.ctx)
+        proof_parser = Lark(grammar, start="proof", parser="lalr", transformer=transformer)
+        self.file.seek(0)
+        for k, line in enumerate(self.file):
+            step = proof_parser.parse(line)
+            for name in self.expire.get(k, []):
+                transformer.names.pop(name, None)
+            yield step
+
+    def close(self):
+        self.file.close()
@@ -49,23 +49,54 @@ class Rule(object):
 
 
 class ProofReconstruction(object):
-    def __init__(self, steps):
-        # A list of proof steps.
+    def __init__(self, steps, refs=None, progress=1):
+        # A list of proof steps, or a parser.StepStream.
         self.steps = steps
 
         # map seq number to proof number
         self.proof = dict()
 
+        # map seq number to proof step, for steps whose proof is kept
+        self.rules = dict()
+
+        # map seq number to the number of steps using it. If given, the
+        # proof of a step is released after its last use.
+        self.refs = refs
+
+        # print progress every progress steps, never if None
+        self.progress = progress
+
     def main(self):
         step_num = len(self.steps)
+        last = None
         for step in self.steps:
+            self.rules[step.seq_num] = step
             try:
                 self.reconstruct(step)
             except:
                 self.not_imp(step)
-            print("%s/%s" % (step.seq_num, step_num))
+            if self.progress and step.seq_num % self.progress == 0:
+                print("%s/%s" % (step.seq_num, step_num))
+            if self.refs is not None:
+                self.release(step, last)
+            last = step.seq_num
         print("finished")
-        return self.proof[len(self.steps)]
+        return self.proof[last]
+
+    def release(self, step, prev):
+        """Release the proofs whose last use is step, and the proof of the
+        previous step if it is not used (it is not the last step).
+
+        """
+        for i in step.assms:
+            if i in self.refs:
+                self.refs[i] -= 1
+                if self.refs[i] == 0:
+                    self.proof.pop(i, None)
+                    self.rules.pop(i, None)
+        if prev is not None and prev not in self.refs:
+            self.proof.pop(prev, None)
+            self.rules.pop(prev, None)
 
     def reconstruct(self, step):
         name = step.proof_name
@@ -268,10 +299,10 @@ class ProofReconstruction(object):
         """Given a sequence of proof terms, take resolution on them one by one."""
         res_pts = [self.proof[num] for num in step.assms]
         pt_0 = self.proof[step.assms[0]]
-        arity1 = self.steps[step.assms[0]-1].arity
+        arity1 = self.rules[step.assms[0]].arity
         for i in step.assms[1:]:
-            arity2 = self.steps[i-1].arity
-            assert self.proof[i].prop == self.steps[i-1].concl, i
+            arity2 = self.rules[i].arity
+            assert self.proof[i].prop == self.rules[i].concl, i
             pt_1 = pt_0
             pt_0, arity1 = verit_resolution(pt_0, self.proof[i], arity1, arity2)
 
@@ -0,0 +1,70 @@
+"""
+Test the interface to the veriT solver, with the solver replaced by
+fixed outputs.
+"""
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from smt.veriT import interface
+from util import solver_cache
+
+
+class InterfaceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.old_cache_file = solver_cache.cache_file
+        solver_cache.cache_file = os.path.join(self.tmp_dir.name, 'solver.db')
+        self.old_run_solver = interface.run_solver
+        self.old_solver_version = interface.solver_version
+        interface.solver_version = lambda: "veriT-test"
+
+        self.file_name = os.path.join(self.tmp_dir.name, 'problem.smt2')
+        with open(self.file_name, 'w') as f:
+            f.write("(set-logic LRA)\n")
+
+    def tearDown(self):
+        interface.run_solver = self.old_run_solver
+        interface.solver_version = self.old_solver_version
+        solver_cache.get_cache().close()
+        solver_cache.cache_file = self.old_cache_file
+        self.tmp_dir.cleanup()
+
+    def run_solve(self, outputs):
+        """Solve the problem twice, with the solver giving the given
+        outputs in turn. Returns the results and the number of solver calls.
+
+        """
+        calls = []
+        def run_solver(f):
+            calls.append(f)
+            return outputs[len(calls) - 1]
+        interface.run_solver = run_solver
+
+        with redirect_stdout(StringIO()):
+            res = [interface.solve(self.file_name), interface.solve(self.file_name)]
+        solver_cache.get_cache().clear()
+        return res, len(calls)
+
+    def testIsUnsat(self):
+        self.assertTrue(interface.is_unsat("unsat\n(set .c1 (input :conclusion ()))\n"))
+        self.assertTrue(interface.is_unsat("unsupported\nunsat\n"))
+        self.assertFalse(interface.is_unsat("sat\n"))
+        self.assertFalse(interface.is_unsat("unsupported\nunknown\n"))
+        self.assertFalse(interface.is_unsat("(error \"parse error\")\n"))
+        self.assertFalse(interface.is_unsat(None))
+
+    def testSolveCache(self):
+        unsat = "unsat\n(set .c1 (input :conclusion ()))\n"
+        self.assertEqual(self.run_solve([unsat, unsat]), ([unsat, unsat], 1))
+        self.assertEqual(self.run_solve(["unsupported\n" + unsat] * 2), (["unsupported\n" + unsat] * 2, 1))
+        self.assertEqual(self.run_solve(["sat\n", "sat\n"]), (["sat\n", "sat\n"], 2))
+        self.assertEqual(self.run_solve(["unknown\n", unsat]), (["unknown\n", unsat], 2))
+        self.assertEqual(self.run_solve(["(error \"x\")\n", unsat]), (["(error \"x\")\n", unsat], 2))
+        self.assertEqual(self.run_solve([None, unsat]), (["", unsat], 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Test reconstruction of veriT proofs parsed one step at a time.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from smt.veriT import interface, parser, proof
+
+
+decls = """(set-logic LRA)
+(declare-fun x () Real)
+(declare-fun y () Real)
+(assert (and (< x y) (< y x)))
+"""
+
+proof_lines = [
+    "unsat",
+    "(set .c1 (input :conclusion (#1:(and #2:(< x y) #3:(< y x)))))",
+    "(set .c2 (and :clauses (.c1) :conclusion (#2)))",
+    "(set .c3 (and :clauses (.c1) :conclusion (#3)))",
+    "(set .c4 (la_generic :conclusion ((not #2) (not #3))))",
+    "(set .c5 (resolution :clauses (.c4 .c2 .c3) :conclusion ()))",
+    "",
+]
+
+class StreamTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.file_name = tempfile.mkstemp(suffix=".smt2")
+        with os.fdopen(fd, "w") as f:
+            f.write(decls)
+        self.ctx = parser.bind_var(self.file_name)
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def testStepStream(self):
+        steps = parser.StepStream(iter(proof_lines[1:]), self.ctx)
+        self.assertEqual(len(steps), 5)
+        self.assertEqual(steps.refs, {1: 2, 2: 1, 3: 1, 4: 1})
+        self.assertEqual(steps.expire, {0: ['1'], 3: ['2', '3']})
+
+        proof_parser = parser.term_parser(self.ctx)
+        expected = [str(proof_parser.parse(line)) for line in proof_lines[1:-1]]
+        self.assertEqual([str(step) for step in steps], expected)
+        steps.close()
+
+    def testReconstructStream(self):
+        proof_parser = parser.term_parser(self.ctx)
+        rct = proof.ProofReconstruction([proof_parser.parse(line) for line in proof_lines[1:-1]])
+        with redirect_stdout(StringIO()):
+            pt = rct.main()
+
+        steps = parser.StepStream(iter(proof_lines[1:]), self.ctx)
+        rct_stream = proof.ProofReconstruction(steps, refs=steps.refs, progress=None)
+        with redirect_stdout(StringIO()):
+            pt_stream = rct_stream.main()
+        steps.close()
+
+        self.assertEqual(pt.th, pt_stream.th)
+        self.assertEqual(list(rct_stream.proof.keys()), [5])
+
+    def testProofRecStream(self):
+        closed = []
+        def run_solver_stream(f):
+            try:
+                yield from proof_lines
+            finally:
+                closed.append(f)
+
+        proof_parser = parser.term_parser(self.ctx)
+        rct = proof.ProofReconstruction([proof_parser.parse(line) for line in proof_lines[1:-1]])
+        old_run_solver_stream = interface.run_solver_stream
+        interface.run_solver_stream = run_solver_stream
+        try:
+            with redirect_stdout(StringIO()):
+                pt = rct.main()
+                pt_stream = interface.proof_rec(self.file_name, stream=True)
+        finally:
+            interface.run_solver_stream = old_run_solver_stream
+
+        self.assertEqual(pt.th, pt_stream.th)
+        self.assertEqual(closed, [self.file_name])
+
+    def testRunSolverStream(self):
+        # Replace veriT by a process printing proof_lines, then waiting
+        procs = []
+        def start_solver(f, stderr=subprocess.PIPE):
+            script = "import sys, time; sys.stdout.write(%r); sys.stdout.flush(); time.sleep(60)" % \
+                "\n".join(proof_lines)
+            procs.append(subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, stderr=stderr))
+            return procs[-1]
+
+        old_start_solver = interface.start_solver
+        interface.start_solver = start_solver
+        try:
+            lines = interface.run_solver_stream(self.file_name)
+            self.assertEqual([next(lines) for _ in range(len(proof_lines) - 1)], proof_lines[:-1])
+            lines.close()
+        finally:
+            interface.start_solver = old_start_solver
+
+        # The solver is stopped when the generator is closed
+        self.assertIsNotNone(procs[0].poll())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+"""Persistent cache of the results of external solvers.
+
+Macros such as z3 and sympy call out to a solver each time a proof is
+checked. The results are stored in an SQLite database, keyed by the hash
+of the name and version of the solver and of the printed form of the query.
+For queries on terms, the printed form is normalized up to renaming of
+variables (see print_terms), so re-checking an unchanged proof, or a proof
+that differs only in names of variables, makes no solver calls.
+
+Only results that can be reused are stored: the caller decides this by
+returning None for results (such as failures or timeouts) that should be
+recomputed next time.
+
+The cache is part of the trusted base: macros such as z3 and sympy accept
+a goal if the database records it as solved, without calling the solver,
+so anyone able to write to cache_file can make such macros accept false
+goals. Set use_solver_cache to False (or use the -n option of
+server.monitor) to check all proofs with the solvers themselves.
+
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+
+
+"""
+Version of the cache. Should be increased when print_terms or the meaning
+of stored results changes.
+
+"""
+CACHE_VERSION = 1
+
+use_solver_cache = True
+
+# Location of the database, in the library directory of the repository
+# (independent of the working directory).
+cache_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'library', '.cache', 'solver.db')
+
+# Number of lookups answered by the cache, and number of lookups that
+# called the solver, since the start of the process.
+hits = 0
+misses = 0
+
+# The same numbers for each thread (see thread_counts).
+_thread_counts = threading.local()
+
+
+def print_terms(ts):
+    """Print the list of terms ts, normalized up to renaming of variables.
+
+    Free variables are numbered in order of first occurrence (those with
+    the same name and different types are different variables), and
+    names of bound variables are omitted.
+
+    """
+    names = dict()
+    res = []
+
+    def rec(t):
+        if t.is_svar() or t.is_var():
+            key = (t.is_svar(), t.name, t.T)
+            if key not in names:
+                names[key] = len(names)
+            res.append('?' if t.is_svar() else '')
+            res.append('v%d::%s' % (names[key], t.T))
+        elif t.is_const():
+            res.append('%s::%s' % (t.name, t.T))
+        elif t.is_comb():
+            res.append('(')
+            rec(t.fun)
+            res.append(' ')
+            rec(t.arg)
+            res.append(')')
+        elif t.is_abs():
+            res.append('(%%::%s. ' % t.var_T)
+            rec(t.body)
+            res.append(')')
+        elif t.is_bound():
+            res.append('B%d' % t.n)
+        else:
+            raise TypeError
+
+    for t in ts:
+        rec(t)
+        res.append('\n')
+    return ''.join(res)
+
+def query_key(solver, version, query):
+    """Key of the given query to the given solver in the cache."""
+    h = hashlib.sha256()
+    for s in (str(CACHE_VERSION), solver, str(version), query):
+        h.update(s.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+class SolverCache():
+    """Cache of solver results stored in the SQLite database at path.
+
+    The database is opened on first use, separately in each process, and
+    the connection is shared by the threads of the process. If it cannot be
+    opened or written (for example on a read-only file system), the cache
+    behaves as if it is empty.
+
+    """
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        if self.conn is not None and self.pid == os.getpid():
+            return self.conn
+
+        self.conn, self.pid = None, os.getpid()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, solver TEXT, result TEXT)")
+            conn.commit()
+            self.conn = conn
+        except (OSError, sqlite3.Error):
+            pass
+        return self.conn
+
+    def lookup(self, key):
+        """Return the stored result for key, or None if there is none."""
+        conn = self.connect()
+        if conn is None:
+            return None
+        try:
+            with self.lock:
+                row = conn.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row is not None else None
+
+    def store(self, key, solver, result):
+        """Store the result for key."""
+        conn = self.connect()
+        if conn is None:
+            return
+        try:
+            with self.lock:
+                conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (key, solver, result))
+                conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        """Remove all stored results."""
+        conn = self.connect()
+        if conn is None:
+            return
+        try:
+            with self.lock:
+                conn.execute("DELETE FROM results")
+                conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        if self.conn is not None and self.pid == os.getpid():
+            self.conn.close()
+        self.conn = None
+
+
+_cache = None
+
+def get_cache():
+    """The cache at cache_file, which is reopened if cache_file changed."""
+    global _cache
+    if _cache is None or _cache.path != cache_file:
+        if _cache is not None:
+            _cache.close()
+        _cache = SolverCache(cache_file)
+    return _cache
+
+def thread_counts():
+    """Return the numbers of hits and misses in the current thread. Used
+    for counting the lookups made by a computation, which is not affected
+    by lookups in other threads.
+
+    """
+    return getattr(_thread_counts, 'hits', 0), getattr(_thread_counts, 'misses', 0)
+
+def cached_call(solver, version, query, compute):
+    """Return the result of query to the given solver and version.
+
+    compute is a function with no arguments calling the solver. It returns
+    the result as a string, or None if the result should not be stored.
+    The result of compute is returned on a miss.
+
+    """
+    global hits, misses
+
+    if not use_solver_cache:
+        return compute()
+
+    cache = get_cache()
+    key = query_key(solver, version, query)
+    res = cache.lookup(key)
+    if res is not None:
+        hits += 1
+        _thread_counts.hits = getattr(_thread_counts, 'hits', 0) + 1
+        return res
+
+    misses += 1
+    _thread_counts.misses = getattr(_thread_counts, 'misses', 0) + 1
+    res = compute()
+    if res is not None:
+        cache.store(key, solver, res)
+    return res
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from kernel.type import IntType, NatType
+from kernel.term import Var, Lambda, Eq
+from util import solver_cache
+
+
+class SolverCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.old_cache_file = solver_cache.cache_file
+        solver_cache.cache_file = os.path.join(self.tmp_dir.name, 'solver.db')
+
+    def tearDown(self):
+        solver_cache.get_cache().close()
+        solver_cache.cache_file = self.old_cache_file
+        self.tmp_dir.cleanup()
+
+    def testPrintTerms(self):
+        x, y = Var('x', IntType), Var('y', IntType)
+        a, b = Var('a', IntType), Var('b', IntType)
+        xn = Var('x', NatType)
+        u, v = Var('u', IntType), Var('v', IntType)
+
+        pt = solver_cache.print_terms
+        self.assertEqual(pt([Eq(x, y)]), pt([Eq(a, b)]))
+        self.assertEqual(pt([Eq(x, y), Eq(y, x)]), pt([Eq(a, b), Eq(b, a)]))
+        self.assertEqual(pt([Eq(Lambda(u, u), Lambda(v, v))]), pt([Eq(Lambda(v, v), Lambda(u, u))]))
+        self.assertNotEqual(pt([Eq(x, y)]), pt([Eq(x, x)]))
+        self.assertNotEqual(pt([Eq(x, y), Eq(y, x)]), pt([Eq(a, b), Eq(a, b)]))
+        self.assertNotEqual(pt([Eq(x, x)]), pt([Eq(xn, xn)]))
+        self.assertNotEqual(pt([Eq(x, y), Eq(x, y)]), pt([Eq(x, y)]))
+
+    def testCachedCall(self):
+        calls = []
+        def compute(res):
+            def f():
+                calls.append(res)
+                return res
+            return f
+
+        hits, misses = solver_cache.hits, solver_cache.misses
+        self.assertEqual(solver_cache.cached_call('s', '1', 'q1', compute('a')), 'a')
+        self.assertEqual(solver_cache.cached_call('s', '1', 'q1', compute('b')), 'a')
+        self.assertEqual(solver_cache.cached_call('s', '2', 'q1', compute('c')), 'c')
+        self.assertEqual(solver_cache.cached_call('t', '1', 'q1', compute('d')), 'd')
+        self.assertEqual(solver_cache.cached_call('s', '1', 'q2', compute(None)), None)
+        self.assertEqual(solver_cache.cached_call('s', '1', 'q2', compute('e')), 'e')
+        self.assertEqual(calls, ['a', 'c', 'd', None, 'e'])
+        self.assertEqual((solver_cache.hits - hits, solver_cache.misses - misses), (1, 5))
+
+        # Results persist after the database is reopened
+        solver_cache.get_cache().close()
+        self.assertEqual(solver_cache.cached_call('s', '2', 'q1', compute('f')), 'c')
+        self.assertEqual(calls, ['a', 'c', 'd', None, 'e'])
+
+        solver_cache.get_cache().clear()
+        self.assertEqual(solver_cache.cached_call('s', '2', 'q1', compute('f')), 'f')
+
+    def testThreadCounts(self):
+        def run(query, res):
+            res.append(solver_cache.thread_counts())
+            for _ in range(2):
+                solver_cache.cached_call('s', '1', query, lambda: 'a')
+            res.append(solver_cache.thread_counts())
+
+        res = []
+        run('q1', res)
+        self.assertEqual((res[1][0] - res[0][0], res[1][1] - res[0][1]), (1, 1))
+
+        thread_res = []
+        thread = threading.Thread(target=run, args=('q2', thread_res))
+        thread.start()
+        thread.join()
+        self.assertEqual(thread_res, [(0, 0), (1, 1)])
+        self.assertEqual(solver_cache.thread_counts(), res[1])
+
+    def testUnavailable(self):
+        solver_cache.cache_file = os.path.join(self.tmp_dir.name, 'file', 'solver.db')
+        with open(os.path.join(self.tmp_dir.name, 'file'), 'w') as f:
+            f.write('')
+
+        calls = []
+        def compute():
+            calls.append('a')
+            return 'a'
+
+        self.assertEqual(solver_cache.cached_call('s', '1', 'q', compute), 'a')
+        self.assertEqual(solver_cache.cached_call('s', '1', 'q', compute), 'a')
+        self.assertEqual(calls, ['a', 'a'])
+
+
+if __name__ == "__main__":
+    unittest.main()